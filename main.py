@@ -1,15 +1,20 @@
-from modules import download_manga_chapter
-from modules import FrameExtractor
-from modules import MangaSpeechApp
-
-# url = input("Введите URL первой главы: ")
-# chapters = int(input("Введите количество глав: "))
-# download_manga_chapter(url, chapters, "./static")
-
-#FrameExtractor().process_images()
-
-
-
-if __name__ == "__main__":
-    app = MangaSpeechApp()
-    app.run()
\ No newline at end of file
+import sys
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Пакетный режим: tkinter и PIL.ImageTk не загружаются
+        from modules.cli import main
+        sys.exit(main())
+
+    from modules import MangaSpeechApp
+    from modules.metrics import exporter_from_env
+
+    # Метрики графического режима - если заданы MANGA_METRICS_PROM / MANGA_METRICS_JSONL
+    exporter = exporter_from_env()
+    app = MangaSpeechApp()
+    try:
+        app.run()
+    finally:
+        if exporter:
+            exporter.stop()
@@ -1,10 +1,29 @@
-from .download_manga_chapter import MangaDownloader
-from .frame_extractor import FrameExtractor
-from .gui import MangaSpeechApp
-
-__all__ = [
-    "MangaDownloader",
-    "FrameExtractor",
-    "MangaSpeechApp"
-    ]
-__version__ = "1.0.0"
\ No newline at end of file
+import importlib
+
+__all__ = [
+    "MangaDownloader",
+    "FrameExtractor",
+    "MangaSpeechApp"
+    ]
+__version__ = "1.0.0"
+
+# Подмодули и их тяжёлые зависимости (requests/bs4, cv2/numpy, tkinter/PIL)
+# загружаются только при первом обращении к соответствующему имени
+_LAZY_EXPORTS = {
+    "MangaDownloader": ".download_manga_chapter",
+    "FrameExtractor": ".frame_extractor",
+    "MangaSpeechApp": ".gui",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
\ No newline at end of file
@@ -0,0 +1,65 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+INDEX_FILENAME = ".chapter_index.sqlite"
+
+
+class ChapterIndex:
+    """Граф глав серии в SQLite: номер главы -> URL и ссылка на следующую.
+
+    Серия задаётся URL её первой главы (номер 1), номера остальных - по цепочке ссылок
+    «Следующая глава». Индекс пополняется при каждом скачивании, поэтому следующие запуски
+    переходят к главе N сразу, не открывая уже пройденные страницы.
+    """
+
+    def __init__(self, chapters_path):
+        self.chapters_path = Path(chapters_path)
+        self.chapters_path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.chapters_path / INDEX_FILENAME), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS chapters (
+                series TEXT NOT NULL,
+                number INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                next_url TEXT,
+                updated REAL NOT NULL,
+                PRIMARY KEY (series, number)
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def get(self, series, number):
+        """(url, next_url) главы или None, если она ещё не встречалась"""
+        with self._lock:
+            row = self.conn.execute("SELECT url, next_url FROM chapters WHERE series = ? AND number = ?",
+                                    (series, number)).fetchone()
+        return tuple(row) if row else None
+
+    def nearest(self, series, number):
+        """(номер, url, next_url) ближайшей известной главы не дальше number; глава 1 известна всегда"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT number, url, next_url FROM chapters WHERE series = ? AND number <= ? "
+                "ORDER BY number DESC LIMIT 1", (series, number)).fetchone()
+        return tuple(row) if row else (1, series, None)
+
+    def record(self, series, number, url, next_url=None):
+        """Запоминает главу; известная ссылка на следующую не затирается пустой"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO chapters (series, number, url, next_url, updated) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (series, number) DO UPDATE SET
+                    next_url = CASE WHEN chapters.url = excluded.url
+                                    THEN COALESCE(excluded.next_url, chapters.next_url)
+                                    ELSE excluded.next_url END,
+                    url = excluded.url,
+                    updated = excluded.updated
+            """, (series, number, url, next_url, time.time()))
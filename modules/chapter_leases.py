@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from pathlib import Path
+
+# Служебные папки внутри папки фреймов (с точкой - каталог их шардами не считает)
+LEASES_DIRNAME = ".leases"
+WORK_DIRNAME = ".work"
+
+
+def default_owner():
+    """Имя исполнителя: узел и процесс"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def reset_leases(frames_path):
+    """Забывает аренды и отметки готовности (после полной перенарезки папки)"""
+    for dirname in (LEASES_DIRNAME, WORK_DIRNAME):
+        shutil.rmtree(Path(frames_path) / dirname, ignore_errors=True)
+
+
+class ChapterLeases:
+    """Аренда глав на общей файловой системе (NFS и т.п.) для нарезки с нескольких машин.
+
+    Аренда - файл .leases/<глава>.lease, созданный через O_CREAT|O_EXCL (атомарно и на NFSv3+).
+    Владелец продлевает её, обновляя время изменения файла; аренда, не продлевавшаяся дольше ttl,
+    считается брошенной и перехватывается. Готовая глава отмечается файлом .leases/<глава>.done.
+    Фреймы пишутся в личную папку .work/<глава>.<владелец> и переносятся в шард одним rename,
+    поэтому исполнители, даже потерявшие аренду, не пишут в один и тот же шард.
+    """
+
+    def __init__(self, frames_path, owner=None, ttl=300):
+        self.frames_path = Path(frames_path)
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        self.leases_path = self.frames_path / LEASES_DIRNAME
+        self.work_path = self.frames_path / WORK_DIRNAME
+        self.leases_path.mkdir(parents=True, exist_ok=True)
+        self.work_path.mkdir(parents=True, exist_ok=True)
+
+    def lease_path(self, shard):
+        return self.leases_path / f"{shard}.lease"
+
+    def done_path(self, shard):
+        return self.leases_path / f"{shard}.done"
+
+    def work_dir(self, shard):
+        """Личная папка исполнителя для фреймов главы до её завершения"""
+        return self.work_path / f"{shard}.{self.owner}"
+
+    def is_done(self, shard):
+        return self.done_path(shard).exists()
+
+    def _create_exclusive(self, path, data):
+        """Атомарно создаёт файл; False, если он уже существует"""
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return True
+
+    def _is_stale(self, path):
+        try:
+            return time.time() - os.stat(path).st_mtime > self.ttl
+        except FileNotFoundError:
+            return True
+
+    def read_owner(self, shard):
+        try:
+            with open(self.lease_path(shard), encoding="utf-8") as f:
+                return json.load(f).get("owner")
+        except (OSError, ValueError):
+            return None
+
+    def owns(self, shard):
+        return self.read_owner(shard) == self.owner
+
+    def try_claim(self, shard):
+        """Пытается взять главу; брошенную чужую аренду перехватывает"""
+        if self.is_done(shard):
+            return False
+        lease = self.lease_path(shard)
+        record = {"owner": self.owner, "claimed_at": time.time()}
+        if self._create_exclusive(lease, record):
+            return True
+        if not self._is_stale(lease):
+            return False
+
+        # Перехват идёт под отдельной блокировкой, чтобы два узла не сняли аренду друг у друга
+        breaker = self.leases_path / f"{shard}.break"
+        if not self._create_exclusive(breaker, record):
+            if self._is_stale(breaker):
+                # Узел умер посреди перехвата - его блокировку снимем, взять главу попробуем в следующий раз
+                _unlink(breaker)
+            return False
+        try:
+            if not self._is_stale(lease) or self.is_done(shard):
+                return False
+            print(f"Аренда главы {shard} брошена ({self.read_owner(shard)}), перехватываем")
+            _unlink(lease)
+            return self._create_exclusive(lease, record)
+        finally:
+            _unlink(breaker)
+
+    def heartbeat(self, shard):
+        """Продлевает аренду; False, если её уже перехватили"""
+        if not self.owns(shard):
+            return False
+        try:
+            os.utime(self.lease_path(shard))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, shard):
+        """Отпускает главу без результата (она вернётся в общую работу)"""
+        if self.owns(shard):
+            _unlink(self.lease_path(shard))
+        shutil.rmtree(self.work_dir(shard), ignore_errors=True)
+
+    def complete(self, shard, frames_count):
+        """Переносит фреймы в шард и отмечает главу готовой; False, если аренда потеряна"""
+        work_dir = self.work_dir(shard)
+        if not self.owns(shard) or self.is_done(shard):
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return False
+
+        target = self.frames_path / shard
+        # Остатки прежних попыток (например, однопроцессной нарезки) целиком убираем в сторону:
+        # rename в непустую папку невозможен
+        old_dir = self.work_path / f"{shard}.{self.owner}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        try:
+            os.rename(target, old_dir)
+        except FileNotFoundError:
+            pass
+
+        # Аренду проверяем ещё раз прямо перед переносом: её могли перехватить, пока шли проверки
+        moved = False
+        if self.owns(shard) and not self.is_done(shard):
+            try:
+                if work_dir.exists():
+                    os.rename(work_dir, target)
+                else:
+                    target.mkdir()
+                moved = True
+            except OSError:
+                pass
+        if not moved:
+            # Глава досталась другому исполнителю: его результат не трогаем, прежний шард возвращаем
+            try:
+                os.rename(old_dir, target)
+            except OSError:
+                pass
+            shutil.rmtree(old_dir, ignore_errors=True)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return False
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        done_temp = self.leases_path / f".{shard}.done.{self.owner}"
+        with open(done_temp, "w", encoding="utf-8") as f:
+            json.dump({"owner": self.owner, "frames": frames_count, "finished_at": time.time()}, f)
+        os.replace(done_temp, self.done_path(shard))
+        _unlink(self.lease_path(shard))
+
+        # Папки исполнителей, бросивших эту главу
+        for stale_dir in self.work_path.glob(f"{shard}.*"):
+            shutil.rmtree(stale_dir, ignore_errors=True)
+        return True
+
+    def keep_alive(self, shard):
+        """Фоновое продление аренды; возвращает (остановить, признак потери аренды)"""
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def beat():
+            while not stop.wait(max(1.0, self.ttl / 3)):
+                if not self.heartbeat(shard):
+                    lost.set()
+                    return
+
+        threading.Thread(target=beat, daemon=True).start()
+        return stop, lost
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,329 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+# Коды завершения (ошибки аргументов argparse завершает с кодом 2)
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INTERRUPTED = 130
+
+
+def memory_size(text):
+    """Тип аргумента --memory-limit: '512M', '2G' или число байт"""
+    from .memory_budget import parse_size
+    try:
+        size = parse_size(text)
+    except ValueError:
+        size = 0
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"неверный размер: {text} (например 512M или 2G)")
+    return size
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Пакетный режим Manga Speech App без графического интерфейса"
+    )
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Писать метрики в текстовом формате Prometheus (для textfile collector)")
+    parser.add_argument("--metrics-jsonl", metavar="FILE", help="Дописывать снимки метрик в JSONL-файл")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="Период выгрузки метрик, с")
+    parser.add_argument("--memory-limit", type=memory_size, metavar="SIZE",
+                        help="Общий бюджет памяти скачивания и нарезки, например 512M или 2G")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_download_args(sub):
+        sub.add_argument("--url", required=True, help="URL первой главы")
+        sub.add_argument("--chapters", type=int, default=1, help="Количество глав")
+        sub.add_argument("--from-chapter", type=int, default=1, metavar="N",
+                         help="Начать с главы N, считая главу из --url первой (адрес берётся из индекса глав)")
+        sub.add_argument("--workers", type=int, default=4, help="Параллельных загрузок страниц")
+        sub.add_argument("--fsync-batch", type=int, default=0, metavar="N",
+                         help="fsync каждой страницы до переименования и папки главы раз в N страниц (0 - без fsync)")
+        sub.add_argument("--transport", choices=("auto", "requests", "http2"), default="auto",
+                         help="HTTP-клиент: http2 - httpx с мультиплексированием, auto - он же, если установлен")
+
+    def add_extract_args(sub):
+        sub.add_argument("--frames-dir", default="./static/frames/", help="Папка для фреймов")
+        sub.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                         help="Процессов для нарезки глав")
+
+    def add_common_args(sub):
+        sub.add_argument("--chapters-dir", default="./static/chapters/", help="Папка с главами")
+        sub.add_argument("--stats", metavar="FILE",
+                         help="Записать статистику в JSON-файл ('-' - в stdout)")
+
+    download = subparsers.add_parser("download", help="Скачать главы")
+    add_download_args(download)
+    add_common_args(download)
+
+    extract = subparsers.add_parser("extract", help="Нарезать скачанные главы на фреймы")
+    add_extract_args(extract)
+    add_common_args(extract)
+    extract.add_argument("--shared", action="store_true",
+                         help="Совместная нарезка общей папки с нескольких узлов (папка фреймов не очищается)")
+    extract.add_argument("--worker-id", help="Имя исполнителя в аренде (по умолчанию - узел и PID)")
+    extract.add_argument("--lease-ttl", type=float, default=300,
+                         help="Через сколько секунд без продления аренда считается брошенной")
+    extract.add_argument("--no-wait", action="store_true",
+                         help="Не ждать глав, которые нарезают другие узлы")
+
+    both = subparsers.add_parser("run", help="Скачать и нарезать (нарезка главы идёт во время скачивания следующей)")
+    add_download_args(both)
+    add_extract_args(both)
+    add_common_args(both)
+    both.add_argument("--fresh", action="store_true",
+                      help="Начать заново, игнорируя сохранённое состояние конвейера")
+
+    ocr = subparsers.add_parser("ocr", help="Распознать текст нарезанных фреймов (с кэшем)")
+    ocr.add_argument("--frames-dir", default="./static/frames/", help="Папка с фреймами")
+    ocr.add_argument("--engine", choices=("tesseract", "stub"),
+                     help="Движок распознавания (по умолчанию tesseract, если установлен, иначе stub)")
+    ocr.add_argument("--lang", default="rus+eng", help="Языки для tesseract")
+    ocr.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Процессов распознавания")
+    ocr.add_argument("--batch-size", type=int, default=16, help="Фреймов в одной пачке")
+    ocr.add_argument("--full-frame", action="store_true",
+                     help="Распознавать фрейм целиком, без поиска областей текста")
+    ocr.add_argument("--stats", metavar="FILE", help="Записать статистику в JSON-файл ('-' - в stdout)")
+
+    video = subparsers.add_parser("video", help="Экспортировать фреймы в видео с прокруткой")
+    video.add_argument("--frames-dir", default="./static/frames/", help="Папка с фреймами")
+    video.add_argument("--output", required=True, help="Видеофайл (например, chapter.mp4)")
+    video.add_argument("--width", type=int, default=1080, help="Ширина кадра")
+    video.add_argument("--height", type=int, default=1920, help="Высота кадра")
+    video.add_argument("--fps", type=int, default=30, help="Кадров в секунду")
+    video.add_argument("--seconds", type=float, default=2.0, help="Минимальное время показа фрейма")
+    video.add_argument("--scroll-speed", type=float, default=600, help="Прокрутка высоких фреймов, пикс/с")
+    video.add_argument("--codec", default="mp4v", help="FourCC кодека OpenCV")
+    video.add_argument("--voice", action="store_true",
+                       help="Длительность фреймов по озвучке распознанного текста")
+    video.add_argument("--audio-output", help="Записать синхронную звуковую дорожку (WAV)")
+    video.add_argument("--stats", metavar="FILE", help="Записать статистику в JSON-файл ('-' - в stdout)")
+
+    bench = subparsers.add_parser("viewer-bench", help="Замерить задержки просмотрщика без дисплея")
+    bench.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                       help="Размеры тестовых папок (число фреймов)")
+    bench.add_argument("--work-dir", help="Где создавать тестовые папки (по умолчанию - временная папка)")
+    bench.add_argument("--steps", type=int, default=200, help="Переходов next/prev на папку")
+    bench.add_argument("--moves", type=int, default=200, help="Перемещений фреймов на папку")
+    bench.add_argument("--deletes", type=int, default=50, help="Удалений фреймов на папку")
+    bench.add_argument("--stats", metavar="FILE", help="Записать результаты в JSON-файл ('-' - в stdout)")
+
+    jobs = subparsers.add_parser("jobs", help="Очередь заданий для нескольких серий")
+    jobs.add_argument("--db", default="./static/jobs/jobs.sqlite", help="Файл очереди заданий")
+    jobs.add_argument("--stats", metavar="FILE", help="Записать статистику в JSON-файл ('-' - в stdout)")
+    actions = jobs.add_subparsers(dest="action", required=True)
+
+    add = actions.add_parser("add", help="Добавить серию в очередь")
+    add.add_argument("--url", required=True, help="URL первой главы")
+    add.add_argument("--chapters", type=int, default=1, help="Количество глав")
+    add.add_argument("--priority", type=int, default=0, help="Приоритет (больше - раньше)")
+    add.add_argument("--chapters-dir", help="Папка с главами (по умолчанию - своя для задания)")
+    add.add_argument("--frames-dir", help="Папка для фреймов (по умолчанию - своя для задания)")
+
+    actions.add_parser("list", help="Показать задания")
+    for action, help_text in (("cancel", "Отменить"), ("pause", "Приостановить"), ("resume", "Продолжить")):
+        sub = actions.add_parser(action, help=f"{help_text} задание")
+        sub.add_argument("job_id", type=int)
+
+    run_jobs = actions.add_parser("run", help="Выполнять задания из очереди")
+    run_jobs.add_argument("--max-jobs", type=int, default=2, help="Одновременных заданий")
+    run_jobs.add_argument("--max-connections", type=int, default=8, help="Общий лимит соединений")
+    run_jobs.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                          help="Общий пул процессов нарезки")
+    run_jobs.add_argument("--workers", type=int, default=4, help="Параллельных загрузок страниц в задании")
+    run_jobs.add_argument("--watch", action="store_true", help="Не завершаться, когда очередь пуста")
+
+    return parser
+
+
+def run_jobs(args, report):
+    from .job_queue import JobQueue, JobRunner
+
+    job_queue = JobQueue(args.db)
+    try:
+        if args.action == "add":
+            job_id = job_queue.add(args.url, args.chapters, args.chapters_dir, args.frames_dir, args.priority)
+            report["job_id"] = job_id
+            print(f"Добавлено задание {job_id}")
+            return True
+        if args.action == "list":
+            report["jobs"] = job_queue.list_jobs()
+            for job in report["jobs"]:
+                print(f"{job['id']:>4}  {job['status']:<9}  p={job['priority']:<3} "
+                      f"{job['num_chapters']:>4} гл.  {job['url']}  {job['message']}")
+            return True
+        if args.action in ("cancel", "pause", "resume"):
+            changed = getattr(job_queue, args.action)(args.job_id)
+            if not changed:
+                print(f"Задание {args.job_id}: действие '{args.action}' недоступно в текущем статусе")
+            return changed
+
+        runner = JobRunner(job_queue, max_jobs=args.max_jobs, max_connections=args.max_connections,
+                           cpu_workers=args.processes, download_workers=args.workers)
+        try:
+            report["jobs"] = runner.run(until_empty=not args.watch)
+        except KeyboardInterrupt:
+            runner.stop()
+            raise
+        return report["jobs"]["failed"] == 0
+    finally:
+        job_queue.close()
+
+
+def run_ocr(args, report):
+    from .ocr import OcrStage, StubOcrEngine, default_engine_name
+
+    engine = args.engine or default_engine_name()
+    if args.engine is None and engine == StubOcrEngine.name:
+        print("pytesseract не установлен, вместо распознавания будет заглушка stub")
+    engine_options = {"lang": args.lang} if engine == "tesseract" else {}
+    stage = OcrStage(args.frames_dir, engine=engine, engine_options=engine_options,
+                     processes=args.processes, batch_size=args.batch_size, use_regions=not args.full_frame)
+    success, message = stage.run()
+    report["ocr"] = stage.get_stats()
+    report["message"] = message
+    return success
+
+
+def run_viewer_bench(args, report):
+    from .viewer_benchmark import run_viewer_benchmark
+
+    report["viewer"] = run_viewer_benchmark(args.sizes, work_dir=args.work_dir, steps=args.steps,
+                                            moves=args.moves, deletes=args.deletes)
+    return True
+
+
+def run_video(args, report):
+    from .video_exporter import VideoExporter
+
+    audio_for_frame = None
+    if args.voice or args.audio_output:
+        from .ocr import OcrCache, result_text
+        from .speech import AudioCache, default_speech_engine
+
+        ocr_cache = OcrCache(args.frames_dir)
+        audio_cache = AudioCache(args.frames_dir, default_speech_engine())
+
+        def audio_for_frame(frame_path):
+            text = result_text(ocr_cache.lookup(frame_path))
+            return audio_cache.synthesize(text) if text else None
+
+    exporter = VideoExporter(args.frames_dir, args.output, size=(args.width, args.height), fps=args.fps,
+                             frame_seconds=args.seconds, scroll_speed=args.scroll_speed, codec=args.codec)
+    success, message = exporter.export(audio_for_frame, args.audio_output)
+    report["video"] = exporter.get_stats()
+    report["message"] = message
+    return success
+
+
+def run_download(args, report):
+    from .download_manga_chapter import MangaDownloader
+
+    downloader = MangaDownloader(workers=args.workers, fsync_batch=args.fsync_batch,
+                                 transport=args.transport)
+    success = downloader.download_multiple_chapters(args.url, args.chapters, args.chapters_dir,
+                                                    first_chapter=args.from_chapter)
+    report["download"] = downloader.get_stats()
+    return success
+
+
+def run_extract(args, report):
+    from .frame_extractor import FrameExtractor
+
+    extractor = FrameExtractor()
+    if args.shared:
+        success, message = extractor.process_shared(args.chapters_dir, args.frames_dir, processes=args.processes,
+                                                    owner=args.worker_id, lease_ttl=args.lease_ttl,
+                                                    wait=not args.no_wait)
+    else:
+        success, message = extractor.process_images(args.chapters_dir, args.frames_dir, processes=args.processes)
+    report["extract"] = extractor.get_stats()
+    report["message"] = message
+    return success
+
+
+def run_pipeline(args, report):
+    from .pipeline import ChapterPipeline
+
+    pipeline = ChapterPipeline(args.chapters_dir, args.frames_dir,
+                               download_workers=args.workers, extract_processes=args.processes,
+                               fsync_batch=args.fsync_batch, transport=args.transport)
+    success, message = pipeline.run(args.url, args.chapters, fresh=args.fresh, first_chapter=args.from_chapter)
+    report["pipeline"] = pipeline.get_stats()
+    report["download"] = pipeline.downloader.get_stats()
+    report["message"] = message
+    return success
+
+
+def write_stats(path, report):
+    data = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if path == "-":
+        sys.stdout.write(data + "\n")
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+
+def main(argv=None):
+    """Точка входа пакетного режима; возвращает код завершения"""
+    args = build_parser().parse_args(argv)
+    report = {"command": args.command}
+    started = time.perf_counter()
+
+    # Если статистика идёт в stdout, журнал работы уводим в stderr
+    log_target = sys.stderr if args.stats == "-" else sys.stdout
+
+    exporter = None
+    if args.metrics or args.metrics_jsonl:
+        from .metrics import MetricsExporter
+        exporter = MetricsExporter(args.metrics, args.metrics_jsonl, args.metrics_interval).start()
+
+    budget = None
+    if args.memory_limit:
+        from .memory_budget import MemoryBudget, set_process_budget
+        budget = MemoryBudget(args.memory_limit)
+        set_process_budget(budget)
+
+    try:
+        with contextlib.redirect_stdout(log_target):
+            exit_code = run_command(args, report)
+    except KeyboardInterrupt:
+        print("Прервано пользователем", file=sys.stderr)
+        exit_code = EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        exit_code = EXIT_FAILED
+    finally:
+        if exporter:
+            exporter.stop()
+
+    if budget is not None:
+        report["memory"] = budget.get_stats()
+    report["exit_code"] = exit_code
+    report["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    if args.stats:
+        write_stats(args.stats, report)
+    return exit_code
+
+
+def run_command(args, report):
+    if args.command == "download":
+        success = run_download(args, report)
+    elif args.command == "extract":
+        success = run_extract(args, report)
+    elif args.command == "ocr":
+        success = run_ocr(args, report)
+    elif args.command == "video":
+        success = run_video(args, report)
+    elif args.command == "viewer-bench":
+        success = run_viewer_bench(args, report)
+    elif args.command == "jobs":
+        success = run_jobs(args, report)
+    else:
+        success = run_pipeline(args, report)
+    return EXIT_OK if success else EXIT_FAILED
@@ -1,73 +1,274 @@
-import requests
 from bs4 import BeautifulSoup
 import os
+import shutil
 from pathlib import Path
 import time
-from urllib.parse import urljoin
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
 import sys
 
+from .chapter_index import ChapterIndex
+from .memory_budget import reserve_memory
+from .metrics import REGISTRY
+from .page_validator import PageValidationError, validate_page
+from .transport import create_transport
+
+HTTP_LATENCY = REGISTRY.histogram("manga_http_request_seconds", "Время HTTP-запроса до конца тела",
+                                  ("host", "kind"))
+HTTP_BYTES = REGISTRY.counter("manga_http_bytes_total", "Получено байт", ("host",))
+HTTP_ERRORS = REGISTRY.counter("manga_http_errors_total", "Неудачные HTTP-запросы", ("host", "kind"))
+DOWNLOADED_PAGES = REGISTRY.counter("manga_download_pages_total", "Страницы глав по результату", ("result",))
+DOWNLOAD_RATE = REGISTRY.gauge("manga_download_pages_per_second", "Скорость скачивания последней главы")
+
+# Размер порции чтения ответа и буфера записи страницы на диск
+CHUNK_BYTES = 256 * 1024
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+def fsync_path(path):
+    """fsync файла или папки по пути (в Windows папки не синхронизируются - ошибка игнорируется)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def preallocate(f, length):
+    """Выделяет место под файл заранее, где это поддерживается (меньше фрагментации)"""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(f.fileno(), 0, length)
+        except OSError:
+            pass
+
+
+class ChapterSync:
+    """Сброс страниц главы на диск: данные файла - fsync до переименования, папка - раз в batch страниц
+    и в конце главы (после сбоя под окончательным именем не окажется недописанный файл).
+
+    batch=0 - fsync не вызывается (достаточно атомарного переименования).
+    """
+
+    def __init__(self, folder, batch=0):
+        self.folder = Path(folder)
+        self.batch = max(0, batch)
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def commit(self, temp_path, final_path):
+        """Переносит готовую страницу под окончательное имя"""
+        if self.batch:
+            fsync_path(temp_path)
+        os.replace(temp_path, final_path)
+        if not self.batch:
+            return
+        with self._lock:
+            self.pending += 1
+            if self.pending < self.batch:
+                return
+            self.pending = 0
+        fsync_path(self.folder)
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, 0
+        if pending:
+            fsync_path(self.folder)
+
+
+def staging_path(chapter_folder):
+    """Служебная папка, в которую качается глава (с точкой - обработка глав её не видит)"""
+    return chapter_folder.with_name(f".{chapter_folder.name}.part")
+
+
+def has_pages(chapter_folder):
+    return chapter_folder.is_dir() and any(chapter_folder.iterdir())
+
+
+def publish_chapter(staging_folder, chapter_folder, sync=False):
+    """Заменяет папку главы скачанной: прежняя отодвигается в .chapter_NNN.old и удаляется"""
+    old_folder = chapter_folder.with_name(f".{chapter_folder.name}.old")
+    shutil.rmtree(old_folder, ignore_errors=True)
+    if chapter_folder.exists():
+        os.rename(chapter_folder, old_folder)
+    os.rename(staging_folder, chapter_folder)
+    if sync:
+        fsync_path(chapter_folder.parent)
+    shutil.rmtree(old_folder, ignore_errors=True)
+
+
+def recover_chapter(chapter_folder):
+    """Возвращает прежнюю папку главы, если сбой случился между двумя переименованиями publish_chapter"""
+    old_folder = chapter_folder.with_name(f".{chapter_folder.name}.old")
+    if old_folder.exists() and not chapter_folder.exists():
+        os.rename(old_folder, chapter_folder)
+
+
+def find_next_chapter_link(soup):
+    """Ссылка «Следующая глава» со страницы главы или None"""
+    # Способ 1: Ищем в блоке с классом reader-alert
+    reader_alert = soup.find('div', class_='reader-alert')
+    if reader_alert:
+        next_link = reader_alert.find('a', class_='btn btn-secondary')
+        if next_link and 'Следующая глава' in next_link.get_text():
+            return next_link.get('href')
+
+    # Способ 2: Ищем любую ссылку с текстом "Следующая глава"
+    for link in soup.find_all('a'):
+        if 'Следующая глава' in link.get_text():
+            return link.get('href')
+    return None
+
+
 class MangaDownloader:
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, workers=1, connection_limiter=None, fsync_batch=0,
+                 transport="auto"):
         self.progress_callback = progress_callback
+        # Сколько страниц главы скачивать одновременно
+        self.workers = max(1, workers)
+        # Сколько страниц главы сбрасывать на диск одним fsync (0 - без fsync)
+        self.fsync_batch = max(0, fsync_batch)
+        # requests (HTTP/1.1), http2 (httpx) или auto - HTTP/2, если httpx[http2] установлен
+        self.transport = transport
+        # Общий для нескольких загрузчиков семафор на одновременные соединения
+        self.connection_limiter = connection_limiter or contextlib.nullcontext()
         self.is_cancelled = False
+        self.stats = {
+            'total_chapters': 0,
+            'downloaded_chapters': 0,
+            'total_pages': 0,
+            'downloaded_pages': 0,
+            'failed_pages': 0,
+            'invalid_pages': 0,
+            'retried_pages': 0,
+            'index_fetches': 0,
+            # Главы, новая копия которых не опубликована (ошибка страницы главы или недокачанные страницы)
+            'failed_chapters': 0,
+        }
+        self._stats_lock = threading.Lock()
         
     def cancel_download(self):
         """Отменить скачивание"""
         self.is_cancelled = True
         
-    def download_image(self, session, url, filepath, referer=None):
-        """Скачивает и сохраняет изображение с обработкой ошибок"""
+    def download_image(self, session, url, filepath, referer=None, sync=None):
+        """Скачивает и сохраняет изображение с обработкой ошибок.
+
+        Страница пишется во временный файл рядом и получает окончательное имя только
+        после проверки, поэтому всё, что лежит под именем page_NNN, скачано целиком.
+        """
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         if referer:
             headers['Referer'] = referer
 
+        filepath = Path(filepath)
+        temp_path = filepath.with_name(f".{filepath.name}.part")
+        host = urlsplit(url).netloc
+        started = time.perf_counter()
+        received = 0
         try:
-            response = session.get(url, headers=headers, stream=True, timeout=30)
-            response.raise_for_status()
+            # В памяти при скачивании только порция ответа и буфер записи; их резервируем до того,
+            # как занять соединение, чтобы ожидание бюджета не держало разрешение и открытый ответ.
+            # Память под декодирование резервирует нарезка, когда страница действительно декодируется.
+            # Ответ закрываем и при ошибке: по HTTP/2 незакрытый поток держит соединение
+            with reserve_memory(CHUNK_BYTES + WRITE_BUFFER_BYTES), self.connection_limiter, \
+                    session.get(url, headers=headers, stream=True, timeout=30) as response:
+                response.raise_for_status()
 
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+                # Длину сверяем, только если тело не сжато при передаче
+                expected_length = None
+                if response.headers.get('Content-Encoding', 'identity') == 'identity':
+                    content_length = response.headers.get('Content-Length')
+                    if content_length and content_length.isdigit():
+                        expected_length = int(content_length)
+
+                with open(temp_path, 'wb', buffering=WRITE_BUFFER_BYTES) as f:
+                    if expected_length:
+                        preallocate(f, expected_length)
+                    for chunk in response.iter_content(chunk_size=CHUNK_BYTES):
+                        f.write(chunk)
+                        received += len(chunk)
+                    # Недокачанный файл не должен дотянуть до ожидаемой длины за счёт выделенного места
+                    f.truncate(received)
+            HTTP_LATENCY.observe(time.perf_counter() - started, host=host, kind="image")
+            HTTP_BYTES.inc(received, host=host)
+            # Обрезанный файл или HTML-страница ошибки не должны дойти до нарезки
+            validate_page(temp_path, expected_length)
+            if sync is not None:
+                sync.commit(temp_path, filepath)
+            else:
+                os.replace(temp_path, filepath)
             print(f"Успешно скачано: {filepath}")
             return True
+        except PageValidationError as e:
+            print(f"Битое изображение {url}: {e}")
+            DOWNLOADED_PAGES.inc(result="invalid")
+            with self._stats_lock:
+                self.stats['invalid_pages'] += 1
+            return False
         except Exception as e:
             print(f"Ошибка при скачивании {url}: {e}")
+            HTTP_ERRORS.inc(host=host, kind="image")
+            HTTP_BYTES.inc(received, host=host)
             return False
+        finally:
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
 
     def download_chapter(self, session, url, chapter_num, download_path):
         """Скачивает все изображения одной главы"""
         if self.is_cancelled:
             return None
-            
+
+        chapter_folder = Path(download_path) / f"chapter_{chapter_num:03d}"
+        recover_chapter(chapter_folder)
+
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            response = session.get(url, headers=headers, timeout=30)
+            started = time.perf_counter()
+            with self.connection_limiter:
+                response = session.get(url, headers=headers, timeout=30)
+            HTTP_LATENCY.observe(time.perf_counter() - started, host=urlsplit(url).netloc, kind="chapter")
+            HTTP_BYTES.inc(len(response.content), host=urlsplit(url).netloc)
             response.raise_for_status()
         except Exception as e:
             print(f"Ошибка при загрузке страницы главы {chapter_num}: {e}")
+            HTTP_ERRORS.inc(host=urlsplit(url).netloc, kind="chapter")
+            with self._stats_lock:
+                self.stats['failed_chapters'] += 1
             return None
+        chapter_started = time.perf_counter()
 
         soup = BeautifulSoup(response.text, 'lxml')
 
-        # Создаем папку для главы
-        chapter_folder = Path(download_path) / f"chapter_{chapter_num:03d}"
-        chapter_folder.mkdir(parents=True, exist_ok=True)
-
         # Ищем все изображения в reader-scan
         images = soup.find_all('reader-scan', class_='reader-viewer-scan')
 
         print(f"Найдено {len(images)} изображений в главе {chapter_num}")
 
-        downloaded_pages = 0
-        
+        # Страницы качаются в служебную папку .chapter_NNN.part и заменяют прежнюю папку главы
+        # только целиком: сбой или отмена не трогают уже скачанные страницы
+        staging_folder = staging_path(chapter_folder)
+        shutil.rmtree(staging_folder, ignore_errors=True)
+        staging_folder.mkdir(parents=True)
+
+        # Собираем источники всех страниц, затем качаем их (при workers > 1 - параллельно)
+        pages = []
         for idx, scan in enumerate(images, 1):
-            if self.is_cancelled:
-                return None
-                
             img_tag = scan.find('img', class_='reader-viewer-img')
             if img_tag:
                 # Пробуем разные источники изображений
@@ -89,43 +290,88 @@ class MangaDownloader:
                     if data_src not in img_sources:
                         img_sources.append(data_src)
 
-                filename = f"page_{idx:03d}.jpg"
-                filepath = chapter_folder / filename
-
-                # Пробуем скачать из всех доступных источников
-                downloaded = False
-                for img_url in img_sources:
-                    print(f"Попытка скачать: {img_url}")
-                    if self.download_image(session, img_url, filepath, referer=url):
-                        downloaded = True
-                        downloaded_pages += 1
-                        break
-                    time.sleep(0.5)  # Небольшая задержка между попытками
-
-                if not downloaded:
-                    print(f"Не удалось скачать изображение {idx} для главы {chapter_num}")
-                    
-                # Обновляем прогресс после каждой страницы
+                pages.append((idx, img_sources))
+
+        with self._stats_lock:
+            self.stats['total_pages'] += len(pages)
+
+        completed = 0
+        progress_lock = threading.Lock()
+        sync = ChapterSync(staging_folder, self.fsync_batch)
+
+        def download_page(page, last_attempt=True):
+            nonlocal completed
+            idx, img_sources = page
+            if self.is_cancelled:
+                return False
+
+            filename = f"page_{idx:03d}.jpg"
+            filepath = staging_folder / filename
+
+            # Пробуем скачать из всех доступных источников
+            downloaded = False
+            for img_url in img_sources:
+                if self.download_image(session, img_url, filepath, referer=url, sync=sync):
+                    downloaded = True
+                    break
+                time.sleep(0.5)  # Небольшая задержка между попытками
+
+            if not downloaded and not last_attempt:
+                # Страница вернётся в очередь на повторную попытку
+                return False
+
+            DOWNLOADED_PAGES.inc(result="ok" if downloaded else "failed")
+            with self._stats_lock:
+                if downloaded:
+                    self.stats['downloaded_pages'] += 1
+                else:
+                    self.stats['failed_pages'] += 1
+            if not downloaded:
+                print(f"Не удалось скачать изображение {idx} для главы {chapter_num}")
+
+            # Обновляем прогресс после каждой страницы
+            with progress_lock:
+                completed += 1
                 if self.progress_callback:
-                    self.progress_callback(idx, len(images), chapter_num)
+                    self.progress_callback(completed, len(images), chapter_num)
+            return downloaded
+
+        def download_pages(pages, last_attempt):
+            if self.workers > 1 and len(pages) > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(executor.map(lambda page: download_page(page, last_attempt), pages))
+            else:
+                results = [download_page(page, last_attempt) for page in pages]
+            return [page for page, ok in zip(pages, results) if not ok]
+
+        try:
+            failed = download_pages(pages, last_attempt=False)
+            if failed and not self.is_cancelled:
+                # Битые и недокачанные страницы - ещё раз, после остальных
+                print(f"Повторная загрузка {len(failed)} страниц главы {chapter_num}")
+                with self._stats_lock:
+                    self.stats['retried_pages'] += len(failed)
+                time.sleep(1)
+                failed = download_pages(failed, last_attempt=True)
+        finally:
+            sync.flush()
+
+        if self.is_cancelled:
+            shutil.rmtree(staging_folder, ignore_errors=True)
+            return None
+        if any(staging_folder.iterdir()) and (not failed or not has_pages(chapter_folder)):
+            publish_chapter(staging_folder, chapter_folder, sync=self.fsync_batch > 0)
+        else:
+            if has_pages(chapter_folder):
+                print(f"Глава {chapter_num} скачана не полностью, оставлены страницы прошлого скачивания")
+            with self._stats_lock:
+                self.stats['failed_chapters'] += 1
+            shutil.rmtree(staging_folder, ignore_errors=True)
+        if pages:
+            DOWNLOAD_RATE.set(round(len(pages) / max(time.perf_counter() - chapter_started, 1e-6), 3))
 
         # Ищем ссылку на следующую главу
-        next_chapter_url = None
-
-        # Способ 1: Ищем в блоке с классом reader-alert
-        reader_alert = soup.find('div', class_='reader-alert')
-        if reader_alert:
-            next_link = reader_alert.find('a', class_='btn btn-secondary')
-            if next_link and 'Следующая глава' in next_link.get_text():
-                next_chapter_url = next_link.get('href')
-
-        # Способ 2: Ищем любую ссылку с текстом "Следующая глава"
-        if not next_chapter_url:
-            all_links = soup.find_all('a')
-            for link in all_links:
-                if 'Следующая глава' in link.get_text():
-                    next_chapter_url = link.get('href')
-                    break
+        next_chapter_url = find_next_chapter_link(soup)
 
         if next_chapter_url:
             print(f"Найдена ссылка на следующую главу: {next_chapter_url}")
@@ -134,43 +380,106 @@ class MangaDownloader:
 
         return next_chapter_url
 
-    def download_multiple_chapters(self, start_url, num_chapters, save_path):
-        """Основная функция для скачивания глав манги"""
+    def create_session(self):
+        """Сессия выбранного транспорта с пулом соединений по числу параллельных загрузок"""
+        session = create_transport(self.transport, pool_size=self.workers)
+        print(f"Транспорт: {session.protocol}")
+        return session
+
+    @staticmethod
+    def absolute_url(base_url, link):
+        """Преобразует относительную ссылку в абсолютную"""
+        if link.startswith('http'):
+            return link
+        return urljoin(base_url, link)
+
+    def fetch_next_link(self, session, url):
+        """Открывает страницу главы только ради ссылки на следующую (без скачивания изображений)"""
+        host = urlsplit(url).netloc
+        try:
+            started = time.perf_counter()
+            with self.connection_limiter:
+                response = session.get(url, timeout=30)
+            HTTP_LATENCY.observe(time.perf_counter() - started, host=host, kind="chapter")
+            HTTP_BYTES.inc(len(response.content), host=host)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Ошибка при загрузке страницы {url}: {e}")
+            HTTP_ERRORS.inc(host=host, kind="chapter")
+            return None
+        with self._stats_lock:
+            self.stats['index_fetches'] += 1
+        return find_next_chapter_link(BeautifulSoup(response.text, 'lxml'))
+
+    def locate_chapter(self, session, chapter_index, series_url, number):
+        """URL главы number серии, начинающейся с series_url.
+
+        Известные главы берутся из индекса; от последней известной идём по ссылкам
+        «Следующая глава», дописывая индекс. None - в серии нет столько глав.
+        """
+        known, url, next_url = chapter_index.nearest(series_url, number)
+        if known < number:
+            print(f"Глава {number}: в индексе есть до главы {known}, дальше - по ссылкам")
+        while known < number:
+            if self.is_cancelled:
+                return None
+            if not next_url:
+                next_link = self.fetch_next_link(session, url)
+                if not next_link:
+                    print(f"Серия {series_url} заканчивается на главе {known}")
+                    return None
+                next_url = self.absolute_url(url, next_link)
+                chapter_index.record(series_url, known, url, next_url)
+            known, url = known + 1, next_url
+            chapter = chapter_index.get(series_url, known)
+            next_url = chapter[1] if chapter and chapter[0] == url else None
+        return url
+
+    def download_multiple_chapters(self, start_url, num_chapters, save_path, first_chapter=1):
+        """Основная функция для скачивания глав манги.
+
+        first_chapter - номер первой главы, считая start_url первой главой серии;
+        её адрес берётся из индекса глав в save_path.
+        """
         print(f"Начинаем скачивание {num_chapters} глав...")
         print(f"Стартовый URL: {start_url}")
         print(f"Папка сохранения: {save_path}")
 
-        # Создаем сессию
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        session = self.create_session()
+        chapter_index = ChapterIndex(save_path)
+        try:
+            return self._download_chapters(session, chapter_index, start_url, num_chapters, save_path,
+                                           first_chapter)
+        finally:
+            chapter_index.close()
 
-        current_url = start_url
-        base_url = '/'.join(start_url.split('/')[:3])  # Получаем базовый URL
+    def _download_chapters(self, session, chapter_index, start_url, num_chapters, save_path, first_chapter):
+        current_url = self.locate_chapter(session, chapter_index, start_url, first_chapter)
+        if current_url is None:
+            return False
 
         successful_chapters = 0
+        self.stats['total_chapters'] = num_chapters
         
         for chapter_num in range(1, num_chapters + 1):
             if self.is_cancelled:
                 print("Скачивание отменено пользователем")
                 return False
+            number = first_chapter + chapter_num - 1
                 
-            print(f"\n=== Скачивание главы {chapter_num} ===")
+            print(f"\n=== Скачивание главы {number} ===")
             print(f"URL: {current_url}")
 
-            next_chapter = self.download_chapter(session, current_url, chapter_num, save_path)
+            next_chapter = self.download_chapter(session, current_url, number, save_path)
             
             if next_chapter is None and self.is_cancelled:
                 # Пользователь отменил скачивание
                 return False
+            chapter_index.record(start_url, number, current_url,
+                                 self.absolute_url(current_url, next_chapter) if next_chapter else None)
 
             if next_chapter and chapter_num < num_chapters:
-                # Преобразуем относительную ссылку в абсолютную
-                if next_chapter.startswith('http'):
-                    current_url = next_chapter
-                else:
-                    current_url = urljoin(base_url, next_chapter)
+                current_url = self.absolute_url(current_url, next_chapter)
                 print(f"Переход к следующей главе: {current_url}")
                 successful_chapters += 1
             else:
@@ -183,5 +492,9 @@ class MangaDownloader:
             # Задержка между главами
             time.sleep(1)
 
+        self.stats['downloaded_chapters'] = successful_chapters
         print(f"\nЗагрузка завершена! Успешно скачано глав: {successful_chapters}/{num_chapters}")
-        return successful_chapters > 0
\ No newline at end of file
+        return successful_chapters > 0
+
+    def get_stats(self):
+        return self.stats
\ No newline at end of file
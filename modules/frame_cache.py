@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+
+def fit_size(image_size, viewport_size):
+    """Размер изображения, вписанного в область просмотра (без увеличения)"""
+    img_width, img_height = image_size
+    viewport_width, viewport_height = viewport_size
+    scale = min(viewport_width / img_width, viewport_height / img_height, 1.0)
+    return max(int(img_width * scale), 1), max(int(img_height * scale), 1)
+
+
+def prepare_frame_image(frame_path, viewport_size):
+    """Декодирует фрейм и масштабирует его под область просмотра"""
+    image = Image.open(frame_path)
+    new_size = fit_size(image.size, viewport_size)
+    if new_size != image.size:
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    else:
+        image.load()
+    return image
+
+
+def prepare_preview_image(frame_path, viewport_size):
+    """Быстрый черновой вариант фрейма; возвращает (изображение, готово_ли_окончательно)"""
+    image = Image.open(frame_path)
+    new_size = fit_size(image.size, viewport_size)
+    if new_size == image.size:
+        # Масштабировать не нужно - черновик совпадает с окончательным вариантом
+        image.load()
+        return image, True
+
+    # JPEG умеет декодироваться сразу в уменьшенном масштабе, для PNG это no-op
+    image.draft(image.mode, new_size)
+    factor = min(image.width // new_size[0], image.height // new_size[1])
+    if factor >= 2:
+        image = image.reduce(factor)
+    return image.resize(new_size, Image.Resampling.NEAREST), False
+
+
+def image_nbytes(image):
+    """Оценка памяти, занимаемой декодированным изображением"""
+    return image.width * image.height * len(image.getbands())
+
+
+class FrameCache:
+    """LRU-кэш подготовленных фреймов с ограничением по памяти"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+            return image
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def put(self, key, image):
+        size = image_nbytes(image)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= image_nbytes(old)
+            self._items[key] = image
+            self.current_bytes += size
+            # Вытесняем самые давно использованные фреймы
+            while self.current_bytes > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= image_nbytes(evicted)
+
+    def discard_path(self, frame_path):
+        """Удаляет из кэша все варианты одного фрейма"""
+        path = str(frame_path)
+        with self._lock:
+            for key in [key for key in self._items if key[0] == path]:
+                self.current_bytes -= image_nbytes(self._items.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+
+class FramePrefetcher:
+    """Фоновый поток, заранее готовящий соседние фреймы в кэш"""
+
+    def __init__(self, cache, radius=3):
+        self.cache = cache
+        self.radius = radius
+        self._request = None
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, frames, index, viewport_size, include_current=False):
+        """Ставит в очередь соседей фрейма index; предыдущий запрос отменяется"""
+        # Сначала сам фрейм (если нужен), затем ближайшие: +1, -1, +2, -2 ...
+        paths = [frames[index]] if include_current else []
+        for offset in range(1, self.radius + 1):
+            for neighbour in (index + offset, index - offset):
+                if 0 <= neighbour < len(frames):
+                    paths.append(frames[neighbour])
+
+        with self._condition:
+            self._request = (paths, viewport_size)
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _has_new_request(self):
+        with self._condition:
+            return self._request is not None or self._stopped
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._request is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                paths, viewport_size = self._request
+                self._request = None
+
+            for frame_path in paths:
+                # Пользователь ушёл дальше - бросаем устаревший запрос
+                if self._has_new_request():
+                    break
+                key = (str(frame_path), viewport_size)
+                if key in self.cache:
+                    continue
+                try:
+                    self.cache.put(key, prepare_frame_image(frame_path, viewport_size))
+                except Exception as e:
+                    print(f"Ошибка предзагрузки {frame_path}: {e}")
@@ -0,0 +1,409 @@
+import bisect
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+CATALOG_FILENAME = ".frames_catalog.sqlite"
+
+
+# Раскладка папки фреймов: frames/<шард>/frame_NNNNNN.png, где шард - папка главы (chapter_001).
+# Старая плоская раскладка frames/frame_NNNNNN.png тоже поддерживается.
+# Папки, начинающиеся с точки (.thumbnails и т.п.), шардами не считаются.
+
+def shard_sort_key(name):
+    """Порядок шардов и файлов по числам в имени: chapter_999 раньше chapter_1000"""
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(re.split(r"(\d+)", name)))
+
+
+def _is_shard(entry):
+    return not entry.name.startswith(".") and entry.is_dir()
+
+
+def _is_frame(entry):
+    # Временные файлы перенумерации (.export_N.png) и прочие скрытые файлы фреймами не считаются
+    return not entry.name.startswith(".") and entry.name.endswith(".png") and entry.is_file()
+
+
+def has_frames(frames_path):
+    """Есть ли в папке хотя бы один фрейм (без полного листинга)"""
+    frames_path = Path(frames_path)
+    if not frames_path.exists():
+        return False
+    shards = []
+    with os.scandir(frames_path) as entries:
+        for entry in entries:
+            if _is_frame(entry):
+                return True
+            if _is_shard(entry):
+                shards.append(entry.path)
+    for shard in shards:
+        with os.scandir(shard) as entries:
+            if any(_is_frame(entry) for entry in entries):
+                return True
+    return False
+
+
+def clear_shard(shard_path):
+    """Удаляет фреймы одного шарда и саму папку, если она опустела"""
+    if not os.path.isdir(shard_path):
+        return
+    with os.scandir(shard_path) as entries:
+        for entry in entries:
+            if _is_frame(entry):
+                os.unlink(entry.path)
+    try:
+        os.rmdir(shard_path)
+    except OSError:
+        pass
+
+
+def clear_frames(frames_path):
+    """Удаляет все фреймы (плоские и в шардах) и опустевшие папки шардов"""
+    frames_path = Path(frames_path)
+    with os.scandir(frames_path) as entries:
+        top = list(entries)
+    for entry in top:
+        if _is_frame(entry):
+            os.unlink(entry.path)
+        elif _is_shard(entry):
+            clear_shard(entry.path)
+
+
+def _longest_sorted_run(keys):
+    """Индексы самой длинной неубывающей подпоследовательности keys (O(n log n))"""
+    tails = []      # индекс последнего элемента лучшей подпоследовательности каждой длины
+    tail_keys = []
+    previous = [-1] * len(keys)
+    for i, key in enumerate(keys):
+        length = bisect.bisect_right(tail_keys, key)
+        if length:
+            previous[i] = tails[length - 1]
+        if length == len(tails):
+            tails.append(i)
+            tail_keys.append(key)
+        else:
+            tails[length] = i
+            tail_keys[length] = key
+    kept = set()
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        kept.add(i)
+        i = previous[i]
+    return kept
+
+
+def _shard_range(shard):
+    """Границы путей шарда для выборки по индексу: 'chapter_001/' <= path < 'chapter_0010'"""
+    return shard + "/", shard + "0"
+
+
+class FrameCatalog:
+    """Каталог порядка фреймов в SQLite: перемещение и удаление меняют только метаданные"""
+
+    # Шаг между соседними позициями при начальной нумерации и перебалансировке
+    POSITION_STEP = 1024.0
+    # Минимальный зазор, при котором ещё можно вставить элемент между соседями
+    MIN_POSITION_GAP = 1e-6
+
+    def __init__(self, frames_path):
+        self.frames_path = Path(frames_path)
+        self.frames_path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.frames_path / CATALOG_FILENAME
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS frames (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL UNIQUE,
+                position REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_frames_position ON frames(position)")
+        # Время изменения шардов на момент последней сверки: неизменённые шарды не листаются
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS shards (
+                name TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            )
+        """)
+        # Журнал незавершённой перенумерации: после сбоя она доводится до конца при открытии каталога
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS export_journal (
+                frame_id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                temp_path TEXT NOT NULL,
+                final_path TEXT NOT NULL,
+                phase INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+        with self._lock:
+            self._finish_export_locked()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def relative(self, frame_path):
+        """Путь фрейма относительно папки фреймов - ключ в каталоге"""
+        return Path(frame_path).relative_to(self.frames_path).as_posix()
+
+    def _list_frames(self, directory, prefix=""):
+        with os.scandir(directory) as entries:
+            return sorted((prefix + entry.name for entry in entries if _is_frame(entry)), key=shard_sort_key)
+
+    def _reconcile_locked(self, known, on_disk):
+        """Удаляет записи об исчезнувших файлах и возвращает новые файлы"""
+        on_disk_set = set(on_disk)
+        missing = [(path,) for path in known if path not in on_disk_set]
+        if missing:
+            self.conn.executemany("DELETE FROM frames WHERE path = ?", missing)
+        known_set = set(known)
+        return [path for path in on_disk if path not in known_set]
+
+    def _reconcile(self):
+        """Сверка с папкой: удаляет записи об исчезнувших файлах.
+
+        Возвращает новые файлы (в порядке шардов и имён) и времена изменения листавшихся шардов:
+        их нужно записать только вместе с новыми файлами, иначе следующая сверка пропустит шард.
+        """
+        top_frames = []
+        shard_mtimes = {}
+        with os.scandir(self.frames_path) as entries:
+            for entry in entries:
+                if _is_frame(entry):
+                    top_frames.append(entry.name)
+                elif _is_shard(entry):
+                    # Время изменения берём до листинга: файлы, появившиеся позже, заметит следующая сверка
+                    shard_mtimes[entry.name] = entry.stat().st_mtime_ns
+        top_frames.sort()
+
+        with self._lock, self.conn:
+            new_paths = []
+            listed = {}
+
+            # Плоская раскладка
+            known = [row[0] for row in self.conn.execute("SELECT path FROM frames WHERE instr(path, '/') = 0")]
+            new_paths.extend(self._reconcile_locked(known, top_frames))
+
+            stored = dict(self.conn.execute("SELECT name, mtime_ns FROM shards"))
+
+            # Удалённые шарды
+            for shard in stored.keys() - shard_mtimes.keys():
+                self.conn.execute("DELETE FROM frames WHERE path >= ? AND path < ?", _shard_range(shard))
+                self.conn.execute("DELETE FROM shards WHERE name = ?", (shard,))
+
+            # Листаем только шарды, изменившиеся с прошлой сверки
+            for shard in sorted(shard_mtimes, key=shard_sort_key):
+                if stored.get(shard) == shard_mtimes[shard]:
+                    continue
+                on_disk = self._list_frames(self.frames_path / shard, shard + "/")
+                known = [row[0] for row in self.conn.execute(
+                    "SELECT path FROM frames WHERE path >= ? AND path < ?", _shard_range(shard))]
+                new_paths.extend(self._reconcile_locked(known, on_disk))
+                listed[shard] = shard_mtimes[shard]
+
+        return new_paths, listed
+
+    def _record_shards_locked(self, listed):
+        self.conn.executemany("INSERT OR REPLACE INTO shards (name, mtime_ns) VALUES (?, ?)", listed.items())
+
+    def sync(self):
+        """Сверяет каталог с папкой и возвращает относительные пути фреймов по порядку"""
+        new_paths, listed = self._reconcile()
+        with self._lock, self.conn:
+            # Новые файлы добавляем в конец в порядке шардов и имён
+            if new_paths:
+                self._append_locked(new_paths)
+            self._record_shards_locked(listed)
+        return self.ordered_paths()
+
+    def sync_chunks(self, chunk_size=2000):
+        """То же, что sync, но пути по порядку отдаются порциями, не дожидаясь всего списка.
+
+        Между порциями каталог не заблокирован: окно может работать с уже полученными фреймами.
+        """
+        new_paths, listed = self._reconcile()
+
+        # Известные фреймы - постранично по (позиция, id)
+        last = None
+        while True:
+            with self._lock:
+                if last is None:
+                    rows = self.conn.execute("SELECT path, position, id FROM frames ORDER BY position, id LIMIT ?",
+                                             (chunk_size,)).fetchall()
+                else:
+                    rows = self.conn.execute(
+                        "SELECT path, position, id FROM frames WHERE position > ? OR (position = ? AND id > ?) "
+                        "ORDER BY position, id LIMIT ?", (last[0], last[0], last[1], chunk_size)).fetchall()
+            if not rows:
+                break
+            last = rows[-1][1:]
+            yield [row[0] for row in rows]
+
+        # Новые файлы - в конец порядка, порция за порцией
+        for start in range(0, len(new_paths), chunk_size):
+            chunk = new_paths[start:start + chunk_size]
+            with self._lock, self.conn:
+                self._append_locked(chunk)
+            yield chunk
+        with self._lock, self.conn:
+            self._record_shards_locked(listed)
+
+    def _append_locked(self, paths):
+        row = self.conn.execute("SELECT MAX(position) FROM frames").fetchone()
+        last = row[0] if row[0] is not None else 0.0
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frames (path, position) VALUES (?, ?)",
+            [(path, last + (i + 1) * self.POSITION_STEP) for i, path in enumerate(paths)]
+        )
+
+    def append(self, paths):
+        """Добавляет фреймы в конец порядка"""
+        with self._lock, self.conn:
+            self._append_locked(list(paths))
+
+    def ordered_paths(self):
+        """Относительные пути фреймов в порядке просмотра"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT path FROM frames ORDER BY position, id")]
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM frames").fetchone()[0]
+
+    def _position_locked(self, path):
+        if path is None:
+            return None
+        row = self.conn.execute("SELECT position FROM frames WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            raise KeyError(path)
+        return row[0]
+
+    def move(self, path, prev_path=None, next_path=None):
+        """Ставит фрейм между соседями prev_path и next_path (None - край списка)"""
+        with self._lock, self.conn:
+            prev_pos = self._position_locked(prev_path)
+            next_pos = self._position_locked(next_path)
+
+            if prev_pos is not None and next_pos is not None and next_pos - prev_pos < self.MIN_POSITION_GAP:
+                # Зазор исчерпан - один раз перенумеровываем позиции (только метаданные)
+                self._rebalance_locked()
+                prev_pos = self._position_locked(prev_path)
+                next_pos = self._position_locked(next_path)
+
+            if prev_pos is None and next_pos is None:
+                position = 0.0
+            elif prev_pos is None:
+                position = next_pos - self.POSITION_STEP
+            elif next_pos is None:
+                position = prev_pos + self.POSITION_STEP
+            else:
+                position = (prev_pos + next_pos) / 2
+
+            self.conn.execute("UPDATE frames SET position = ? WHERE path = ?", (position, path))
+
+    def remove(self, path):
+        """Удаляет запись о фрейме (файл удаляет вызывающий код)"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM frames WHERE path = ?", (path,))
+
+    def remove_shard(self, shard):
+        """Удаляет записи обо всех фреймах шарда"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM frames WHERE path >= ? AND path < ?", _shard_range(shard))
+            self.conn.execute("DELETE FROM shards WHERE name = ?", (shard,))
+
+    def clear(self):
+        """Очищает каталог (например, перед повторной нарезкой)"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM frames")
+            self.conn.execute("DELETE FROM shards")
+
+    def _rebalance_locked(self):
+        rows = self.conn.execute("SELECT id FROM frames ORDER BY position").fetchall()
+        self.conn.executemany(
+            "UPDATE frames SET position = ? WHERE id = ?",
+            [((i + 1) * self.POSITION_STEP, row[0]) for i, row in enumerate(rows)]
+        )
+
+    def _export_targets_locked(self):
+        """Новые пути фреймов: сверка папки заново (шарды по имени, внутри - по имени) даст тот же порядок.
+
+        Шарды вдоль порядка (по shard_sort_key) не должны убывать. Большинство фреймов (самая длинная неубывающая
+        подпоследовательность шардов) остаются в своих шардах; фрейм, перемещённый к фреймам
+        другой главы, переносится в шард соседа - предыдущего оставшегося на месте фрейма
+        (в начале списка - следующего). Внутри шарда файлы нумеруются заново с нуля.
+        """
+        rows = self.conn.execute("SELECT id, path FROM frames ORDER BY position").fetchall()
+        shards = [path.rpartition("/")[0] for _, path in rows]
+        kept = _longest_sorted_run([shard_sort_key(shard) for shard in shards])
+
+        targets = []
+        shard_counts = {}
+        neighbour = shards[min(kept)] if kept else ""
+        for i, (frame_id, path) in enumerate(rows):
+            if i in kept:
+                neighbour = shards[i]
+            shard = neighbour
+            number = shard_counts.get(shard, 0)
+            shard_counts[shard] = number + 1
+            prefix = shard + "/" if shard else ""
+            expected = f"{prefix}frame_{number:06d}.png"
+            if path != expected:
+                targets.append((frame_id, path, f"{prefix}.export_{frame_id}.png", expected))
+        return targets
+
+    def _finish_export_locked(self):
+        """Доводит до конца перенумерацию из журнала; возвращает число переименованных фреймов.
+
+        Этап 1 - исходные имена во временные, этап 2 - временные в окончательные. Переименования
+        повторяемы: уже перенесённые файлы пропускаются, поэтому после сбоя достаточно запустить снова.
+        """
+        rows = self.conn.execute(
+            "SELECT frame_id, path, temp_path, final_path, phase FROM export_journal ORDER BY frame_id").fetchall()
+        if not rows:
+            return 0
+
+        if rows[0][4] == 1:
+            for _, path, temp_path, _, _ in rows:
+                source = self.frames_path / path
+                if not (self.frames_path / temp_path).exists() and source.exists():
+                    source.rename(self.frames_path / temp_path)
+            with self.conn:
+                self.conn.execute("UPDATE export_journal SET phase = 2")
+
+        for _, _, temp_path, final_path, _ in rows:
+            temp = self.frames_path / temp_path
+            if temp.exists():
+                temp.rename(self.frames_path / final_path)
+
+        with self.conn:
+            # Через временные пути: окончательный путь может быть ещё занят старой записью соседа
+            self.conn.executemany("UPDATE frames SET path = ? WHERE id = ?",
+                                  [(temp_path, frame_id) for frame_id, _, temp_path, _, _ in rows])
+            self.conn.executemany("UPDATE frames SET path = ? WHERE id = ?",
+                                  [(final_path, frame_id) for frame_id, _, _, final_path, _ in rows])
+            self.conn.execute("DELETE FROM export_journal")
+            self._rebalance_locked()
+        return len(rows)
+
+    def export(self):
+        """Физически переименовывает файлы в frame_NNNNNN.png по текущему порядку (нумерация в каждом шарде своя)"""
+        with self._lock:
+            # Временные имена (сразу в целевом шарде) не дают перезаписать соседей
+            targets = self._export_targets_locked()
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO export_journal (frame_id, path, temp_path, final_path, phase) VALUES (?, ?, ?, ?, 1)",
+                    targets)
+            if targets:
+                return self._finish_export_locked()
+            with self.conn:
+                self._rebalance_locked()
+            return 0
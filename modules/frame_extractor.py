@@ -1,13 +1,43 @@
 import os
+import shutil
 import cv2
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+from .chapter_leases import ChapterLeases, default_owner, reset_leases
+from .frame_catalog import FrameCatalog, clear_frames, shard_sort_key
+from .memory_budget import estimate_page_bytes, pool_kwargs, reserve_memory
+from .metrics import REGISTRY
+from .shared_pages import SharedPagePool, attach_page
+from .text_regions import prepare_gray
+
+EXTRACTED_FRAMES = REGISTRY.counter("manga_extract_frames_total", "Создано фреймов")
+EXTRACTED_IMAGES = REGISTRY.counter("manga_extract_images_total", "Обработано страниц по результату", ("result",))
+IMAGE_SECONDS = REGISTRY.histogram("manga_extract_image_seconds", "Время нарезки одной страницы")
+EXTRACT_RATE = REGISTRY.gauge("manga_extract_frames_per_second", "Скорость нарезки последнего запуска")
+
+
+def record_extraction_metrics(stats, seconds=None):
+    """Переносит итоги нарезки (в т.ч. из дочерних процессов) в метрики"""
+    EXTRACTED_FRAMES.inc(stats['total_frames'])
+    EXTRACTED_IMAGES.inc(stats['processed_images'], result="ok")
+    EXTRACTED_IMAGES.inc(stats['failed_images'], result="failed")
+    if seconds:
+        EXTRACT_RATE.set(round(stats['total_frames'] / seconds, 3))
+
 
 class FrameExtractor:
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, frames_callback=None):
         self.progress_callback = progress_callback
+        # Вызывается с путями новых фреймов (относительно папки фреймов) после каждого изображения
+        self.frames_callback = frames_callback
+        self.written_frames = []
+        # Номер следующего фрейма внутри текущего шарда (папки главы)
+        self.frame_index = 0
         self.stats = {
             'total_chapters': 0,
             'processed_chapters': 0,
@@ -21,6 +51,12 @@ class FrameExtractor:
     
     def make_frames(self, image_path, frames_dir, pxl_gap=120, indent=30):
         """Алгоритм нарезки на фреймы по горизонтальным разрывам"""
+        # Память под декодирование резервируется заранее по размерам из заголовка
+        with reserve_memory(estimate_page_bytes(image_path)):
+            return self.slice_page(image_path, frames_dir, pxl_gap, indent)
+    
+    def slice_page(self, image_path, frames_dir, pxl_gap=120, indent=30):
+        """Декодирует страницу и сохраняет её фреймы; при неудаче - демо-фреймы"""
         try:
             # В демо-версии создаем несколько фреймов на основе исходного изображения
             # или создаем демо-фреймы если изображение не найдено
@@ -33,61 +69,11 @@ class FrameExtractor:
                 return self.create_demo_frames(image_path, frames_dir)
             
             # Реальная обработка изображения
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (3, 3), 0)
-            
-            edged = cv2.Canny(gray, 10, 250)
-            
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
-            closed = cv2.morphologyEx(edged, cv2.MORPH_CLOSE, kernel)
-            
-            contours, hierarchy = cv2.findContours(closed.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-            
-            Y = []
-            for contour in contours:
-                for coord in contour:
-                    y = coord[0][1]
-                    Y.append(y)
-            
-            if not Y:
-                return self.create_demo_frames(image_path, frames_dir)
-                
-            Y.sort()
-            
-            screens = []
-            screen = [min(Y), 0]
-
-            for i in range(1, len(Y)):
-                if Y[i] - Y[i-1] > pxl_gap:
-                    screen[1] = Y[i-1] + indent
-                    if screen[1] > screen[0]:
-                        screens.append(screen)
-                    screen = [Y[i] - indent, 0]
-            
-            if screen[0] > 0:
-                screen[1] = max(Y) + indent
-                if screen[1] > screen[0]:
-                    screens.append(screen)
-            
-            X = [0, img.shape[1]]
+            screens = find_frame_bounds(img, pxl_gap, indent)
             
             frames_count = 0
-            for i, screen in enumerate(screens):
-                y_start, y_end = screen
-                y_start = max(0, y_start)
-                y_end = min(img.shape[0], y_end)
-                
-                if y_end <= y_start:
-                    continue
-                    
-                frame_img = img[y_start:y_end, X[0]:X[1]]
-                
-                if frame_img.size == 0:
-                    continue
-                
-                frame_filename = frames_dir / f"frame_{self.stats['total_frames']:06d}.png"
-                cv2.imwrite(str(frame_filename), frame_img)
-                self.stats['total_frames'] += 1
+            for y_start, y_end in screens:
+                self.save_frame(frames_dir, img[y_start:y_end, :])
                 frames_count += 1
             
             # Если не нашли фреймов, создаем демо
@@ -100,6 +86,25 @@ class FrameExtractor:
             print(f"Ошибка при обработке {image_path.name}: {str(e)}")
             return self.create_demo_frames(image_path, frames_dir)
     
+    def save_frame(self, frames_dir, frame_img):
+        """Сохраняет фрейм под следующим номером и запоминает его для каталога"""
+        frame_filename = frames_dir / f"frame_{self.frame_index:06d}.png"
+        cv2.imwrite(str(frame_filename), frame_img)
+        self.frame_index += 1
+        self.stats['total_frames'] += 1
+        self.written_frames.append(frame_filename)
+        return frame_filename
+    
+    def publish_frames(self, catalog):
+        """Добавляет новые фреймы в каталог и сообщает о них (например, открытому просмотрщику)"""
+        if not self.written_frames:
+            return
+        frames, self.written_frames = self.written_frames, []
+        frames = [catalog.relative(frame) for frame in frames]
+        catalog.append(frames)
+        if self.frames_callback:
+            self.frames_callback(frames)
+    
     def create_demo_frames(self, image_path, frames_dir):
         """Создать демонстрационные фреймы"""
         try:
@@ -122,142 +127,434 @@ class FrameExtractor:
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
                 
                 # Сохраняем фрейм
-                frame_filename = frames_dir / f"frame_{self.stats['total_frames']:06d}.png"
-                cv2.imwrite(str(frame_filename), img)
-                self.stats['total_frames'] += 1
+                self.save_frame(frames_dir, img)
             
             return num_frames
         except Exception as e:
             print(f"Ошибка создания демо-фреймов: {e}")
             return 0
     
-    def process_images(self, chapters_path, frames_output_path):
-        """Основной процесс обработки"""
-        self.stats['start_time'] = datetime.now()
-        
-        frames_dir = Path(frames_output_path)
-        frames_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Очищаем предыдущие фреймы
-        for old_frame in frames_dir.glob("*.png"):
-            old_frame.unlink()
-        
-        chapters = sorted([p for p in Path(chapters_path).iterdir() 
-                          if p.is_dir() and p.name.startswith('chapter_')])
-        
-        self.stats['total_chapters'] = len(chapters)
+    def get_stats(self):
+        return self.stats
+    
+    def extract_chapter(self, chapter_path, shard_dir, catalog=None, on_image=None):
+        """Нарезает все изображения одной главы в её шард; возвращает пути фреймов, если каталога нет"""
+        shard_dir.mkdir(exist_ok=True)
+        self.frame_index = 0
+        chapter_frames = []
         
-        if self.stats['total_chapters'] == 0:
-            return False, "Папки глав не найдены"
+        for image_path in list_chapter_images(chapter_path):
+            started = time.perf_counter()
+            frames_count = self.make_frames(image_path, shard_dir)
+            IMAGE_SECONDS.observe(time.perf_counter() - started)
+            if catalog is not None:
+                # Порядок пополняется сразу, чтобы фреймы были видны до конца нарезки
+                self.publish_frames(catalog)
+            else:
+                chapter_frames.extend(self.written_frames)
+                self.written_frames = []
+            
+            if frames_count > 0:
+                self.stats['processed_images'] += 1
+                print(f"  {image_path.name} -> {frames_count} фреймов")
+            else:
+                self.stats['failed_images'] += 1
+                print(f"  {image_path.name} -> ошибка")
+            
+            if on_image:
+                on_image()
         
-        total_images = 0
-        for chapter_path in chapters:
-            images = []
-            for ext in ['*.png', '*.jpg', '*.jpeg']:
-                images.extend(chapter_path.glob(ext))
-            total_images += len(images)
+        self.stats['processed_chapters'] += 1
+        return chapter_frames
+    
+    def extract_chapter_shared(self, chapter_path, shard_dir, executor, pool, catalog=None, on_image=None):
+        """Нарезка главы постранично: декодирование здесь, поиск и запись фреймов - в процессах executor.
         
-        self.stats['total_images'] = total_images
+        Декодированная страница передаётся через слэб pool (без сериализации массива); слэб
+        освобождается, когда страница записана. Номера фреймов и каталог - строго в порядке страниц.
+        """
+        shard_dir.mkdir(exist_ok=True)
+        self.frame_index = 0
+        chapter_frames = []
+        analyses = deque()  # (страница, слэб или None, будущие границы фреймов)
+        saves = deque()     # (страница, будущие пути фреймов, записаны ли фреймы мимо save_frame)
         
-        if total_images == 0:
-            return False, "Изображения не найдены"
+        def completed(result):
+            future = Future()
+            future.set_result(result)
+            return future
         
-        processed_images = 0
-        
-        for chapter_idx, chapter_path in enumerate(chapters, 1):
-            images = []
-            for ext in ['*.png', '*.jpg', '*.jpeg']:
-                images.extend(sorted(chapter_path.glob(ext)))
-            
-            for image_idx, image_path in enumerate(images, 1):
-                frames_count = self.make_frames(image_path, frames_dir)
+        def finish_saves(block):
+            while saves and (block or saves[0][1].done()):
+                image_path, future, worker_frames = saves.popleft()
+                try:
+                    frames = [Path(frame) for frame in future.result()]
+                except Exception as e:
+                    print(f"Ошибка при записи фреймов {image_path.name}: {e}")
+                    frames = []
+                if worker_frames:
+                    self.stats['total_frames'] += len(frames)
                 
-                if frames_count > 0:
+                if frames:
                     self.stats['processed_images'] += 1
+                    print(f"  {image_path.name} -> {len(frames)} фреймов")
                 else:
                     self.stats['failed_images'] += 1
+                    print(f"  {image_path.name} -> ошибка")
+                if catalog is not None:
+                    self.written_frames = frames
+                    self.publish_frames(catalog)
+                else:
+                    chapter_frames.extend(frames)
+                if on_image:
+                    on_image()
+        
+        def finish_analyses(block):
+            # block - дождаться хотя бы самой старой страницы
+            if block and analyses:
+                wait([analyses[0][2]])
+            while analyses and analyses[0][2].done():
+                image_path, handle, future = analyses.popleft()
+                try:
+                    bounds = future.result()
+                except Exception as e:
+                    print(f"Ошибка при обработке {image_path.name}: {e}")
+                    bounds = []
                 
-                processed_images += 1
-                
-                if self.progress_callback:
-                    self.progress_callback(processed_images, total_images, chapter_idx, len(chapters))
-                
-                # Небольшая задержка для демонстрации прогресса
-                time.sleep(0.1)
-            
-            self.stats['processed_chapters'] += 1
+                if not bounds:
+                    if handle is not None:
+                        pool.release(handle.slab)
+                    self.create_demo_frames(image_path, shard_dir)
+                    frames, self.written_frames = self.written_frames, []
+                    saves.append((image_path, completed([str(frame) for frame in frames]), False))
+                else:
+                    save = executor.submit(save_shared_page, handle, bounds, str(shard_dir), self.frame_index)
+                    save.add_done_callback(lambda _, slab=handle.slab: pool.release(slab))
+                    saves.append((image_path, save, True))
+                self.frame_index += len(bounds)
+            finish_saves(False)
         
-        self.stats['end_time'] = datetime.now()
-        return True, f"Обработка завершена. Создано {self.stats['total_frames']} фреймов."
-    
-    def get_stats(self):
-        return self.stats
+        def slice_locally(image_path):
+            # Страница больше слэба нарезается здесь целиком, память зарезервирована до записи фреймов.
+            # Предыдущие страницы дорабатываем заранее: номера фреймов идут по порядку, а ожидание
+            # процессов с уже зарезервированной памятью могло бы заблокировать бюджет
+            while analyses:
+                finish_analyses(True)
+            bounds = []
+            with reserve_memory(estimate_page_bytes(image_path)):
+                img = cv2.imread(str(image_path))
+                try:
+                    bounds = find_frame_bounds(img) if img is not None else []
+                    if bounds:
+                        frames = save_frame_slices(img, bounds, shard_dir, self.frame_index)
+                        saves.append((image_path, completed(frames), True))
+                        self.frame_index += len(bounds)
+                except Exception as e:
+                    print(f"Ошибка при обработке {image_path.name}: {e}")
+                    bounds = []
+            if not bounds:
+                analyses.append((image_path, None, completed([])))
+        
+        for image_path in list_chapter_images(chapter_path):
+            page_bytes = estimate_page_bytes(image_path, working_factor=1)
+            if page_bytes > pool.slab_bytes:
+                slice_locally(image_path)
+                finish_analyses(False)
+                continue
+            # Сначала ждём свободный слэб, и только потом резервируем память и декодируем:
+            # ожидание с уже декодированной страницей могло бы заблокировать бюджет
+            slab = pool.acquire(timeout=0.05)
+            while slab is None:
+                # Все слэбы заняты: продвигаем готовые страницы, пока какой-нибудь не освободится
+                finish_analyses(True)
+                slab = pool.acquire(timeout=0.05)
+            # Декодированная страница живёт здесь только до копирования в слэб
+            with reserve_memory(page_bytes):
+                img = cv2.imread(str(image_path))
+                handle = pool.put(img, slab=slab) if img is not None and pool.fits(img) else None
+                oversized = img is not None and handle is None
+                img = None
+            if handle is not None:
+                analyses.append((image_path, handle, executor.submit(analyze_shared_page, handle)))
+            else:
+                pool.release(slab)
+                if oversized:
+                    # Оценка по заголовку ошиблась: декодируем заново под полным резервом
+                    slice_locally(image_path)
+                else:
+                    analyses.append((image_path, None, completed([])))
+            finish_analyses(False)
+        
+        while analyses:
+            finish_analyses(True)
+        finish_saves(True)
+        
+        self.stats['processed_chapters'] += 1
+        return chapter_frames
     
-    def process_images(self, chapters_path, frames_output_path):
-        """Основной процесс обработки"""
+    def process_images(self, chapters_path, frames_output_path, processes=1):
+        """Основной процесс обработки (processes > 1 - главы нарезаются параллельно в отдельных процессах)"""
         print(f"Начинаем обработку глав из {chapters_path}")
         self.stats['start_time'] = datetime.now()
         
         frames_dir = Path(frames_output_path)
         frames_dir.mkdir(parents=True, exist_ok=True)
         
-        # Очищаем предыдущие фреймы
-        for old_frame in frames_dir.glob("*.png"):
-            old_frame.unlink()
+        # Очищаем предыдущие фреймы (плоские и по шардам) и их порядок в каталоге
+        clear_frames(frames_dir)
+        reset_leases(frames_dir)
+        catalog = FrameCatalog(frames_dir)
+        catalog.clear()
         
         chapters = sorted([p for p in Path(chapters_path).iterdir() 
-                        if p.is_dir() and p.name.startswith('chapter_')])
+                        if p.is_dir() and p.name.startswith('chapter_')], key=lambda p: shard_sort_key(p.name))
         
         self.stats['total_chapters'] = len(chapters)
         print(f"Найдено глав: {self.stats['total_chapters']}")
         
         if self.stats['total_chapters'] == 0:
+            catalog.close()
             return False, "Папки глав не найдены"
         
-        total_images = 0
+        chapter_sizes = []
         for chapter_path in chapters:
-            images = []
-            for ext in ['*.png', '*.jpg', '*.jpeg']:
-                images.extend(chapter_path.glob(ext))
-            total_images += len(images)
-            print(f"Глава {chapter_path.name}: {len(images)} изображений")
+            chapter_sizes.append(len(list_chapter_images(chapter_path)))
+            print(f"Глава {chapter_path.name}: {chapter_sizes[-1]} изображений")
+        total_images = sum(chapter_sizes)
         
         self.stats['total_images'] = total_images
         print(f"Всего изображений: {total_images}")
         
         if total_images == 0:
+            catalog.close()
             return False, "Изображения не найдены"
         
         processed_images = 0
         
-        for chapter_idx, chapter_path in enumerate(chapters, 1):
-            images = []
-            for ext in ['*.png', '*.jpg', '*.jpeg']:
-                images.extend(sorted(chapter_path.glob(ext)))
-            
-            print(f"Обработка главы {chapter_path.name} ({chapter_idx}/{len(chapters)})")
-            
-            for image_idx, image_path in enumerate(images, 1):
-                frames_count = self.make_frames(image_path, frames_dir)
-                
-                if frames_count > 0:
-                    self.stats['processed_images'] += 1
-                    print(f"  {image_path.name} -> {frames_count} фреймов")
-                else:
-                    self.stats['failed_images'] += 1
-                    print(f"  {image_path.name} -> ошибка")
-                
-                processed_images += 1
+        if 1 < processes and len(chapters) < processes:
+            # Глав меньше, чем процессов: параллелим страницы внутри главы через разделяемую память
+            with ProcessPoolExecutor(max_workers=processes, **pool_kwargs()) as executor, \
+                    SharedPagePool(slabs=processes + 1) as pool:
+                for chapter_idx, chapter_path in enumerate(chapters, 1):
+                    print(f"Обработка главы {chapter_path.name} ({chapter_idx}/{len(chapters)})")
+                    
+                    def on_image():
+                        nonlocal processed_images
+                        processed_images += 1
+                        if self.progress_callback:
+                            self.progress_callback(processed_images, total_images, chapter_idx, len(chapters))
+                    
+                    self.extract_chapter_shared(chapter_path, frames_dir / chapter_path.name,
+                                                executor, pool, catalog, on_image)
+        elif processes > 1:
+            # Каждая глава - в своём шарде, поэтому процессы не мешают друг другу;
+            # в каталог результаты попадают строго в порядке глав
+            with ProcessPoolExecutor(max_workers=processes, **pool_kwargs()) as executor:
+                futures = [executor.submit(extract_chapter_worker, str(chapter_path), str(frames_dir / chapter_path.name))
+                           for chapter_path in chapters]
+                for chapter_idx, (chapter_path, future) in enumerate(zip(chapters, futures), 1):
+                    frames, chapter_stats = future.result()
+                    self.written_frames = [Path(frame) for frame in frames]
+                    self.publish_frames(catalog)
+                    for key in ('processed_images', 'failed_images', 'total_frames', 'processed_chapters'):
+                        self.stats[key] += chapter_stats[key]
+                    
+                    processed_images += chapter_sizes[chapter_idx - 1]
+                    print(f"Глава {chapter_path.name} готова ({chapter_idx}/{len(chapters)})")
+                    if self.progress_callback:
+                        self.progress_callback(processed_images, total_images, chapter_idx, len(chapters))
+        else:
+            for chapter_idx, chapter_path in enumerate(chapters, 1):
+                print(f"Обработка главы {chapter_path.name} ({chapter_idx}/{len(chapters)})")
                 
-                if self.progress_callback:
-                    self.progress_callback(processed_images, total_images, chapter_idx, len(chapters))
+                def on_image():
+                    nonlocal processed_images
+                    processed_images += 1
+                    if self.progress_callback:
+                        self.progress_callback(processed_images, total_images, chapter_idx, len(chapters))
                 
-                # Небольшая задержка для демонстрации прогресса
-                time.sleep(0.05)
-            
-            self.stats['processed_chapters'] += 1
+                # Фреймы каждой главы - в своём шарде, чтобы не держать все файлы в одной папке
+                self.extract_chapter(chapter_path, frames_dir / chapter_path.name, catalog, on_image)
         
+        catalog.close()
         self.stats['end_time'] = datetime.now()
+        record_extraction_metrics(self.stats, (self.stats['end_time'] - self.stats['start_time']).total_seconds())
         success_message = f"Обработка завершена. Создано {self.stats['total_frames']} фреймов."
         print(success_message)
-        return True, success_message
\ No newline at end of file
+        return True, success_message
+    
+    def process_shared(self, chapters_path, frames_output_path, processes=1, owner=None, lease_ttl=300, wait=True):
+        """Нарезка общей (сетевой) папки глав вместе с другими узлами: главы разбираются через аренду.
+        
+        Папка фреймов не очищается - её одновременно пополняют другие исполнители. Каталог порядка
+        здесь не трогаем (SQLite на сетевой ФС ненадёжен): просмотрщик подхватит готовые шарды сам.
+        При wait=True ждём, пока не будут готовы и главы, взятые другими узлами (брошенные перехватываем).
+        """
+        print(f"Начинаем совместную обработку глав из {chapters_path}")
+        self.stats['start_time'] = datetime.now()
+        owner = owner or default_owner()
+        frames_dir = Path(frames_output_path)
+        frames_dir.mkdir(parents=True, exist_ok=True)
+        
+        chapters = sorted((p.name for p in Path(chapters_path).iterdir()
+                           if p.is_dir() and p.name.startswith('chapter_')), key=shard_sort_key)
+        self.stats['total_chapters'] = len(chapters)
+        if not chapters:
+            return False, "Папки глав не найдены"
+        
+        args = [(str(chapters_path), str(frames_dir), f"{owner}-{i}" if processes > 1 else owner, lease_ttl, wait)
+                for i in range(max(1, processes))]
+        if processes > 1:
+            with ProcessPoolExecutor(max_workers=processes, **pool_kwargs()) as executor:
+                results = list(executor.map(shared_worker_loop, *zip(*args)))
+        else:
+            results = [shared_worker_loop(*args[0], progress_callback=self.progress_callback)]
+        
+        for worker_stats in results:
+            for key in ('processed_chapters', 'total_images', 'processed_images', 'failed_images', 'total_frames'):
+                self.stats[key] += worker_stats[key]
+        
+        leases = ChapterLeases(frames_dir, owner, lease_ttl)
+        done = sum(1 for chapter in chapters if leases.is_done(chapter))
+        self.stats['end_time'] = datetime.now()
+        record_extraction_metrics(self.stats, (self.stats['end_time'] - self.stats['start_time']).total_seconds())
+        message = (f"Совместная обработка: готово глав {done}/{len(chapters)}, "
+                   f"из них этим узлом {self.stats['processed_chapters']} ({self.stats['total_frames']} фреймов).")
+        print(message)
+        return done == len(chapters), message
+
+
+def find_frame_bounds(img, pxl_gap=120, indent=30):
+    """Границы фреймов (y_start, y_end) по горизонтальным разрывам между контурами"""
+    gray = prepare_gray(img)
+    
+    edged = cv2.Canny(gray, 10, 250)
+    
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
+    closed = cv2.morphologyEx(edged, cv2.MORPH_CLOSE, kernel)
+    
+    contours, hierarchy = cv2.findContours(closed.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    
+    Y = []
+    for contour in contours:
+        for coord in contour:
+            y = coord[0][1]
+            Y.append(y)
+    
+    if not Y:
+        return []
+        
+    Y.sort()
+    
+    screens = []
+    screen = [min(Y), 0]
+
+    for i in range(1, len(Y)):
+        if Y[i] - Y[i-1] > pxl_gap:
+            screen[1] = Y[i-1] + indent
+            if screen[1] > screen[0]:
+                screens.append(screen)
+            screen = [Y[i] - indent, 0]
+    
+    if screen[0] > 0:
+        screen[1] = max(Y) + indent
+        if screen[1] > screen[0]:
+            screens.append(screen)
+    
+    bounds = []
+    for y_start, y_end in screens:
+        y_start = max(0, int(y_start))
+        y_end = min(img.shape[0], int(y_end))
+        if y_end > y_start and img.shape[1] > 0:
+            bounds.append((y_start, y_end))
+    return bounds
+
+
+def save_frame_slices(img, bounds, frames_dir, start_index):
+    """Записывает фреймы страницы под номерами start_index, start_index + 1, ..."""
+    frames = []
+    for i, (y_start, y_end) in enumerate(bounds):
+        frame_filename = Path(frames_dir) / f"frame_{start_index + i:06d}.png"
+        cv2.imwrite(str(frame_filename), img[y_start:y_end, :])
+        frames.append(str(frame_filename))
+    return frames
+
+
+def analyze_shared_page(handle, pxl_gap=120, indent=30):
+    """Поиск фреймов страницы из слэба разделяемой памяти (в дочернем процессе)"""
+    height, width = handle.shape[:2]
+    # Сама страница уже в слэбе; резервируем только промежуточные серые изображения
+    with reserve_memory(width * height * 4):
+        return find_frame_bounds(attach_page(handle), pxl_gap, indent)
+
+
+def save_shared_page(handle, bounds, frames_dir, start_index):
+    """Запись фреймов страницы из слэба разделяемой памяти (в дочернем процессе)"""
+    return save_frame_slices(attach_page(handle), bounds, frames_dir, start_index)
+
+
+def list_chapter_images(chapter_path):
+    """Изображения главы в порядке обработки"""
+    images = []
+    for ext in ['*.png', '*.jpg', '*.jpeg']:
+        images.extend(sorted(Path(chapter_path).glob(ext), key=lambda p: shard_sort_key(p.name)))
+    return images
+
+
+def extract_chapter_worker(chapter_path, shard_dir):
+    """Нарезка одной главы в дочернем процессе; возвращает пути фреймов и статистику"""
+    extractor = FrameExtractor()
+    frames = extractor.extract_chapter(Path(chapter_path), Path(shard_dir))
+    return [str(frame) for frame in frames], extractor.get_stats()
+
+
+def shared_worker_loop(chapters_path, frames_path, owner, lease_ttl=300, wait=True, progress_callback=None):
+    """Цикл исполнителя: берёт свободные (или брошенные) главы, пока не кончатся"""
+    chapters_path = Path(chapters_path)
+    leases = ChapterLeases(frames_path, owner, lease_ttl)
+    extractor = FrameExtractor()
+    
+    while True:
+        chapters = sorted((p.name for p in chapters_path.iterdir()
+                           if p.is_dir() and p.name.startswith('chapter_')), key=shard_sort_key)
+        pending = [chapter for chapter in chapters if not leases.is_done(chapter)]
+        if not pending:
+            break
+        
+        claimed = None
+        for chapter in pending:
+            if leases.try_claim(chapter):
+                claimed = chapter
+                break
+        
+        if claimed is None:
+            if not wait:
+                break
+            # Остальное в работе у других узлов: ждём их завершения или истечения аренды
+            time.sleep(min(10.0, max(1.0, lease_ttl / 3)))
+            continue
+        
+        print(f"[{owner}] Обработка главы {claimed}")
+        stop, lost = leases.keep_alive(claimed)
+        try:
+            # Остатки собственной прерванной попытки
+            work_dir = leases.work_dir(claimed)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            images = list_chapter_images(chapters_path / claimed)
+            extractor.stats['total_images'] += len(images)
+            frames = extractor.extract_chapter(chapters_path / claimed, work_dir)
+        except BaseException:
+            stop.set()
+            leases.release(claimed)
+            raise
+        stop.set()
+        
+        if lost.is_set() or not leases.complete(claimed, len(frames)):
+            print(f"[{owner}] Аренда главы {claimed} потеряна, результат отброшен")
+            continue
+        print(f"[{owner}] Глава {claimed} готова: {len(frames)} фреймов")
+        if progress_callback:
+            done = sum(1 for chapter in chapters if leases.is_done(chapter))
+            progress_callback(done, len(chapters), done, len(chapters))
+    
+    return extractor.get_stats()
@@ -2,12 +2,23 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 import threading
+import queue
 from PIL import Image, ImageTk
 import os
-import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from .download_manga_chapter import MangaDownloader
-from .frame_extractor import FrameExtractor
+from .frame_catalog import has_frames
+from .thumbnail_cache import ThumbnailCache
+from .progress_bus import ProgressBus
+from .viewer_model import ViewerModel
+from .metrics import REGISTRY
+
+FRAME_LOAD_SECONDS = REGISTRY.histogram("manga_viewer_frame_load_seconds",
+                                        "Время от перехода к фрейму до его показа", ("source",))
+FRAME_CACHE_REQUESTS = REGISTRY.counter("manga_viewer_frame_cache_requests_total",
+                                        "Обращения к кэшу фреймов просмотрщика", ("result",))
+FRAME_CACHE_BYTES = REGISTRY.gauge("manga_viewer_frame_cache_bytes", "Размер кэша фреймов просмотрщика")
 
 class MainWindow:
     def __init__(self, parent):
@@ -69,7 +80,7 @@ class MainWindow:
     
     def open_view_frames(self):
         frames_path = "./static/frames/"
-        if Path(frames_path).exists() and any(Path(frames_path).glob("*.png")):
+        if has_frames(frames_path):
             self.window.destroy()
             ViewFramesWindow(self.parent, frames_path)
         else:
@@ -85,6 +96,14 @@ class DownloadWindow:
         
         self.download_complete = False
         self.downloader = None
+        
+        # Рабочий поток не трогает виджеты: обновления идут через канал событий
+        self.bus = ProgressBus()
+        self.bus.subscribe("download.progress", self.on_download_progress)
+        self.bus.subscribe("download.finished", self.on_download_finished)
+        self.bus.subscribe("download.error", self.on_download_error)
+        self.bus.attach(self.window)
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -174,44 +193,53 @@ class DownloadWindow:
     
     def download_thread(self, url, num_chapters):  # Исправлено: используем num_chapters вместо chapters
         def update_progress(current_page, total_pages, current_chapter):
-            # Вычисляем общий прогресс
-            chapters_done = current_chapter - 1
-            progress_from_previous = chapters_done / num_chapters * 100
-            progress_current = (current_page / total_pages) * (1 / num_chapters) * 100
-            total_progress = progress_from_previous + progress_current
-            
-            self.progress['value'] = total_progress
-            self.progress_label.config(text=f"Глава {current_chapter}: {current_page}/{total_pages} страниц")
-            self.window.update_idletasks()
+            self.bus.publish("download.progress", current_page=current_page, total_pages=total_pages,
+                             current_chapter=current_chapter, num_chapters=num_chapters)
         
         try:
+            # Сетевые зависимости загружаются только когда нужно скачивание
+            from .download_manga_chapter import MangaDownloader
             self.downloader = MangaDownloader(progress_callback=update_progress)
             success = self.downloader.download_multiple_chapters(url, num_chapters, self.folder_var.get())
-            
-            if success:
-                self.download_complete = True
-                self.progress['value'] = 100
-                self.progress_label.config(text="Скачивание завершено!")
-                self.next_btn.config(state=tk.NORMAL)
-                messagebox.showinfo("Успех", f"Успешно скачано глав!")
-            else:
-                self.progress_label.config(text="Скачивание завершено с ошибками")
-                messagebox.showwarning("Предупреждение", "Некоторые главы не были скачаны")
-            
-            # Всегда разблокируем кнопки после завершения
-            self.download_btn.config(state=tk.NORMAL)
-            self.back_btn.config(state=tk.NORMAL)
-            self.cancel_btn.config(state=tk.DISABLED)
-            
+            self.bus.emit("download.finished", success=success)
         except Exception as e:
             print(f"Ошибка в потоке скачивания: {e}")
             import traceback
             traceback.print_exc()
-            self.progress_label.config(text="Ошибка при скачивании")
-            messagebox.showerror("Ошибка", f"Произошла ошибка: {str(e)}")
-            self.download_btn.config(state=tk.NORMAL)
-            self.back_btn.config(state=tk.NORMAL)
-            self.cancel_btn.config(state=tk.DISABLED)
+            self.bus.emit("download.error", error=str(e))
+    
+    def on_download_progress(self, current_page, total_pages, current_chapter, num_chapters):
+        # Вычисляем общий прогресс
+        chapters_done = current_chapter - 1
+        progress_from_previous = chapters_done / num_chapters * 100
+        progress_current = (current_page / total_pages) * (1 / num_chapters) * 100
+        total_progress = progress_from_previous + progress_current
+        
+        self.progress['value'] = total_progress
+        self.progress_label.config(text=f"Глава {current_chapter}: {current_page}/{total_pages} страниц")
+    
+    def on_download_finished(self, success):
+        if success:
+            self.download_complete = True
+            self.progress['value'] = 100
+            self.progress_label.config(text="Скачивание завершено!")
+            self.next_btn.config(state=tk.NORMAL)
+            messagebox.showinfo("Успех", f"Успешно скачано глав!")
+        else:
+            self.progress_label.config(text="Скачивание завершено с ошибками")
+            messagebox.showwarning("Предупреждение", "Некоторые главы не были скачаны")
+        
+        # Всегда разблокируем кнопки после завершения
+        self.download_btn.config(state=tk.NORMAL)
+        self.back_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
+    
+    def on_download_error(self, error):
+        self.progress_label.config(text="Ошибка при скачивании")
+        messagebox.showerror("Ошибка", f"Произошла ошибка: {error}")
+        self.download_btn.config(state=tk.NORMAL)
+        self.back_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
             
     def cancel_download(self):
         if self.downloader:
@@ -221,16 +249,26 @@ class DownloadWindow:
         self.back_btn.config(state=tk.NORMAL)
         self.cancel_btn.config(state=tk.DISABLED)
 
+    def release_bus(self):
+        """Отписывает обработчики окна и останавливает доставку событий через его after()"""
+        self.bus.unsubscribe("download.progress", self.on_download_progress)
+        self.bus.unsubscribe("download.finished", self.on_download_finished)
+        self.bus.unsubscribe("download.error", self.on_download_error)
+        self.bus.detach()
+
     def next_window(self):
         if self.download_complete:
+            self.release_bus()
             self.window.destroy()
             ExtractWindow(self.parent, self.folder_var.get())
     
     def go_back(self):
+        self.release_bus()
         self.window.destroy()
         MainWindow(self.parent)
     
     def on_close(self):
+        self.release_bus()
         self.window.destroy()
         MainWindow(self.parent)
 
@@ -244,6 +282,17 @@ class ExtractWindow:
         
         self.chapters_path = chapters_path
         self.extraction_complete = False
+        self.extraction_running = False
+        self.live_viewer_open = False
+        
+        # Рабочий поток не трогает виджеты: обновления идут через канал событий.
+        # Канал привязан к корневому окну, чтобы живой просмотр работал и после закрытия этого окна
+        self.bus = ProgressBus()
+        self.bus.subscribe("extract.progress", self.on_extract_progress)
+        self.bus.subscribe("extract.finished", self.on_extract_finished)
+        self.bus.subscribe("extract.error", self.on_extract_error)
+        self.bus.attach(self.parent)
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -306,6 +355,9 @@ class ExtractWindow:
         
         self.extract_btn.config(state=tk.DISABLED)
         self.back_btn.config(state=tk.DISABLED)
+        # Просмотр можно открыть сразу: фреймы будут появляться по мере нарезки
+        self.extraction_running = True
+        self.next_btn.config(state=tk.NORMAL)
         
         # Запуск в отдельном потоке
         thread = threading.Thread(target=self.extract_thread, args=(frames_path,))
@@ -314,65 +366,413 @@ class ExtractWindow:
     
     def extract_thread(self, frames_path):
         def update_progress(current, total, chapter, total_chapters):
-            self.progress['value'] = (current / total) * 100
-            self.progress_label.config(text=f"Глава {chapter}/{total_chapters}: {current}/{total} изображений")
-            self.window.update_idletasks()
+            self.bus.publish("extract.progress", current=current, total=total,
+                             chapter=chapter, total_chapters=total_chapters)
+        
+        def new_frames(frames):
+            # Новые фреймы не объединяются: просмотрщику нужен каждый
+            self.bus.emit("extract.frames", frames=frames)
         
         try:
-            extractor = FrameExtractor(progress_callback=update_progress)
+            # OpenCV загружается только когда нужна нарезка
+            from .frame_extractor import FrameExtractor
+            extractor = FrameExtractor(progress_callback=update_progress, frames_callback=new_frames)
             success, message = extractor.process_images(self.chapters_path, frames_path)
-            
-            if success:
-                self.extraction_complete = True
-                self.progress_label.config(text="Обработка завершена!")
-                self.next_btn.config(state=tk.NORMAL)
-                self.back_btn.config(state=tk.NORMAL)
-            else:
-                messagebox.showerror("Ошибка", message)
-                self.extract_btn.config(state=tk.NORMAL)
-                self.back_btn.config(state=tk.NORMAL)
+            self.bus.emit("extract.finished", success=success, message=message)
         except Exception as e:
-            messagebox.showerror("Ошибка", f"Произошла ошибка: {str(e)}")
+            self.bus.emit("extract.error", error=str(e))
+    
+    def on_extract_progress(self, current, total, chapter, total_chapters):
+        self.progress['value'] = (current / total) * 100
+        self.progress_label.config(text=f"Глава {chapter}/{total_chapters}: {current}/{total} изображений")
+    
+    def on_extract_finished(self, success, message):
+        self.extraction_running = False
+        if success:
+            self.extraction_complete = True
+            self.progress['value'] = 100
+            self.progress_label.config(text="Обработка завершена!")
+            self.next_btn.config(state=tk.DISABLED if self.live_viewer_open else tk.NORMAL)
+            self.back_btn.config(state=tk.NORMAL)
+        else:
+            messagebox.showerror("Ошибка", message)
+            self.next_btn.config(state=tk.DISABLED)
             self.extract_btn.config(state=tk.NORMAL)
             self.back_btn.config(state=tk.NORMAL)
+    
+    def on_extract_error(self, error):
+        self.extraction_running = False
+        messagebox.showerror("Ошибка", f"Произошла ошибка: {error}")
+        self.next_btn.config(state=tk.DISABLED)
+        self.extract_btn.config(state=tk.NORMAL)
+        self.back_btn.config(state=tk.NORMAL)
+
+    def release_bus(self):
+        """Отписывает обработчики этого окна от канала событий"""
+        self.bus.unsubscribe("extract.progress", self.on_extract_progress)
+        self.bus.unsubscribe("extract.finished", self.on_extract_finished)
+        self.bus.unsubscribe("extract.error", self.on_extract_error)
 
     def next_window(self):
         if self.extraction_complete:
+            self.release_bus()
             self.window.destroy()
             ViewFramesWindow(self.parent, self.frames_var.get())
+        elif self.extraction_running:
+            # Живой просмотр: окно нарезки остаётся открытым и показывает прогресс
+            self.live_viewer_open = True
+            self.next_btn.config(state=tk.DISABLED)
+            ViewFramesWindow(self.parent, self.frames_var.get(), live_bus=self.bus, return_to_menu=False)
     
     def go_back(self):
+        self.release_bus()
         self.window.destroy()
         MainWindow(self.parent)
     
     def on_close(self):
+        self.release_bus()
         self.window.destroy()
         MainWindow(self.parent)
 
+class VirtualFrameList:
+    """Список фреймов на Canvas: рисуются только видимые строки, остальные существуют лишь как индексы"""
+    
+    ROW_HEIGHT = 18
+    
+    def __init__(self, parent, row_text, height=8, font=("Arial", 9), selectbackground="#4CAF50"):
+        self.row_text = row_text
+        self.font = font
+        self.selectbackground = selectbackground
+        self.count = 0
+        self.selected = None
+        
+        self.canvas = tk.Canvas(parent, height=height * self.ROW_HEIGHT, bg="white",
+                                highlightthickness=1, highlightbackground="#a0a0a0")
+        self.scrollbar = tk.Scrollbar(parent, orient=tk.VERTICAL, command=self._on_scroll)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda event: self._on_scroll("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self._on_scroll("scroll", 1, "units"))
+    
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+    
+    def bind(self, sequence, func):
+        self.canvas.bind(sequence, func)
+    
+    def set_count(self, count):
+        """Меняет число строк; перерисовываются только видимые"""
+        self.count = count
+        if self.selected is not None and self.selected >= count:
+            self.selected = None
+        self.canvas.configure(scrollregion=(0, 0, 0, count * self.ROW_HEIGHT),
+                              yscrollincrement=self.ROW_HEIGHT)
+        self.redraw()
+    
+    def size(self):
+        return self.count
+    
+    def nearest(self, y):
+        if self.count == 0:
+            return -1
+        index = int(self.canvas.canvasy(y) // self.ROW_HEIGHT)
+        return min(max(index, 0), self.count - 1)
+    
+    def selection_clear(self, first=0, last=None):
+        self.selected = None
+        self.redraw()
+    
+    def selection_set(self, index):
+        self.selected = index
+        self.redraw()
+    
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+    
+    def see(self, index):
+        """Прокручивает список так, чтобы строка index была видна"""
+        if self.count == 0:
+            return
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        y = index * self.ROW_HEIGHT
+        if y < top or y + self.ROW_HEIGHT > top + height:
+            self.canvas.yview_moveto(max(y - height / 2, 0) / (self.count * self.ROW_HEIGHT))
+            self.redraw()
+    
+    def _on_scroll(self, *args):
+        self.canvas.yview(*args)
+        self.redraw()
+    
+    def _on_mousewheel(self, event):
+        self._on_scroll("scroll", -1 if event.delta > 0 else 1, "units")
+    
+    def redraw(self):
+        """Перерисовывает только видимое окно строк"""
+        self.canvas.delete("row")
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.ROW_HEIGHT)
+        width = self.canvas.winfo_width()
+        first = max(int(top // self.ROW_HEIGHT), 0)
+        last = min(int((top + height) // self.ROW_HEIGHT) + 1, self.count)
+        
+        for index in range(first, last):
+            y = index * self.ROW_HEIGHT
+            if index == self.selected:
+                self.canvas.create_rectangle(0, y, width, y + self.ROW_HEIGHT,
+                                             fill=self.selectbackground, outline="", tags="row")
+            self.canvas.create_text(4, y + self.ROW_HEIGHT // 2, text=self.row_text(index), anchor="w",
+                                    font=self.font, fill="white" if index == self.selected else "black",
+                                    tags="row")
+
+class ThumbnailStrip:
+    """Горизонтальная лента миниатюр: рисуются только видимые элементы"""
+    
+    ITEM_PADDING = 6
+    POLL_MS = 100
+    
+    def __init__(self, parent, thumbnail_cache, on_select):
+        self.thumbnail_cache = thumbnail_cache
+        self.on_select = on_select
+        self.frames = []
+        self.current_index = 0
+        self.item_width = thumbnail_cache.size[0] + self.ITEM_PADDING * 2
+        self.item_height = thumbnail_cache.size[1] + self.ITEM_PADDING * 2 + 14
+        # Ссылки на PhotoImage только для видимых миниатюр, по ключу кэша миниатюр:
+        # после перенумерации файлов путь указывает на другой фрейм, а ключ - нет
+        self.photos = {}
+        self.poll_job = None
+        
+        self.frame = tk.Frame(parent)
+        self.canvas = tk.Canvas(self.frame, height=self.item_height, bg="#f0f0f0", highlightthickness=0)
+        scrollbar = tk.Scrollbar(self.frame, orient=tk.HORIZONTAL, command=self._on_scroll)
+        self.canvas.configure(xscrollcommand=scrollbar.set)
+        self.canvas.pack(fill=tk.X)
+        scrollbar.pack(fill=tk.X)
+        
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<Button-1>", self._on_click)
+    
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+    
+    def set_frames(self, frames):
+        self.frames = frames
+        self.canvas.configure(scrollregion=(0, 0, len(frames) * self.item_width, self.item_height))
+        self.redraw()
+    
+    def set_current(self, index):
+        self.current_index = index
+        # Прокручиваем так, чтобы текущая миниатюра была видна
+        if self.frames:
+            left = self.canvas.canvasx(0)
+            width = self.canvas.winfo_width()
+            x = index * self.item_width
+            if x < left or x + self.item_width > left + width:
+                total = len(self.frames) * self.item_width
+                self.canvas.xview_moveto(max(x - width / 2, 0) / total)
+        self.redraw()
+    
+    def _on_scroll(self, *args):
+        self.canvas.xview(*args)
+        self.redraw()
+    
+    def _on_click(self, event):
+        index = int(self.canvas.canvasx(event.x) // self.item_width)
+        if 0 <= index < len(self.frames):
+            self.on_select(index)
+    
+    def visible_range(self):
+        left = self.canvas.canvasx(0)
+        width = max(self.canvas.winfo_width(), self.item_width)
+        first = max(int(left // self.item_width), 0)
+        last = min(int((left + width) // self.item_width) + 1, len(self.frames))
+        return first, last
+    
+    def redraw(self):
+        """Перерисовывает только видимую часть ленты"""
+        self.canvas.delete("thumb")
+        photos = {}
+        first, last = self.visible_range()
+        
+        for index in range(first, last):
+            frame_path = self.frames[index]
+            x = index * self.item_width
+            
+            if index == self.current_index:
+                self.canvas.create_rectangle(x + 1, 1, x + self.item_width - 1, self.item_height - 1,
+                                             outline="#4CAF50", width=2, tags="thumb")
+            
+            try:
+                key = self.thumbnail_cache.cache_key(frame_path)
+            except OSError:
+                key = None
+            photo = self.photos.get(key) if key else None
+            if photo is None and key:
+                image = self.thumbnail_cache.lookup(frame_path, key)
+                if image is not None:
+                    photo = ImageTk.PhotoImage(image)
+            if photo is not None:
+                photos[key] = photo
+                self.canvas.create_image(x + self.item_width // 2, self.ITEM_PADDING, image=photo,
+                                         anchor="n", tags="thumb")
+            
+            self.canvas.create_text(x + self.item_width // 2, self.item_height - 4, text=str(index + 1),
+                                    anchor="s", font=("Arial", 8), tags="thumb")
+        
+        self.photos = photos
+        
+        # Пока в фоне генерируются миниатюры - периодически дорисовываем
+        if self.thumbnail_cache.has_pending() and self.poll_job is None:
+            self.poll_job = self.canvas.after(self.POLL_MS, self._poll)
+    
+    def _poll(self):
+        self.poll_job = None
+        self.redraw()
+    
+    def close(self):
+        if self.poll_job is not None:
+            self.canvas.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.thumbnail_cache.close()
+
 class ViewFramesWindow:
-    def __init__(self, parent, frames_path):
+    # Период и предельное число проверок готовности качественного варианта фрейма
+    REFINE_POLL_MS = 30
+    REFINE_MAX_POLLS = 200
+    # Размер порции и период подгрузки списка фреймов
+    LOADING_CHUNK = 2000
+    LOADING_POLL_MS = 50
+    # Сколько следующих фреймов озвучивать заранее
+    SPEECH_LOOKAHEAD = 3
+    
+    def __init__(self, parent, frames_path, live_bus=None, return_to_menu=True):
         self.parent = parent
         self.window = tk.Toplevel(parent)
-        self.window.title("Просмотр фреймов")
+        self.window.title("Просмотр фреймов (идёт нарезка...)" if live_bus else "Просмотр фреймов")
         self.window.geometry("1000x800")
         self.window.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.frames_path = Path(frames_path)
-        self.frames = sorted(self.frames_path.glob("*.png"))
-        self.current_frame_index = 0
+        # Порядок фреймов, текущий фрейм и кэш изображений - в модели без виджетов
+        self.model = ViewerModel(self.frames_path)
+        # Результаты распознавания показываются из кэша без повторного OCR
+        from .ocr import OcrCache
+        self.ocr_cache = OcrCache(self.frames_path)
+        self.ocr_running = set()
+        self.ocr_engine_name = None
+        # Поиск текста в кэше (stat, SQLite, а для новых файлов - чтение и хэш) - не в потоке Tk
+        self.text_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-text")
+        # Озвучка с опережением: очередь создаётся при первом включении
+        self.speech_queue = None
+        self.voice_mode = False
+        # Список заполняется порциями из фонового потока
+        self.loading_queue = queue.Queue()
+        self.loading_done = False
+        self.closed = False
+        self.return_to_menu = return_to_menu
+        
+        # Живой режим: новые фреймы приходят от идущей нарезки без пересканирования папки
+        self.live_bus = live_bus
+        self.pending_live_frames = []
+        if self.live_bus:
+            self.live_bus.subscribe("extract.frames", self.on_live_frames)
+            self.live_bus.subscribe("extract.finished", self.on_live_finished)
+            self.live_bus.subscribe("extract.error", self.on_live_finished)
         self.current_photo = None
         self.drag_start_index = None
         
-        # Оптимизация: отложенное переименование
-        self.pending_renames = []
-        self.rename_timer = None
-        
         self.setup_ui()
-        if self.frames:
+        
+        thread = threading.Thread(target=self.scan_frames_thread)
+        thread.daemon = True
+        thread.start()
+        self.window.after(self.LOADING_POLL_MS, self.poll_loaded_frames)
+    
+    @property
+    def frames(self):
+        return self.model.frames
+    
+    @property
+    def current_frame_index(self):
+        return self.model.current_index
+    
+    @current_frame_index.setter
+    def current_frame_index(self, index):
+        self.model.current_index = index
+    
+    @property
+    def catalog(self):
+        return self.model.catalog
+    
+    def scan_frames_thread(self):
+        """Сверяет каталог с папкой (os.scandir) и передаёт порядок фреймов порциями по мере сверки"""
+        paths = []
+        try:
+            for chunk in self.model.scan_chunks(self.LOADING_CHUNK):
+                if self.closed:
+                    break
+                paths.extend(chunk)
+                self.loading_queue.put(chunk)
+        except Exception as e:
+            if not self.closed:
+                print(f"Ошибка чтения папки фреймов: {e}")
+            paths = None
+        self.loading_queue.put(None)
+        if paths is not None and not self.closed:
+            # Миниатюры удалённых и перенарезанных фреймов больше не нужны
+            self.thumbnail_strip.thumbnail_cache.prune(paths)
+    
+    def poll_loaded_frames(self):
+        """Добавляет в список порции фреймов, прочитанные фоновым потоком"""
+        if self.closed:
+            # Окно закрыто - опрос больше не перезапускаем
+            return
+        try:
+            while True:
+                chunk = self.loading_queue.get_nowait()
+                if chunk is None:
+                    self.loading_done = True
+                    break
+                self.add_frames(chunk)
+        except queue.Empty:
+            pass
+        
+        if not self.loading_done:
+            self.window.after(self.LOADING_POLL_MS, self.poll_loaded_frames)
+            return
+        
+        # Фреймы, пришедшие во время сканирования, добавляем после него, чтобы не нарушить порядок
+        pending, self.pending_live_frames = self.pending_live_frames, []
+        self.add_frames(pending)
+        if not self.frames and not self.live_bus:
+            messagebox.showwarning("Предупреждение", "Фреймы не найдены")
+    
+    def add_frames(self, frame_paths):
+        """Добавляет фреймы в конец списка, пропуская уже известные"""
+        new_frames = self.model.add_frames(frame_paths)
+        if not new_frames:
+            return
+        was_empty = len(self.frames) == len(new_frames)
+        self.update_frames_list()
+        if was_empty:
             self.load_current_frame()
         else:
-            messagebox.showwarning("Предупреждение", "Фреймы не найдены")
-        
+            self.frame_info.config(text=f"Фрейм {self.current_frame_index + 1}/{len(self.frames)}")
+    
+    def on_live_frames(self, frames):
+        """Новые фреймы от идущей нарезки"""
+        frames = [self.frames_path / frame for frame in frames]
+        if self.loading_done:
+            self.add_frames(frames)
+        else:
+            self.pending_live_frames.extend(frames)
+    
+    def on_live_finished(self, **kwargs):
+        self.window.title("Просмотр фреймов")
+    
     def setup_ui(self):
         # Основной контейнер с фиксированной структурой
         main_container = tk.Frame(self.window)
@@ -430,8 +830,8 @@ class ViewFramesWindow:
         self.move_down_btn = tk.Button(action_frame2, text="↓ Вниз", command=self.move_frame_down, width=8)
         self.move_down_btn.pack(side=tk.LEFT, padx=3)
         
-        # Кнопка для принудительного сохранения порядка
-        self.save_order_btn = tk.Button(action_frame2, text="💾 Сохранить порядок", 
+        # Кнопка для физической перенумерации файлов по текущему порядку
+        self.save_order_btn = tk.Button(action_frame2, text="💾 Экспорт порядка", 
                                        command=self.save_order, width=16, bg="#4CAF50", fg="white")
         self.save_order_btn.pack(side=tk.LEFT, padx=3)
         
@@ -464,6 +864,16 @@ class ViewFramesWindow:
         self.image_frame.bind("<Configure>", self._on_frame_configure)
         self.canvas.bind("<Configure>", self._on_canvas_configure)
         
+        # Распознанный текст текущего фрейма
+        self.ocr_text_label = tk.Label(main_container, text="", justify=tk.LEFT, anchor=tk.W,
+                                       wraplength=900, font=("Arial", 10))
+        self.ocr_text_label.pack(fill=tk.X, pady=(0, 10))
+        
+        # Лента миниатюр
+        self.thumbnail_strip = ThumbnailStrip(main_container, ThumbnailCache(self.frames_path),
+                                              on_select=self.select_frame)
+        self.thumbnail_strip.pack(fill=tk.X, pady=(0, 10))
+        
         # Нижняя панель со списком фреймов
         list_frame = tk.Frame(main_container)
         list_frame.pack(fill=tk.X)
@@ -482,21 +892,16 @@ class ViewFramesWindow:
         listbox_container = tk.Frame(list_frame)
         listbox_container.pack(fill=tk.X)
         
-        self.frames_listbox = tk.Listbox(listbox_container, height=8, font=("Arial", 9),
-                                        selectbackground="#4CAF50", selectmode=tk.SINGLE)
-        
-        # Добавляем скроллбар для списка
-        list_scrollbar = tk.Scrollbar(listbox_container, orient=tk.VERTICAL, command=self.frames_listbox.yview)
-        self.frames_listbox.configure(yscrollcommand=list_scrollbar.set)
+        self.frames_listbox = VirtualFrameList(listbox_container, row_text=self.frame_row_text, height=8,
+                                               font=("Arial", 9), selectbackground="#4CAF50")
         
         self.frames_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        list_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.frames_listbox.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Привязываем события для перетаскивания
+        # Привязываем события для выбора и перетаскивания
         self.frames_listbox.bind('<Button-1>', self.on_listbox_click)
         self.frames_listbox.bind('<B1-Motion>', self.on_listbox_drag)
         self.frames_listbox.bind('<ButtonRelease-1>', self.on_listbox_release)
-        self.frames_listbox.bind('<<ListboxSelect>>', self.on_frame_select)
         
         self.update_frames_list()
     
@@ -507,13 +912,30 @@ class ViewFramesWindow:
     def _on_canvas_configure(self, event):
         """Обновляем размер окна внутри Canvas при изменении размера Canvas"""
         self.canvas.itemconfig(self.canvas_window, width=event.width)
+        
+        # Масштаб фреймов зависит от размера области просмотра - кэш устарел
+        self.model.set_viewport(self.get_viewport_size(event.width, event.height))
+    
+    def get_viewport_size(self, canvas_width, canvas_height):
+        """Размер области, в которую вписывается фрейм"""
+        # Если Canvas еще не отрисован, используем разумные размеры по умолчанию
+        if canvas_width <= 1:
+            canvas_width = 800
+        if canvas_height <= 1:
+            canvas_height = 500
+        
+        # Вычитаем отступы для области просмотра
+        return max(canvas_width - 40, 100), max(canvas_height - 40, 100)
+    
+    def frame_row_text(self, index):
+        """Текст строки списка для фрейма index"""
+        return f"{index+1:03d}. {self.catalog.relative(self.frames[index])}"
     
     def update_frames_list(self):
-        """Обновляет список фреймов в Listbox"""
-        self.frames_listbox.delete(0, tk.END)
-        for i, frame_path in enumerate(self.frames):
-            display_name = f"{i+1:03d}. {frame_path.name}"
-            self.frames_listbox.insert(tk.END, display_name)
+        """Обновляет список фреймов: перерисовываются только видимые строки"""
+        self.frames_listbox.set_count(len(self.frames))
+        
+        self.thumbnail_strip.set_frames(self.frames)
         
         # Обновляем состояние кнопок перемещения
         self.update_move_buttons_state()
@@ -570,23 +992,16 @@ class ViewFramesWindow:
     
     def move_frame(self, from_index, to_index):
         """Перемещает фрейм с одного места на другое"""
-        if from_index == to_index:
+        # Новый порядок сохраняется в каталоге, текущим становится перемещённый фрейм
+        if not self.model.move(from_index, to_index):
             return
-            
-        # Перемещаем элемент в списке
-        item = self.frames.pop(from_index)
-        self.frames.insert(to_index, item)
         
         # Обновляем отображение
         self.update_frames_list()
-        
-        # Обновляем текущий индекс
-        self.current_frame_index = to_index
         self.frames_listbox.selection_set(to_index)
         self.load_current_frame()
         
-        # Отмечаем необходимость переименования (но не выполняем сразу)
-        self.schedule_renumbering()
+        self.mark_order_changed()
     
     def move_frame_up(self):
         """Перемещает текущий фрейм вверх"""
@@ -598,71 +1013,37 @@ class ViewFramesWindow:
         if self.current_frame_index < len(self.frames) - 1:
             self.move_frame(self.current_frame_index, self.current_frame_index + 1)
     
-    def schedule_renumbering(self):
-        """Планирует отложенное переименование файлов"""
-        # Отменяем предыдущий таймер, если он есть
-        if self.rename_timer:
-            self.window.after_cancel(self.rename_timer)
-        
-        # Показываем индикатор несохраненных изменений
-        self.unsaved_changes_label.config(text="⚠ Изменения не сохранены")
-        
-        # Запускаем новый таймер (переименование через 2 секунды бездействия)
-        self.rename_timer = self.window.after(2000, self.execute_pending_renames)
+    def mark_order_changed(self):
+        """Показывает, что порядок сохранён в каталоге, но файлы ещё не перенумерованы"""
+        self.unsaved_changes_label.config(text="⚠ Порядок не экспортирован")
     
-    def execute_pending_renames(self):
-        """Выполняет отложенное переименование файлов"""
+    def export_order(self):
+        """Перенумеровывает файлы по порядку из каталога"""
         if not self.frames:
             return
             
         try:
             # Показываем прогресс
-            self.unsaved_changes_label.config(text="💾 Сохранение...")
+            self.unsaved_changes_label.config(text="💾 Экспорт...")
             self.window.update_idletasks()
             
-            # Оптимизированное переименование: только необходимые файлы
-            renamed_count = 0
-            
-            for i, frame_path in enumerate(self.frames):
-                expected_name = f"frame_{i:06d}.png"
-                if frame_path.name != expected_name:
-                    # Создаем временное имя для избежания конфликтов
-                    temp_name = f"temp_{i:06d}.png"
-                    temp_path = self.frames_path / temp_name
-                    
-                    # Переименовываем файл
-                    frame_path.rename(temp_path)
-                    
-                    # Обновляем путь в списке
-                    self.frames[i] = temp_path
-                    renamed_count += 1
-            
-            # Теперь переименовываем временные файлы в окончательные имена
-            for i, temp_path in enumerate(self.frames):
-                if temp_path.name.startswith("temp_"):
-                    final_name = f"frame_{i:06d}.png"
-                    final_path = self.frames_path / final_name
-                    temp_path.rename(final_path)
-                    self.frames[i] = final_path
-            
-            # Обновляем список фреймов
-            self.frames = sorted(self.frames_path.glob("*.png"))
+            renamed_count = self.model.export()
+            self.update_frames_list()
             
-            # Сбрасываем индикатор
-            self.unsaved_changes_label.config(text="✓ Сохранено")
+            self.unsaved_changes_label.config(text="✓ Экспортировано")
             
             # Через 1.5 секунды убираем сообщение
             self.window.after(1500, lambda: self.unsaved_changes_label.config(text=""))
             
-            print(f"Оптимизированное переименование: обработано {renamed_count} файлов")
+            print(f"Экспорт порядка: переименовано {renamed_count} файлов")
             
         except Exception as e:
-            print(f"Ошибка при переименовании фреймов: {e}")
-            self.unsaved_changes_label.config(text="❌ Ошибка сохранения")
+            print(f"Ошибка при экспорте порядка фреймов: {e}")
+            self.unsaved_changes_label.config(text="❌ Ошибка экспорта")
     
     def save_order(self):
         """Принудительное сохранение порядка"""
-        self.execute_pending_renames()
+        self.export_order()
     
     def delete_frame(self):
         """Удаляет текущий фрейм - ОПТИМИЗИРОВАННАЯ ВЕРСИЯ"""
@@ -682,25 +1063,17 @@ class ViewFramesWindow:
             return
         
         try:
-            # Удаляем файл
-            frame_to_delete.unlink()
+            # Удаляем файл и запись в каталоге, остальные файлы не трогаем
+            self.thumbnail_strip.thumbnail_cache.discard(frame_to_delete)
+            self.model.delete(self.current_frame_index)
             
-            # Удаляем из списка
-            self.frames.pop(self.current_frame_index)
-            
-            # Обновляем текущий индекс
             if not self.frames:
                 # Если удалили последний фрейм
-                self.current_frame_index = 0
                 self.image_label.config(image='', text="Фреймы не найдены")
                 self.frame_info.config(text="Фрейм 0/0")
                 self.unsaved_changes_label.config(text="")
             else:
-                if self.current_frame_index >= len(self.frames):
-                    self.current_frame_index = len(self.frames) - 1
-                
-                # Немедленно переименовываем только при удалении (это быстро)
-                self.fast_renumber_after_delete()
+                self.mark_order_changed()
                 self.load_current_frame()
             
             self.update_frames_list()
@@ -709,68 +1082,27 @@ class ViewFramesWindow:
             print(f"Ошибка при удалении фрейма: {e}")
             messagebox.showerror("Ошибка", f"Не удалось удалить фрейм: {e}")
     
-    def fast_renumber_after_delete(self):
-        """Быстрое переименование после удаления - только необходимые файлы"""
-        try:
-            # Находим индекс, с которого нужно начать переименование
-            start_index = self.current_frame_index
-            
-            for i in range(start_index, len(self.frames)):
-                expected_name = f"frame_{i:06d}.png"
-                current_path = self.frames[i]
-                
-                if current_path.name != expected_name:
-                    new_path = self.frames_path / expected_name
-                    current_path.rename(new_path)
-                    self.frames[i] = new_path
-            
-            # Обновляем список
-            self.frames = sorted(self.frames_path.glob("*.png"))
-            
-        except Exception as e:
-            print(f"Ошибка при быстром переименовании: {e}")
-    
     def load_current_frame(self):
         if not self.frames:
             self.image_label.config(text="Фреймы не найдены", font=("Arial", 14))
             return
             
-        frame_path = self.frames[self.current_frame_index]
+        frame_path = self.model.current_path
         
         try:
-            # Загружаем изображение
-            image = Image.open(frame_path)
-            
-            # Получаем размеры Canvas для масштабирования
-            self.canvas.update_idletasks()
-            canvas_width = self.canvas.winfo_width()
-            canvas_height = self.canvas.winfo_height()
-            
-            # Если Canvas еще не отрисован, используем разумные размеры по умолчанию
-            if canvas_width <= 1:
-                canvas_width = 800
-            if canvas_height <= 1:
-                canvas_height = 500
-            
-            # Вычитаем отступы для области просмотра
-            viewport_width = max(canvas_width - 40, 100)
-            viewport_height = max(canvas_height - 40, 100)
-            
-            # Масштабируем изображение чтобы оно вписывалось в область просмотра
-            img_width, img_height = image.size
-            scale = min(viewport_width / img_width, viewport_height / img_height, 1.0)
+            if self.model.viewport_size is None:
+                self.canvas.update_idletasks()
+                self.model.set_viewport(self.get_viewport_size(self.canvas.winfo_width(),
+                                                               self.canvas.winfo_height()))
             
-            new_width = int(img_width * scale)
-            new_height = int(img_height * scale)
+            # Берём подготовленный фрейм из кэша, иначе сразу показываем черновик
+            started = time.perf_counter()
+            image, is_final, source, cache_key = self.model.prepare_current()
+            FRAME_CACHE_REQUESTS.inc(result="hit" if source == "cache" else "miss")
             
-            if scale < 1.0:
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Конвертируем в PhotoImage и сохраняем ссылку
-            self.current_photo = ImageTk.PhotoImage(image)
-            
-            # Обновляем метку
-            self.image_label.config(image=self.current_photo, text="")
+            self.show_image(image)
+            FRAME_LOAD_SECONDS.observe(time.perf_counter() - started, source=source)
+            FRAME_CACHE_BYTES.set(self.model.frame_cache.current_bytes)
             
             # Обновляем информацию
             self.frame_info.config(text=f"Фрейм {self.current_frame_index + 1}/{len(self.frames)}")
@@ -779,32 +1111,57 @@ class ViewFramesWindow:
             self.frames_listbox.selection_clear(0, tk.END)
             self.frames_listbox.selection_set(self.current_frame_index)
             self.frames_listbox.see(self.current_frame_index)
-            
-            # Обновляем область прокрутки
-            self.image_frame.update_idletasks()
-            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            self.thumbnail_strip.set_current(self.current_frame_index)
             
             # Обновляем состояние кнопок перемещения
             self.update_move_buttons_state()
             
+            self.show_frame_text(frame_path)
+            if self.voice_mode:
+                self.speak_current_frame()
+            
+            # Готовим соседние фреймы в фоне (и качественный вариант текущего, если показан черновик)
+            self.model.prefetch(include_current=not is_final)
+            if not is_final:
+                self.window.after(self.REFINE_POLL_MS, self.refine_current_frame, self.model.display_token, cache_key)
+            
         except Exception as e:
             print(f"Ошибка загрузки изображения {frame_path}: {e}")
             self.image_label.config(image="", text=f"Ошибка загрузки: {frame_path.name}")
     
+    def show_image(self, image):
+        """Показывает подготовленное изображение в области просмотра"""
+        # Конвертируем в PhotoImage и сохраняем ссылку
+        self.current_photo = ImageTk.PhotoImage(image)
+        self.image_label.config(image=self.current_photo, text="")
+        
+        # Обновляем область прокрутки
+        self.image_frame.update_idletasks()
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    
+    def refine_current_frame(self, token, cache_key, polls=0):
+        """Заменяет черновик на качественный вариант, когда он готов"""
+        if token != self.model.display_token:
+            # Пользователь уже перешёл к другому фрейму
+            return
+        image = self.model.frame_cache.get(cache_key)
+        if image is None:
+            if polls < self.REFINE_MAX_POLLS:
+                self.window.after(self.REFINE_POLL_MS, self.refine_current_frame, token, cache_key, polls + 1)
+            return
+        self.show_image(image)
+    
     def next_frame(self):
-        if self.current_frame_index < len(self.frames) - 1:
-            self.current_frame_index += 1
+        if self.model.next():
             self.load_current_frame()
     
     def prev_frame(self):
-        if self.current_frame_index > 0:
-            self.current_frame_index -= 1
+        if self.model.prev():
             self.load_current_frame()
     
-    def on_frame_select(self, event):
-        selection = self.frames_listbox.curselection()
-        if selection:
-            self.current_frame_index = selection[0]
+    def select_frame(self, index):
+        """Переход к фрейму по клику на миниатюру"""
+        if self.model.select(index):
             self.load_current_frame()
     
     def edit_frame(self):
@@ -815,8 +1172,86 @@ class ViewFramesWindow:
             except:
                 messagebox.showinfo("Инфо", f"Файл: {frame_path}")
     
+    def when_done(self, future, callback):
+        """Вызывает callback(результат) в потоке Tk, когда фоновая задача завершится"""
+        if self.closed:
+            return
+        if not future.done():
+            self.window.after(self.REFINE_POLL_MS, self.when_done, future, callback)
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Ошибка чтения кэша распознавания: {e}")
+            return
+        callback(result)
+    
+    def is_current(self, frame_path):
+        return bool(self.frames) and self.model.current_path == frame_path
+    
+    def show_frame_text(self, frame_path):
+        """Текст фрейма из кэша распознавания (без запуска OCR); поиск в кэше - в фоне"""
+        future = self.text_executor.submit(self.ocr_cache.lookup, frame_path)
+        self.when_done(future, lambda result: self.apply_frame_text(frame_path, result))
+    
+    def apply_frame_text(self, frame_path, result):
+        from .ocr import result_text
+        # Пользователь мог уже перейти к другому фрейму
+        if not self.is_current(frame_path):
+            return
+        if result is None:
+            text = "Распознавание..." if frame_path in self.ocr_running else ""
+        else:
+            text = result_text(result) or "(текст не найден)"
+        self.ocr_text_label.config(text=text)
+    
     def ocr_frame(self):
-        messagebox.showinfo("Инфо", "Функция распознавания текста будет реализована позже")
+        """Распознаёт текущий фрейм в фоне; готовый результат берётся из кэша"""
+        if not self.frames:
+            return
+        frame_path = self.frames[self.current_frame_index]
+        if frame_path in self.ocr_running:
+            self.show_frame_text(frame_path)
+            return
+        if self.ocr_engine_name is None:
+            from .ocr import StubOcrEngine, default_engine_name
+            self.ocr_engine_name = default_engine_name()
+            if self.ocr_engine_name == StubOcrEngine.name:
+                messagebox.showwarning("Распознавание", "pytesseract не установлен: вместо текста будет заглушка.\n"
+                                                        "Установите pytesseract и Tesseract.")
+        
+        self.ocr_running.add(frame_path)
+        self.show_frame_text(frame_path)
+        thread = threading.Thread(target=self.ocr_frame_thread, args=(frame_path, self.ocr_engine_name))
+        thread.daemon = True
+        thread.start()
+        self.window.after(self.REFINE_POLL_MS, self.poll_ocr_result, frame_path)
+    
+    def ocr_frame_thread(self, frame_path, engine_name):
+        from .ocr import create_engine, read_frame, recognize_regions, results_key
+        try:
+            # Уже распознанный фрейм берём из кэша
+            if self.ocr_cache.lookup(frame_path) is not None:
+                return
+            engine = create_engine(engine_name)
+            img = read_frame(frame_path)
+            if img is not None:
+                result = recognize_regions(engine, img)
+                self.ocr_cache.put(self.ocr_cache.content_hash(frame_path), results_key(engine), result)
+        except Exception as e:
+            print(f"Ошибка распознавания {frame_path}: {e}")
+        finally:
+            self.ocr_running.discard(frame_path)
+    
+    def poll_ocr_result(self, frame_path):
+        if self.closed:
+            return
+        if frame_path in self.ocr_running:
+            self.window.after(self.REFINE_POLL_MS, self.poll_ocr_result, frame_path)
+            return
+        # Текст обновляем, только если пользователь ещё на этом фрейме
+        if self.is_current(frame_path):
+            self.show_frame_text(frame_path)
     
     def add_frame(self):
         file_path = filedialog.askopenfilename(
@@ -824,33 +1259,81 @@ class ViewFramesWindow:
             filetypes=[("Image files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif")]
         )
         if file_path:
-            # Копируем файл в папку фреймов
-            import shutil
-            new_frame_path = self.frames_path / f"frame_{len(self.frames):06d}.png"
-            shutil.copy(file_path, new_frame_path)
-            
-            # Обновляем список
-            self.frames = sorted(self.frames_path.glob("*.png"))
+            # Копируем файл в шард текущего фрейма и добавляем в конец порядка
+            self.model.add_file(file_path)
             self.update_frames_list()
-            self.current_frame_index = len(self.frames) - 1
             self.load_current_frame()
     
     def voice_frame(self):
-        messagebox.showinfo("Инфо", "Функция озвучки будет реализована позже")
+        """Включает/выключает озвучку: при переходе к фрейму его текст звучит сразу"""
+        self.voice_mode = not self.voice_mode
+        if not self.voice_mode:
+            self.voice_btn.config(text="Озвучить")
+            if self.speech_queue:
+                self.speech_queue.player.stop()
+            return
+        
+        if self.speech_queue is None:
+            from .speech import AudioCache, SpeechQueue, StubSpeechEngine, default_speech_engine
+            engine = default_speech_engine()
+            if engine.name == StubSpeechEngine.name:
+                messagebox.showwarning("Озвучка", "Синтезатор речи не найден: вместо речи будет звучать тон.\n"
+                                                  "Установите pyttsx3 (pip install pyttsx3) или espeak-ng.")
+            self.speech_queue = SpeechQueue(AudioCache(self.frames_path, engine), lookahead=self.SPEECH_LOOKAHEAD)
+        self.voice_btn.config(text="🔊 Озвучка: вкл")
+        self.speak_current_frame()
+    
+    def frame_text(self, frame_path):
+        """Распознанный текст фрейма из кэша или пустая строка (вызывается в фоновом потоке)"""
+        from .ocr import result_text
+        return result_text(self.ocr_cache.lookup(frame_path))
+    
+    def speak_current_frame(self):
+        if not self.frames or self.speech_queue is None:
+            return
+        frame_path = self.model.current_path
+        last = min(len(self.frames), self.current_frame_index + 1 + self.SPEECH_LOOKAHEAD)
+        upcoming_paths = self.frames[self.current_frame_index + 1:last]
+        
+        def speak():
+            # При быстром листании озвучка устаревших фреймов пропускается
+            if not self.is_current(frame_path):
+                return None
+            text = self.frame_text(frame_path)
+            self.speech_queue.speak(text, [self.frame_text(path) for path in upcoming_paths])
+            return text
+        
+        def report(text):
+            if text == "" and self.is_current(frame_path):
+                self.ocr_text_label.config(text="Нет распознанного текста для озвучки")
+        
+        self.when_done(self.text_executor.submit(speak), report)
+    
+    def close_resources(self):
+        """Останавливает фоновые потоки и закрывает каталог"""
+        self.closed = True
+        if self.live_bus:
+            self.live_bus.unsubscribe("extract.frames", self.on_live_frames)
+            self.live_bus.unsubscribe("extract.finished", self.on_live_finished)
+            self.live_bus.unsubscribe("extract.error", self.on_live_finished)
+        self.model.close()
+        self.thumbnail_strip.close()
+        self.text_executor.shutdown(wait=True, cancel_futures=True)
+        self.ocr_cache.close()
+        if self.speech_queue:
+            self.speech_queue.stop()
     
     def go_back(self):
-        # Сохраняем изменения перед выходом
-        if self.unsaved_changes_label.cget("text") == "⚠ Изменения не сохранены":
-            self.execute_pending_renames()
+        # Порядок уже сохранён в каталоге, переименовывать файлы не нужно
+        self.close_resources()
         self.window.destroy()
         MainWindow(self.parent)
     
     def on_close(self):
-        # Сохраняем изменения перед выходом
-        if self.unsaved_changes_label.cget("text") == "⚠ Изменения не сохранены":
-            self.execute_pending_renames()
+        self.close_resources()
         self.window.destroy()
-        MainWindow(self.parent)
+        if self.return_to_menu:
+            MainWindow(self.parent)
 
 class MangaSpeechApp:
     def __init__(self):
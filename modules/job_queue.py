@@ -0,0 +1,205 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .memory_budget import pool_kwargs
+from .pipeline import ChapterPipeline
+
+# Статусы заданий
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """Постоянная очередь заданий (серия, число глав, приоритет) в SQLite"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                num_chapters INTEGER NOT NULL,
+                chapters_dir TEXT NOT NULL,
+                frames_dir TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                message TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority DESC, id)")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def add(self, url, num_chapters, chapters_dir=None, frames_dir=None, priority=0):
+        """Добавляет задание; без явных папок каждая серия получает свою папку рядом с базой"""
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (url, num_chapters, chapters_dir, frames_dir, priority, created_at, updated_at) "
+                "VALUES (?, ?, '', '', ?, ?, ?)",
+                (url, num_chapters, priority, now, now)
+            )
+            job_id = cursor.lastrowid
+            job_root = self.db_path.parent / f"job_{job_id:04d}"
+            self.conn.execute(
+                "UPDATE jobs SET chapters_dir = ?, frames_dir = ? WHERE id = ?",
+                (str(chapters_dir or job_root / "chapters"), str(frames_dir or job_root / "frames"), job_id)
+            )
+        return job_id
+
+    def list_jobs(self):
+        with self._lock:
+            cursor = self.conn.execute("SELECT * FROM jobs ORDER BY priority DESC, id")
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get(self, job_id):
+        with self._lock:
+            cursor = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([column[0] for column in cursor.description], row))
+
+    def status(self, job_id):
+        with self._lock:
+            row = self.conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return row[0] if row else None
+
+    def _set_status(self, job_id, status, allowed_from, message=None):
+        with self._lock:
+            placeholders = ",".join("?" for _ in allowed_from)
+            query = f"UPDATE jobs SET status = ?, updated_at = ?{', message = ?' if message is not None else ''} " \
+                    f"WHERE id = ? AND status IN ({placeholders})"
+            params = [status, time.time()] + ([message] if message is not None else []) + [job_id] + list(allowed_from)
+            return self.conn.execute(query, params).rowcount > 0
+
+    def cancel(self, job_id):
+        return self._set_status(job_id, CANCELLED, (QUEUED, RUNNING, PAUSED))
+
+    def pause(self, job_id):
+        return self._set_status(job_id, PAUSED, (QUEUED, RUNNING))
+
+    def resume(self, job_id):
+        """Возвращает приостановленное (или упавшее) задание в очередь; продолжится с контрольной точки"""
+        return self._set_status(job_id, QUEUED, (PAUSED, FAILED))
+
+    def finish(self, job_id, status, message=""):
+        """Итог задания; отмена или пауза, выставленные во время работы, не перезаписываются"""
+        return self._set_status(job_id, status, (RUNNING,), message)
+
+    def claim_next(self):
+        """Атомарно забирает самое приоритетное задание из очереди"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY priority DESC, id LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                                      (RUNNING, time.time(), row[0]))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row else None
+
+    def recover(self):
+        """Задания, оставшиеся в статусе running после сбоя, возвращаются в очередь"""
+        with self._lock:
+            return self.conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                                     (QUEUED, time.time(), RUNNING)).rowcount
+
+
+class JobRunner:
+    """Выполняет задания очереди с общим бюджетом соединений и процессов нарезки"""
+
+    STATUS_POLL_SEC = 1.0
+
+    def __init__(self, job_queue, max_jobs=2, max_connections=8, cpu_workers=2, download_workers=4):
+        self.job_queue = job_queue
+        self.max_jobs = max(1, max_jobs)
+        self.download_workers = download_workers
+        # Общие для всех заданий ограничения
+        self.connection_limiter = threading.BoundedSemaphore(max(1, max_connections))
+        self.cpu_workers = max(1, cpu_workers)
+        self.is_stopped = False
+        self.stats = {'done': 0, 'failed': 0, 'cancelled': 0, 'paused': 0}
+        self._stats_lock = threading.Lock()
+
+    def stop(self):
+        self.is_stopped = True
+
+    def run(self, until_empty=True):
+        """Берёт задания по приоритету, пока очередь не опустеет (или до stop())"""
+        self.job_queue.recover()
+        with ProcessPoolExecutor(max_workers=self.cpu_workers, **pool_kwargs()) as executor:
+            threads = []
+            while not self.is_stopped:
+                threads = [thread for thread in threads if thread.is_alive()]
+                if len(threads) < self.max_jobs:
+                    job = self.job_queue.claim_next()
+                    if job is not None:
+                        thread = threading.Thread(target=self.run_job, args=(job, executor), daemon=True)
+                        thread.start()
+                        threads.append(thread)
+                        continue
+                    if until_empty and not threads:
+                        break
+                time.sleep(self.STATUS_POLL_SEC)
+            for thread in threads:
+                thread.join()
+        return self.stats
+
+    def run_job(self, job, executor):
+        job_id = job["id"]
+        print(f"Задание {job_id}: {job['url']} ({job['num_chapters']} глав, приоритет {job['priority']})")
+        pipeline = ChapterPipeline(job["chapters_dir"], job["frames_dir"],
+                                   download_workers=self.download_workers,
+                                   executor=executor, connection_limiter=self.connection_limiter)
+
+        # Следим за отменой и паузой из другого процесса (CLI) через базу
+        finished = threading.Event()
+
+        def watch_status():
+            while not finished.wait(self.STATUS_POLL_SEC):
+                if self.job_queue.status(job_id) in (CANCELLED, PAUSED) or self.is_stopped:
+                    pipeline.cancel()
+                    return
+
+        watcher = threading.Thread(target=watch_status, daemon=True)
+        watcher.start()
+        try:
+            success, message = pipeline.run(job["url"], job["num_chapters"])
+            status = DONE if success else FAILED
+        except Exception as e:
+            success, message, status = False, f"Ошибка: {e}", FAILED
+        finally:
+            finished.set()
+
+        if pipeline.is_cancelled and self.is_stopped:
+            # Остановка раннера: задание продолжится с контрольной точки при следующем запуске
+            self.job_queue.finish(job_id, QUEUED, message)
+            return
+        if not self.job_queue.finish(job_id, status, message):
+            status = self.job_queue.status(job_id)
+        with self._stats_lock:
+            if status in self.stats:
+                self.stats[status] += 1
+        print(f"Задание {job_id}: {status}. {message}")
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+from contextlib import contextmanager, nullcontext
+
+from .page_validator import read_dimensions
+
+# Во сколько раз рабочая память нарезки больше декодированной страницы:
+# BGR (3 байта на пиксель) + серое, размытое, границы и морфология (по байту на пиксель)
+DECODE_WORKING_FACTOR = 7 / 3
+
+
+class MemoryBudget:
+    """Общий для потоков и процессов бюджет памяти: этапы резервируют оценку заранее и ждут при нехватке.
+
+    Состояние - в разделяемой памяти multiprocessing, поэтому бюджет передаётся в дочерние
+    процессы пула через initializer (set_process_budget). Запрос больше всего бюджета урезается
+    до лимита: такая страница просто ждёт, пока остальные освободят память.
+    """
+
+    def __init__(self, limit_bytes):
+        self.limit_bytes = int(limit_bytes)
+        self._cond = multiprocessing.Condition()
+        self._used = multiprocessing.Value("q", 0, lock=False)
+        self._peak = multiprocessing.Value("q", 0, lock=False)
+        self._waits = multiprocessing.Value("q", 0, lock=False)
+
+    def reserve(self, nbytes, timeout=None):
+        """Резервирует nbytes; возвращает фактически зарезервированное или None по таймауту"""
+        nbytes = max(0, min(int(nbytes), self.limit_bytes))
+        with self._cond:
+            if self._used.value + nbytes > self.limit_bytes:
+                self._waits.value += 1
+                if not self._cond.wait_for(lambda: self._used.value + nbytes <= self.limit_bytes, timeout):
+                    return None
+            self._used.value += nbytes
+            self._peak.value = max(self._peak.value, self._used.value)
+        return nbytes
+
+    def release(self, nbytes):
+        with self._cond:
+            self._used.value = max(0, self._used.value - nbytes)
+            self._cond.notify_all()
+
+    @contextmanager
+    def reservation(self, nbytes):
+        reserved = self.reserve(nbytes)
+        try:
+            yield reserved
+        finally:
+            self.release(reserved)
+
+    def get_stats(self):
+        with self._cond:
+            return {'limit_bytes': self.limit_bytes, 'used_bytes': self._used.value,
+                    'peak_bytes': self._peak.value, 'waits': self._waits.value}
+
+
+# Бюджет этого процесса (в дочерних - переданный через initializer пула)
+_process_budget = None
+
+
+def set_process_budget(budget):
+    global _process_budget
+    _process_budget = budget
+
+
+def process_budget():
+    return _process_budget
+
+
+def reserve_memory(nbytes):
+    """Резервирование в бюджете процесса; без бюджета - ничего не делает"""
+    budget = _process_budget
+    return budget.reservation(nbytes) if budget is not None else nullcontext()
+
+
+def pool_kwargs():
+    """Аргументы ProcessPoolExecutor, передающие бюджет в дочерние процессы"""
+    if _process_budget is None:
+        return {}
+    return {"initializer": set_process_budget, "initargs": (_process_budget,)}
+
+
+def estimate_page_bytes(image_path, working_factor=DECODE_WORKING_FACTOR):
+    """Оценка пиковой памяти нарезки страницы по размерам из заголовка (без декодирования).
+
+    working_factor=1 - только сама декодированная страница.
+    """
+    dimensions = read_dimensions(image_path)
+    if dimensions:
+        width, height = dimensions
+        return int(width * height * 3 * working_factor)
+    try:
+        # Размеры неизвестны: сжатие изображений манги обычно не больше 1:10
+        return int(os.path.getsize(image_path) * 10 * working_factor)
+    except OSError:
+        return 0
+
+
+def parse_size(text):
+    """'512M', '2G', '1048576' -> байты"""
+    text = str(text).strip().upper()
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Границы корзин гистограмм задержек по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(label_names, labels):
+    if set(labels) != set(label_names):
+        raise ValueError(f"Ожидались метки {label_names}, получены {tuple(labels)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names, key, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, key)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def samples(self):
+        """[(суффикс имени, метки, значение)] для экспорта"""
+        with self._lock:
+            return [("", self._format(key), value) for key, value in sorted(self._values.items())]
+
+    def _format(self, key, extra=()):
+        return _format_labels(self.label_names, key, extra)
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(zip(self.label_names, key)), "value": value}
+                    for key, value in sorted(self._values.items())]
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик"""
+
+    type_name = "counter"
+
+    def inc(self, value=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+
+class Gauge(Metric):
+    """Текущее значение (размер кэша, пропускная способность последнего запуска и т.п.)"""
+
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+
+class Histogram(Metric):
+    """Распределение задержек по корзинам (накопительно, как в Prometheus)"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    result.append(("_bucket", self._format(key, [("le", repr(float(bound)))]), cumulative))
+                result.append(("_bucket", self._format(key, [("le", "+Inf")]), state["count"]))
+                result.append(("_sum", self._format(key), state["sum"]))
+                result.append(("_count", self._format(key), state["count"]))
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(zip(self.label_names, key)), "count": state["count"],
+                     "sum": round(state["sum"], 6),
+                     "buckets": dict(zip(map(str, self.buckets), state["counts"]))}
+                    for key, state in sorted(self._values.items())]
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса: выгрузка в текстовый формат Prometheus и снимки JSONL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Метрика {name} уже зарегистрирована как {metric.type_name}")
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter, name, help_text, label_names)
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._register(Gauge, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, label_names, buckets)
+
+    def metrics(self):
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def to_prometheus(self):
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {"timestamp": time.time(),
+                "metrics": {metric.name: {"type": metric.type_name, "values": metric.snapshot()}
+                            for metric in self.metrics()}}
+
+    def write_prometheus(self, path):
+        """Атомарная запись (textfile collector node exporter не увидит полузаписанный файл)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def append_jsonl(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+
+
+# Общий реестр процесса
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Периодически выгружает реестр в файл Prometheus и/или JSONL; stop() делает последнюю выгрузку"""
+
+    def __init__(self, prometheus_path=None, jsonl_path=None, interval=15.0, registry=REGISTRY):
+        self.prometheus_path = prometheus_path
+        self.jsonl_path = jsonl_path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        try:
+            if self.prometheus_path:
+                self.registry.write_prometheus(self.prometheus_path)
+            if self.jsonl_path:
+                self.registry.append_jsonl(self.jsonl_path)
+        except OSError as e:
+            print(f"Не удалось записать метрики: {e}")
+
+    def start(self):
+        def loop():
+            while not self._stop.wait(self.interval):
+                self.write()
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
+
+
+def exporter_from_env():
+    """Экспорт по переменным окружения MANGA_METRICS_PROM / MANGA_METRICS_JSONL (для графического режима)"""
+    prometheus_path = os.environ.get("MANGA_METRICS_PROM")
+    jsonl_path = os.environ.get("MANGA_METRICS_JSONL")
+    if not prometheus_path and not jsonl_path:
+        return None
+    interval = float(os.environ.get("MANGA_METRICS_INTERVAL", "15"))
+    return MetricsExporter(prometheus_path, jsonl_path, interval).start()
@@ -0,0 +1,340 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+from .frame_catalog import FrameCatalog
+from .memory_budget import estimate_page_bytes, pool_kwargs, reserve_memory
+from .text_regions import crop_regions, detect_text_regions, prepare_gray
+
+OCR_CACHE_FILENAME = ".ocr_cache.sqlite"
+
+
+class OcrEngine:
+    """Локальный движок распознавания: recognize(img) -> [{'text', 'box': [x, y, w, h], 'confidence'}].
+
+    img - серое или BGR-изображение.
+    """
+
+    name = "base"
+
+    def __init__(self, **options):
+        self.options = options
+
+    def cache_key(self):
+        """Ключ результатов в кэше: другой движок или язык - другое распознавание"""
+        return f"{self.name}:{json.dumps(self.options, sort_keys=True)}"
+
+    def recognize(self, img):
+        raise NotImplementedError
+
+
+class StubOcrEngine(OcrEngine):
+    """Заглушка для проверки конвейера: вместо текста - размер изображения"""
+
+    name = "stub"
+
+    def recognize(self, img):
+        height, width = img.shape[:2]
+        return [{"text": f"[{width}x{height}]", "box": [0, 0, width, height], "confidence": 1.0}]
+
+
+class TesseractOcrEngine(OcrEngine):
+    """Tesseract через pytesseract (нужны pip install pytesseract и сам tesseract)"""
+
+    name = "tesseract"
+
+    def __init__(self, lang="rus+eng", **options):
+        super().__init__(lang=lang, **options)
+        try:
+            import pytesseract
+        except ImportError:
+            raise RuntimeError("Для движка tesseract установите пакет pytesseract")
+        self.pytesseract = pytesseract
+
+    def recognize(self, img):
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if img.ndim == 3 else img
+        data = self.pytesseract.image_to_data(rgb, lang=self.options["lang"],
+                                              output_type=self.pytesseract.Output.DICT)
+        # Слова собираем в строки: текст, общая рамка и средняя уверенность
+        lines = {}
+        for i, word in enumerate(data["text"]):
+            word = word.strip()
+            confidence = float(data["conf"][i])
+            if not word or confidence < 0:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            box = (data["left"][i], data["top"][i], data["width"][i], data["height"][i])
+            lines.setdefault(key, []).append((word, box, confidence))
+
+        result = []
+        for key in sorted(lines):
+            words = lines[key]
+            x0 = min(box[0] for _, box, _ in words)
+            y0 = min(box[1] for _, box, _ in words)
+            x1 = max(box[0] + box[2] for _, box, _ in words)
+            y1 = max(box[1] + box[3] for _, box, _ in words)
+            result.append({
+                "text": " ".join(word for word, _, _ in words),
+                "box": [x0, y0, x1 - x0, y1 - y0],
+                "confidence": sum(conf for _, _, conf in words) / len(words) / 100,
+            })
+        return result
+
+
+OCR_ENGINES = {
+    StubOcrEngine.name: StubOcrEngine,
+    TesseractOcrEngine.name: TesseractOcrEngine,
+}
+
+
+def create_engine(name, **options):
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Неизвестный движок распознавания: {name}")
+    return OCR_ENGINES[name](**options)
+
+
+def default_engine_name():
+    """tesseract, если он установлен, иначе заглушка (предупреждает вызывающий код)"""
+    try:
+        import pytesseract  # noqa: F401
+        return TesseractOcrEngine.name
+    except ImportError:
+        return StubOcrEngine.name
+
+
+def results_key(engine, use_regions=True):
+    """Ключ результатов в кэше с учётом режима (области текста или фрейм целиком)"""
+    return engine.cache_key() + (":regions" if use_regions else "")
+
+
+def read_frame(frame_path):
+    """Фрейм для распознавания сразу в сером: без цветного декодирования и повторного перевода в серое"""
+    return cv2.imread(str(frame_path), cv2.IMREAD_GRAYSCALE)
+
+
+def recognize_regions(engine, img):
+    """Распознаёт только найденные области текста; рамки результата - в координатах фрейма.
+
+    Для серого img (read_frame) поиск областей только размывает его, а движок получает вырезки из него же.
+    """
+    regions = detect_text_regions(prepare_gray(img))
+    result = []
+    for (x, y, _, _), crop in zip(regions, crop_regions(img, regions)):
+        for item in engine.recognize(crop):
+            bx, by, bw, bh = item["box"]
+            result.append(dict(item, box=[bx + x, by + y, bw, bh]))
+    return result
+
+
+def result_text(result):
+    """Текст результата распознавания одной строкой на блок"""
+    return "\n".join(item["text"] for item in result or [])
+
+
+class OcrCache:
+    """Кэш распознавания в SQLite по хэшу содержимого фрейма (перемещение и переименование не сбрасывают)"""
+
+    def __init__(self, frames_path):
+        self.frames_path = Path(frames_path)
+        self.frames_path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.frames_path / OCR_CACHE_FILENAME), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Хэш содержимого по идентичности файла, чтобы не перечитывать неизменённые фреймы
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                identity TEXT PRIMARY KEY,
+                hash TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                hash TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (hash, engine)
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def identity(frame_path):
+        """Идентичность файла: устройство, inode, размер и время изменения"""
+        st = os.stat(frame_path)
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+    def content_hash(self, frame_path):
+        identity = self.identity(frame_path)
+        with self._lock:
+            row = self.conn.execute("SELECT hash FROM files WHERE identity = ?", (identity,)).fetchone()
+        if row:
+            return row[0]
+        with open(frame_path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO files (identity, hash) VALUES (?, ?)", (identity, digest))
+        return digest
+
+    def prune_files(self, frame_paths):
+        """Забывает идентичности файлов, которых нет среди frame_paths (удалённых и перезаписанных)"""
+        live = []
+        for frame_path in frame_paths:
+            try:
+                live.append((self.identity(frame_path),))
+            except OSError:
+                pass
+        with self._lock, self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_files (identity TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM live_files")
+            self.conn.executemany("INSERT OR IGNORE INTO live_files (identity) VALUES (?)", live)
+            removed = self.conn.execute(
+                "DELETE FROM files WHERE identity NOT IN (SELECT identity FROM live_files)").rowcount
+            self.conn.execute("DELETE FROM live_files")
+        return removed
+
+    def get(self, content_hash, engine_key=None):
+        """Результат по хэшу; без engine_key - последний результат любого движка"""
+        with self._lock:
+            if engine_key is None:
+                row = self.conn.execute("SELECT result FROM results WHERE hash = ? ORDER BY rowid DESC LIMIT 1",
+                                        (content_hash,)).fetchone()
+            else:
+                row = self.conn.execute("SELECT result FROM results WHERE hash = ? AND engine = ?",
+                                        (content_hash, engine_key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, content_hash, engine_key, result):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO results (hash, engine, result) VALUES (?, ?, ?)",
+                              (content_hash, engine_key, json.dumps(result, ensure_ascii=False)))
+
+    def lookup(self, frame_path, engine_key=None):
+        """Результат для файла фрейма или None (для просмотрщика - без распознавания)"""
+        try:
+            return self.get(self.content_hash(frame_path), engine_key)
+        except OSError:
+            return None
+
+
+# Движки, уже созданные в этом (дочернем) процессе
+_engines = {}
+
+
+def ocr_batch_worker(engine_name, engine_options, frame_paths, use_regions=True):
+    """Распознаёт пачку фреймов в дочернем процессе; None - фрейм не прочитан"""
+    key = (engine_name, json.dumps(engine_options, sort_keys=True))
+    engine = _engines.get(key)
+    if engine is None:
+        engine = _engines[key] = create_engine(engine_name, **engine_options)
+    results = []
+    for frame_path in frame_paths:
+        # Память под декодирование фрейма - из общего бюджета, как при нарезке
+        with reserve_memory(estimate_page_bytes(frame_path)):
+            img = read_frame(frame_path)
+            if img is None:
+                results.append(None)
+            elif use_regions:
+                results.append(recognize_regions(engine, img))
+            else:
+                results.append(engine.recognize(img))
+    return results
+
+
+class OcrStage:
+    """Этап распознавания после нарезки: пачки фреймов в пуле процессов, повторно - только изменённые"""
+
+    def __init__(self, frames_path, engine="stub", engine_options=None, processes=2, batch_size=16,
+                 use_regions=True, progress_callback=None):
+        self.frames_path = Path(frames_path)
+        self.engine_name = engine
+        self.engine_options = engine_options or {}
+        # Распознавать только найденные области текста, а не фрейм целиком
+        self.use_regions = use_regions
+        self.processes = max(1, processes)
+        self.batch_size = max(1, batch_size)
+        self.progress_callback = progress_callback
+        self.stats = {
+            'total_frames': 0,
+            'cached_frames': 0,
+            'recognized_frames': 0,
+            'failed_frames': 0,
+            'start_time': None,
+            'end_time': None
+        }
+
+    def get_stats(self):
+        return self.stats
+
+    def run(self, frame_paths=None):
+        """Распознаёт фреймы (по умолчанию - все из каталога, по порядку)"""
+        self.stats['start_time'] = datetime.now()
+        # Движок создаём и здесь: ошибка конфигурации видна до запуска процессов
+        engine_key = results_key(create_engine(self.engine_name, **self.engine_options), self.use_regions)
+
+        full_sync = frame_paths is None
+        if full_sync:
+            catalog = FrameCatalog(self.frames_path)
+            frame_paths = [self.frames_path / path for path in catalog.sync()]
+            catalog.close()
+        self.stats['total_frames'] = len(frame_paths)
+
+        cache = OcrCache(self.frames_path)
+        if full_sync:
+            # Идентичности удалённых и перезаписанных фреймов больше не понадобятся
+            cache.prune_files(frame_paths)
+        # Одинаковые по содержимому фреймы распознаём один раз
+        pending = {}
+        for frame_path in frame_paths:
+            content_hash = cache.content_hash(frame_path)
+            if cache.get(content_hash, engine_key) is not None:
+                self.stats['cached_frames'] += 1
+            else:
+                pending.setdefault(content_hash, str(frame_path))
+        print(f"Распознавание: {len(frame_paths)} фреймов, в кэше {self.stats['cached_frames']}, "
+              f"к распознаванию {len(pending)}")
+
+        items = list(pending.items())
+        batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        args = [[frame_path for _, frame_path in batch] for batch in batches]
+
+        def store(batch, results):
+            for (content_hash, frame_path), result in zip(batch, results):
+                if result is None:
+                    print(f"Не удалось прочитать фрейм {frame_path}")
+                    self.stats['failed_frames'] += 1
+                    continue
+                cache.put(content_hash, engine_key, result)
+                self.stats['recognized_frames'] += 1
+            if self.progress_callback:
+                self.progress_callback(self.stats['recognized_frames'] + self.stats['failed_frames'], len(items))
+
+        try:
+            if self.processes > 1 and len(batches) > 1:
+                with ProcessPoolExecutor(max_workers=self.processes, **pool_kwargs()) as executor:
+                    futures = [executor.submit(ocr_batch_worker, self.engine_name, self.engine_options, paths,
+                                               self.use_regions)
+                               for paths in args]
+                    for batch, future in zip(batches, futures):
+                        store(batch, future.result())
+            else:
+                for batch, paths in zip(batches, args):
+                    store(batch, ocr_batch_worker(self.engine_name, self.engine_options, paths, self.use_regions))
+        finally:
+            cache.close()
+
+        self.stats['end_time'] = datetime.now()
+        message = (f"Распознавание завершено: новых {self.stats['recognized_frames']}, "
+                   f"из кэша {self.stats['cached_frames']}, ошибок {self.stats['failed_frames']}.")
+        print(message)
+        return self.stats['failed_frames'] == 0, message
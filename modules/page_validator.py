@@ -0,0 +1,136 @@
+import os
+import struct
+
+# Сколько байт читать с начала и с конца файла: полного декодирования не делаем
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+# Маркеры JPEG, после которых идут размеры кадра (SOF0..SOF15 кроме DHT/JPG/DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class PageValidationError(Exception):
+    """Скачанный файл не является целым изображением"""
+
+
+def detect_format(head):
+    if head.startswith(JPEG_SIGNATURE):
+        return "jpeg"
+    if head.startswith(PNG_SIGNATURE):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def _png_size(head):
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def _jpeg_size(head):
+    """Ищет маркер SOF в заголовке; None, если он дальше HEAD_BYTES"""
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        if marker == 0xFF:
+            # Заполнитель между маркерами
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack(">H", head[pos + 2:pos + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if pos + 9 > len(head):
+                return None
+            height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def _gif_size(head):
+    return struct.unpack("<HH", head[6:10]) if len(head) >= 10 else None
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8X" and len(head) >= 30:
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    return None
+
+
+_SIZE_PARSERS = {"jpeg": _jpeg_size, "png": _png_size, "gif": _gif_size, "webp": _webp_size}
+
+
+def _has_end_marker(image_format, head, tail, size):
+    if image_format == "webp":
+        # У WebP нет маркера конца: длина RIFF (байты 4-8) плюс 8 байт заголовка - это длина файла
+        return size >= int.from_bytes(head[4:8], "little") + 8
+    if image_format == "jpeg":
+        # Некоторые кодировщики дописывают нули после EOI
+        return b"\xff\xd9" in tail.rstrip(b"\x00")[-4:]
+    if image_format == "png":
+        return tail[-12:-4] == b"\x00\x00\x00\x00IEND"
+    if image_format == "gif":
+        return tail.rstrip(b"\x00").endswith(b"\x3b")
+    return True
+
+
+def validate_page(path, expected_length=None):
+    """Быстрая проверка страницы: длина, сигнатура, маркер конца и размеры из заголовка.
+
+    Возвращает (формат, (ширина, высота)); при ошибке бросает PageValidationError.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        raise PageValidationError("пустой файл")
+    if expected_length is not None and size != expected_length:
+        raise PageValidationError(f"получено {size} байт из {expected_length}")
+
+    with open(path, "rb") as f:
+        head = f.read(HEAD_BYTES)
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read(TAIL_BYTES)
+
+    image_format = detect_format(head)
+    if image_format is None:
+        if head.lstrip()[:1] == b"<":
+            raise PageValidationError("вместо изображения получена HTML-страница")
+        raise PageValidationError(f"неизвестный формат (начало: {head[:8].hex()})")
+
+    if not _has_end_marker(image_format, head, tail, size):
+        raise PageValidationError(f"файл {image_format} обрезан (нет маркера конца)")
+
+    dimensions = _SIZE_PARSERS[image_format](head)
+    if dimensions is not None and (dimensions[0] == 0 or dimensions[1] == 0):
+        raise PageValidationError(f"нулевой размер изображения {dimensions[0]}x{dimensions[1]}")
+
+    return image_format, dimensions
+
+
+def read_dimensions(path):
+    """(ширина, высота) из заголовка без декодирования; None, если не удалось"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEAD_BYTES)
+    except OSError:
+        return None
+    parse = _SIZE_PARSERS.get(detect_format(head))
+    return parse(head) if parse else None
@@ -0,0 +1,223 @@
+import contextlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from .chapter_index import ChapterIndex
+from .download_manga_chapter import MangaDownloader
+from .frame_catalog import FrameCatalog, clear_frames, clear_shard
+from .frame_extractor import EXTRACT_RATE, extract_chapter_worker, record_extraction_metrics
+from .memory_budget import pool_kwargs
+
+STATE_FILENAME = ".pipeline_state.json"
+
+
+class ChapterPipeline:
+    """Конвейер по главам: глава N нарезается, пока скачивается глава N+1.
+
+    Граф зависимостей: скачивание(N) -> нарезка(N), скачивание(N) -> скачивание(N+1)
+    (ссылка на следующую главу есть только на странице текущей). Сеть и CPU ограничены
+    отдельно: download_workers потоков на страницы, extract_processes процессов на нарезку.
+    Состояние сохраняется после каждого шага, поэтому после сбоя работа продолжается с места остановки.
+    """
+
+    def __init__(self, chapters_path, frames_path, download_workers=4, extract_processes=2,
+                 progress_callback=None, executor=None, connection_limiter=None, fsync_batch=0,
+                 transport="auto"):
+        self.chapters_path = Path(chapters_path)
+        self.frames_path = Path(frames_path)
+        self.download_workers = download_workers
+        self.extract_processes = max(1, extract_processes)
+        self.progress_callback = progress_callback
+        # Общие для нескольких конвейеров пул процессов и лимит соединений (очередь заданий)
+        self.executor = executor
+        self.connection_limiter = connection_limiter
+        # Сколько скачанных страниц сбрасывать на диск одним fsync (0 - без fsync)
+        self.fsync_batch = fsync_batch
+        self.transport = transport
+        self.state_path = self.chapters_path / STATE_FILENAME
+        self.downloader = None
+        self.is_cancelled = False
+        self.stats = {
+            'total_chapters': 0,
+            'downloaded_chapters': 0,
+            'extracted_chapters': 0,
+            'failed_chapters': 0,
+            'resumed_chapters': 0,
+            'total_frames': 0,
+            'start_time': None,
+            'end_time': None
+        }
+
+    def cancel(self):
+        """Отменить работу конвейера (уже запущенные нарезки дорабатывают)"""
+        self.is_cancelled = True
+        if self.downloader:
+            self.downloader.cancel_download()
+
+    def get_stats(self):
+        return self.stats
+
+    def load_state(self, start_url, fresh=False, first_chapter=1):
+        """Загружает контрольную точку; при другом стартовом URL или первой главе начинает заново"""
+        if not fresh and self.state_path.exists():
+            try:
+                with open(self.state_path, encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("start_url") == start_url and state.get("first_chapter", 1) == first_chapter:
+                    return state, False
+            except (OSError, ValueError) as e:
+                print(f"Не удалось прочитать состояние конвейера: {e}")
+        return {"start_url": start_url, "first_chapter": first_chapter, "chapters": {}}, True
+
+    def save_state(self, state):
+        """Атомарно сохраняет контрольную точку"""
+        temp_path = self.state_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.state_path)
+
+    def _notify(self, stage, chapter_num, num_chapters):
+        if self.progress_callback:
+            self.progress_callback(stage, chapter_num, num_chapters)
+
+    def run(self, start_url, num_chapters, fresh=False, first_chapter=1):
+        """Скачивает и нарезает num_chapters глав, перекрывая сеть и CPU.
+
+        first_chapter - номер первой главы в серии, начинающейся с start_url (адрес - из индекса глав).
+        """
+        self.stats['start_time'] = datetime.now()
+        self.stats['total_chapters'] = num_chapters
+        self.chapters_path.mkdir(parents=True, exist_ok=True)
+        self.frames_path.mkdir(parents=True, exist_ok=True)
+
+        state, is_new = self.load_state(start_url, fresh, first_chapter)
+        chapters = state["chapters"]
+        catalog = FrameCatalog(self.frames_path)
+        if is_new:
+            # Новый запуск: старые фреймы и их порядок больше не нужны
+            clear_frames(self.frames_path)
+            catalog.clear()
+            self.save_state(state)
+
+        self.downloader = MangaDownloader(workers=self.download_workers,
+                                          connection_limiter=self.connection_limiter,
+                                          fsync_batch=self.fsync_batch, transport=self.transport)
+        session = self.downloader.create_session()
+        chapter_index = ChapterIndex(self.chapters_path)
+
+        futures = {}
+        next_to_publish = 1
+
+        def chapter_shard(chapter_num):
+            # Папки глав называются по номеру главы в серии, а не по номеру в этом запуске
+            return f"chapter_{first_chapter + chapter_num - 1:03d}"
+
+        def submit(executor, chapter_num):
+            shard = chapter_shard(chapter_num)
+            # Частичный результат прерванной нарезки выбрасываем
+            clear_shard(self.frames_path / shard)
+            catalog.remove_shard(shard)
+            futures[chapter_num] = executor.submit(
+                extract_chapter_worker, str(self.chapters_path / shard), str(self.frames_path / shard))
+
+        def publish_ready(wait=False):
+            # В каталог главы попадают строго по порядку, даже если нарезка закончилась раньше
+            nonlocal next_to_publish
+            while next_to_publish <= num_chapters:
+                info = chapters.get(str(next_to_publish))
+                if info and info.get("extracted"):
+                    next_to_publish += 1
+                    continue
+                future = futures.get(next_to_publish)
+                if future is None or (not wait and not future.done()):
+                    return
+                try:
+                    frames, chapter_stats = future.result()
+                    catalog.append([catalog.relative(frame) for frame in frames])
+                    info["extracted"] = True
+                    self.stats['extracted_chapters'] += 1
+                    self.stats['total_frames'] += chapter_stats['total_frames']
+                    record_extraction_metrics(chapter_stats)
+                except Exception as e:
+                    print(f"Ошибка нарезки главы {next_to_publish}: {e}")
+                    info["error"] = str(e)
+                    self.stats['failed_chapters'] += 1
+                self.save_state(state)
+                self._notify("extract", next_to_publish, num_chapters)
+                next_to_publish += 1
+
+        if self.executor is not None:
+            executor_context = contextlib.nullcontext(self.executor)
+        else:
+            executor_context = ProcessPoolExecutor(max_workers=self.extract_processes, **pool_kwargs())
+
+        try:
+            with executor_context as executor:
+                # Главы, скачанные до сбоя, но не нарезанные - сразу в нарезку
+                chapter_num = 1
+                url = self.downloader.locate_chapter(session, chapter_index, start_url, first_chapter)
+                while chapter_num <= num_chapters:
+                    info = chapters.get(str(chapter_num))
+                    if not info or not info.get("downloaded"):
+                        break
+                    self.stats['resumed_chapters'] += 1
+                    if not info.get("extracted"):
+                        submit(executor, chapter_num)
+                    if not info.get("next_url"):
+                        url = None
+                        break
+                    url = info["next_url"]
+                    chapter_num += 1
+
+                while url and chapter_num <= num_chapters and not self.is_cancelled:
+                    publish_ready()
+
+                    print(f"\n=== Конвейер: скачивание главы {chapter_num} ===")
+                    failed_before = self.downloader.stats['failed_chapters']
+                    next_link = self.downloader.download_chapter(
+                        session, url, first_chapter + chapter_num - 1, self.chapters_path)
+                    if self.is_cancelled:
+                        break
+
+                    # Прежняя копия главы могла остаться на месте, поэтому непустая папка - ещё не успех
+                    chapter_dir = self.chapters_path / chapter_shard(chapter_num)
+                    if (self.downloader.stats['failed_chapters'] > failed_before
+                            or not chapter_dir.exists() or not any(chapter_dir.iterdir())):
+                        print(f"Глава {chapter_num} не скачана, конвейер остановлен")
+                        self.stats['failed_chapters'] += 1
+                        break
+
+                    next_url = self.downloader.absolute_url(url, next_link) if next_link else None
+                    chapter_index.record(start_url, first_chapter + chapter_num - 1, url, next_url)
+                    chapters[str(chapter_num)] = {"url": url, "next_url": next_url,
+                                                  "downloaded": True, "extracted": False}
+                    self.save_state(state)
+                    self.stats['downloaded_chapters'] += 1
+                    self._notify("download", chapter_num, num_chapters)
+
+                    submit(executor, chapter_num)
+
+                    url = next_url
+                    chapter_num += 1
+                    if url and chapter_num <= num_chapters:
+                        # Задержка между главами
+                        time.sleep(1)
+
+                publish_ready(wait=True)
+
+        finally:
+            catalog.close()
+            chapter_index.close()
+        self.stats['end_time'] = datetime.now()
+        elapsed = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
+        if elapsed > 0:
+            EXTRACT_RATE.set(round(self.stats['total_frames'] / elapsed, 3))
+
+        done = sum(1 for info in chapters.values() if info.get("extracted"))
+        message = f"Конвейер завершён: готово глав {done}, фреймов {self.stats['total_frames']}."
+        print(message)
+        return done > 0 and self.stats['failed_chapters'] == 0, message
@@ -0,0 +1,86 @@
+import threading
+from collections import defaultdict, deque
+
+
+class ProgressBus:
+    """Канал событий от рабочих потоков к Tk: частые обновления прогресса объединяются"""
+
+    def __init__(self, interval_ms=100):
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        # Последнее значение по каждой теме (промежуточные перезаписываются)
+        self._latest = {}
+        # События, которые нельзя терять, в порядке поступления
+        self._events = deque()
+        self._subscribers = defaultdict(list)
+        self._widget = None
+        self._job = None
+
+    def publish(self, topic, **payload):
+        """Обновление прогресса из любого потока; до UI доходит только последнее значение"""
+        with self._lock:
+            self._latest[topic] = payload
+
+    def emit(self, topic, **payload):
+        """Событие из любого потока, которое будет доставлено обязательно"""
+        with self._lock:
+            self._events.append((topic, payload))
+
+    def subscribe(self, topic, handler):
+        """Подписка обработчика; обработчики вызываются только в потоке Tk"""
+        self._subscribers[topic].append(handler)
+        # Доставка могла остановиться, когда подписчиков не осталось
+        if self._widget is not None and self._job is None:
+            self._job = self._widget.after(self.interval_ms, self._pump)
+
+    def unsubscribe(self, topic, handler):
+        if handler in self._subscribers[topic]:
+            self._subscribers[topic].remove(handler)
+
+    def has_subscribers(self):
+        return any(self._subscribers.values())
+
+    def dispatch(self):
+        """Доставляет накопленные обновления подписчикам"""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            events, self._events = self._events, deque()
+
+        # Сначала прогресс, затем события (например, завершение) в порядке поступления
+        for topic, payload in list(latest.items()) + list(events):
+            for handler in list(self._subscribers[topic]):
+                try:
+                    handler(**payload)
+                except Exception as e:
+                    print(f"Ошибка обработчика события {topic}: {e}")
+
+    def attach(self, widget):
+        """Запускает периодическую доставку через after() указанного (долгоживущего) виджета"""
+        if self._widget is not None:
+            return
+        self._widget = widget
+        self._job = widget.after(self.interval_ms, self._pump)
+
+    def detach(self):
+        if self._widget is not None and self._job is not None:
+            try:
+                self._widget.after_cancel(self._job)
+            except Exception:
+                pass
+        self._widget = None
+        self._job = None
+
+    def _pump(self):
+        if self._widget is None:
+            return
+        self.dispatch()
+        if not self.has_subscribers():
+            # Слушать некому - останавливаемся до следующей подписки
+            self._job = None
+            return
+        try:
+            self._job = self._widget.after(self.interval_ms, self._pump)
+        except Exception:
+            # Виджет уничтожен - доставлять больше некуда
+            self._widget = None
+            self._job = None
@@ -0,0 +1,81 @@
+import threading
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Описание страницы в слэбе: передаётся в дочерний процесс вместо самого массива
+PageHandle = namedtuple("PageHandle", ["slab", "name", "shape", "dtype"])
+
+# Слэбы, уже подключённые в этом (дочернем) процессе: имя -> SharedMemory
+_attached = {}
+
+
+class SharedPagePool:
+    """Пул слэбов фиксированного размера в разделяемой памяти для декодированных страниц.
+
+    Родительский процесс кладёт страницу в свободный слэб (put) и передаёт дочерним процессам
+    только PageHandle; те читают массив из слэба без копирования (attach_page). Слэб возвращается
+    в пул явным release, когда все задачи по странице завершены.
+    """
+
+    def __init__(self, slab_bytes=32 * 1024 * 1024, slabs=4):
+        self.slab_bytes = slab_bytes
+        self.slabs = [shared_memory.SharedMemory(create=True, size=slab_bytes) for _ in range(slabs)]
+        self._free = list(range(slabs))
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fits(self, img):
+        return img.nbytes <= self.slab_bytes
+
+    def acquire(self, timeout=None):
+        """Номер свободного слэба или None, если за timeout ни один не освободился"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._free, timeout):
+                return None
+            return self._free.pop()
+
+    def release(self, slab):
+        with self._cond:
+            self._free.append(slab)
+            self._cond.notify()
+
+    def put(self, img, timeout=None, slab=None):
+        """Копирует страницу в свободный (или заранее взятый) слэб; None, если свободных нет"""
+        if not self.fits(img):
+            raise ValueError(f"Страница {img.nbytes} байт больше слэба ({self.slab_bytes} байт)")
+        if slab is None:
+            slab = self.acquire(timeout)
+        if slab is None:
+            return None
+        shm = self.slabs[slab]
+        np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+        return PageHandle(slab, shm.name, img.shape, img.dtype.str)
+
+    def view(self, handle):
+        """Массив страницы в слэбе (в родительском процессе)"""
+        return np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=self.slabs[handle.slab].buf)
+
+    def close(self):
+        for shm in self.slabs:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.slabs = []
+
+
+def attach_page(handle):
+    """Массив страницы в слэбе без копирования (в дочернем процессе); подключение слэба кэшируется"""
+    shm = _attached.get(handle.name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=handle.name)
+        _attached[handle.name] = shm
+    return np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=shm.buf)
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+AUDIO_DIRNAME = ".audio"
+
+
+class SpeechEngine:
+    """Локальный синтезатор речи: synthesize(text, path) записывает WAV-файл"""
+
+    name = "base"
+
+    def __init__(self, **options):
+        self.options = options
+
+    def cache_key(self):
+        """Ключ аудио в кэше: другой голос или скорость - другой файл"""
+        return f"{self.name}:{json.dumps(self.options, sort_keys=True)}"
+
+    def synthesize(self, text, output_path):
+        raise NotImplementedError
+
+
+class StubSpeechEngine(SpeechEngine):
+    """Заглушка для проверки очереди: тон, длительность которого зависит от длины текста"""
+
+    name = "stub"
+
+    def __init__(self, sample_rate=16000, **options):
+        super().__init__(sample_rate=sample_rate, **options)
+
+    def synthesize(self, text, output_path):
+        rate = self.options["sample_rate"]
+        duration = min(5.0, 0.2 + 0.03 * len(text))
+        t = np.arange(int(rate * duration)) / rate
+        samples = (0.2 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+        with wave.open(str(output_path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(rate)
+            f.writeframes(samples.tobytes())
+
+
+class EspeakSpeechEngine(SpeechEngine):
+    """espeak-ng (или espeak) из PATH"""
+
+    name = "espeak"
+
+    def __init__(self, voice="ru", rate=160, **options):
+        super().__init__(voice=voice, rate=rate, **options)
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.executable:
+            raise RuntimeError("Для движка espeak установите espeak-ng")
+
+    def synthesize(self, text, output_path):
+        subprocess.run([self.executable, "-v", self.options["voice"], "-s", str(self.options["rate"]),
+                        "-w", str(output_path), text], check=True, capture_output=True)
+
+
+class Pyttsx3SpeechEngine(SpeechEngine):
+    """pyttsx3 (SAPI5 в Windows, NSSpeech в macOS); нужен pip install pyttsx3.
+
+    pyttsx3 не потокобезопасен: движок создаётся и работает в одном собственном потоке,
+    synthesize из любого потока ставит задание туда и ждёт результата.
+    """
+
+    name = "pyttsx3"
+
+    def __init__(self, voice=None, rate=170, **options):
+        super().__init__(voice=voice, rate=rate, **options)
+        try:
+            import pyttsx3
+        except ImportError:
+            raise RuntimeError("Для движка pyttsx3 установите пакет pyttsx3")
+        self.pyttsx3 = pyttsx3
+        self.engine = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyttsx3")
+
+    def synthesize(self, text, output_path):
+        self._executor.submit(self._synthesize, text, output_path).result()
+
+    def _synthesize(self, text, output_path):
+        if self.engine is None:
+            self.engine = self.pyttsx3.init()
+            self.engine.setProperty("rate", self.options["rate"])
+            if self.options["voice"]:
+                self.engine.setProperty("voice", self.options["voice"])
+        self.engine.save_to_file(text, str(output_path))
+        self.engine.runAndWait()
+
+
+SPEECH_ENGINES = {
+    StubSpeechEngine.name: StubSpeechEngine,
+    EspeakSpeechEngine.name: EspeakSpeechEngine,
+    Pyttsx3SpeechEngine.name: Pyttsx3SpeechEngine,
+}
+
+
+def create_speech_engine(name, **options):
+    if name not in SPEECH_ENGINES:
+        raise ValueError(f"Неизвестный синтезатор речи: {name}")
+    return SPEECH_ENGINES[name](**options)
+
+
+def default_speech_engine():
+    """Первый доступный синтезатор: pyttsx3, espeak, иначе заглушка (о ней сообщается)"""
+    reasons = []
+    for name in (Pyttsx3SpeechEngine.name, EspeakSpeechEngine.name):
+        try:
+            return create_speech_engine(name)
+        except RuntimeError as e:
+            reasons.append(str(e))
+    print(f"Синтезатор речи не найден, вместо речи будет тон-заглушка ({'; '.join(reasons)})")
+    return create_speech_engine(StubSpeechEngine.name)
+
+
+class AudioCache:
+    """Дисковый кэш озвучки: ключ - хэш текста и настроек голоса, повторы не синтезируются"""
+
+    def __init__(self, frames_path, engine):
+        self.cache_dir = Path(frames_path) / AUDIO_DIRNAME
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.engine = engine
+
+    def path_for(self, text):
+        key = hashlib.sha1(f"{self.engine.cache_key()}\n{text}".encode("utf-8")).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.wav"
+
+    def get(self, text):
+        path = self.path_for(text)
+        return path if path.exists() else None
+
+    def synthesize(self, text):
+        """Путь к аудио текста; при промахе синтезирует (атомарно, через временный файл)"""
+        path = self.path_for(text)
+        if path.exists():
+            return path
+        path.parent.mkdir(exist_ok=True)
+        temp_path = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp.wav")
+        try:
+            self.engine.synthesize(text, temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        return path
+
+
+class AudioPlayer:
+    """Неблокирующее воспроизведение WAV: winsound в Windows, иначе afplay/paplay/aplay"""
+
+    def __init__(self):
+        self.process = None
+        self.command = None
+        if sys.platform != "win32":
+            for command in ("afplay", "paplay", "aplay"):
+                if shutil.which(command):
+                    self.command = command
+                    break
+
+    def play(self, path):
+        self.stop()
+        if sys.platform == "win32":
+            import winsound
+            winsound.PlaySound(str(path), winsound.SND_FILENAME | winsound.SND_ASYNC)
+        elif self.command:
+            self.process = subprocess.Popen([self.command, str(path)],
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            print(f"Нет программы для воспроизведения звука: {path}")
+
+    def stop(self):
+        if sys.platform == "win32":
+            import winsound
+            winsound.PlaySound(None, 0)
+        elif self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+        self.process = None
+
+
+class SpeechQueue:
+    """Фоновая озвучка с опережением: текущий фрейм - первым, следующие lookahead - заранее.
+
+    Каждый speak() заменяет план целиком: при быстром листании устаревшие фразы не синтезируются.
+    """
+
+    def __init__(self, audio_cache, player=None, lookahead=3):
+        self.audio_cache = audio_cache
+        self.player = player or AudioPlayer()
+        self.lookahead = lookahead
+        # Номер последнего запроса: играем только аудио актуального фрейма
+        self.token = 0
+        self.plan = []
+        self.is_stopped = False
+        self._cond = threading.Condition()
+        self.stats = {'played_cached': 0, 'played_after_synthesis': 0, 'synthesized': 0, 'errors': 0}
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def speak(self, text, upcoming=()):
+        """Озвучивает text сейчас (из кэша - сразу) и готовит upcoming для следующих фреймов"""
+        upcoming = [item for item in upcoming if item][:self.lookahead]
+        with self._cond:
+            self.token += 1
+            token = self.token
+            cached = self.audio_cache.get(text) if text else None
+            plan = [] if cached or not text else [(token, text, True)]
+            plan.extend((token, item, False) for item in upcoming)
+            self.plan = plan
+            self._cond.notify()
+        if cached:
+            self.stats['played_cached'] += 1
+            self.player.play(cached)
+        elif not text:
+            self.player.stop()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.plan or self.is_stopped)
+                if self.is_stopped:
+                    return
+                token, text, play = self.plan.pop(0)
+            try:
+                was_cached = self.audio_cache.get(text) is not None
+                path = self.audio_cache.synthesize(text)
+                if not was_cached:
+                    self.stats['synthesized'] += 1
+            except Exception as e:
+                print(f"Ошибка синтеза речи: {e}")
+                self.stats['errors'] += 1
+                continue
+            if play and token == self.token:
+                self.stats['played_after_synthesis'] += 1
+                self.player.play(path)
+
+    def stop(self):
+        with self._cond:
+            self.is_stopped = True
+            self.plan = []
+            self._cond.notify()
+        self.player.stop()
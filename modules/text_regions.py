@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+
+def prepare_gray(img):
+    """Серое размытое изображение - общая подготовка для поиска фреймов и областей текста"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    return cv2.GaussianBlur(gray, (3, 3), 0)
+
+
+def detect_text_regions(gray, dark_threshold=110, min_glyph=4, max_glyph_frac=0.12,
+                        min_glyphs=3, padding=6, right_to_left=False):
+    """Области с текстом (реплики в облачках и подписи) в порядке чтения: [(x, y, w, h), ...].
+
+    gray - результат prepare_gray для изображения фрейма.
+    Тёмные связные компоненты размера буквы склеиваются расширением в блоки; блоки,
+    где букв мало или они не похожи на строки текста, отбрасываются. Всё - операциями над массивами.
+    """
+    height, width = gray.shape[:2]
+    if height == 0 or width == 0:
+        return []
+
+    # Тёмные пиксели (текст на светлом фоне облачка)
+    dark = (gray < dark_threshold).astype(np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(dark, connectivity=8)
+    if count <= 1:
+        return []
+
+    # Компоненты размера буквы: не мелкий шум и не крупные тёмные области рисунка
+    max_glyph = max(min_glyph + 1, int(min(height, width) * max_glyph_frac))
+    w = stats[:, cv2.CC_STAT_WIDTH]
+    h = stats[:, cv2.CC_STAT_HEIGHT]
+    area = stats[:, cv2.CC_STAT_AREA]
+    fill = area / np.maximum(w * h, 1)
+    is_glyph = (h >= min_glyph) & (h <= max_glyph) & (w <= max_glyph * 2) & (fill > 0.1) & (fill < 0.9)
+    is_glyph[0] = False
+    if not is_glyph.any():
+        return []
+    glyph_mask = is_glyph.astype(np.uint8)[labels]
+
+    # Склеиваем буквы в строки и строки в блоки: ширина ядра - около буквы
+    glyph_height = int(np.median(h[is_glyph]))
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, glyph_height), max(3, glyph_height // 2)))
+    blocks = cv2.dilate(glyph_mask, kernel)
+    block_count, block_labels, block_stats, _ = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+
+    # Сколько букв попало в каждый блок (по центрам букв)
+    glyph_ids = np.flatnonzero(is_glyph)
+    centers_x = (stats[glyph_ids, cv2.CC_STAT_LEFT] + w[glyph_ids] // 2).clip(0, width - 1)
+    centers_y = (stats[glyph_ids, cv2.CC_STAT_TOP] + h[glyph_ids] // 2).clip(0, height - 1)
+    glyphs_per_block = np.bincount(block_labels[centers_y, centers_x], minlength=block_count)
+
+    regions = []
+    for block in np.flatnonzero(glyphs_per_block >= min_glyphs):
+        if block == 0:
+            continue
+        x, y, bw, bh = block_stats[block, :4]
+        x0, y0 = max(0, x - padding), max(0, y - padding)
+        x1, y1 = min(width, x + bw + padding), min(height, y + bh + padding)
+        regions.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+
+    return reading_order(regions, right_to_left)
+
+
+def reading_order(regions, right_to_left=False):
+    """Сортирует области по строкам сверху вниз, внутри строки - слева направо (или справа налево)"""
+    if not regions:
+        return []
+    tolerance = max(1, int(np.median([region[3] for region in regions]) // 2))
+    rows = []
+    for region in sorted(regions, key=lambda region: region[1]):
+        if rows and region[1] - rows[-1][0][1] <= tolerance:
+            rows[-1].append(region)
+        else:
+            rows.append([region])
+    ordered = []
+    for row in rows:
+        ordered.extend(sorted(row, key=lambda region: region[0], reverse=right_to_left))
+    return ordered
+
+
+def crop_regions(img, regions):
+    """Вырезки областей без копирования (срезы массива)"""
+    return [img[y:y + h, x:x + w] for x, y, w, h in regions]
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from .metrics import REGISTRY
+
+THUMBNAILS_DIRNAME = ".thumbnails"
+
+THUMBNAIL_REQUESTS = REGISTRY.counter("manga_thumbnail_cache_requests_total",
+                                      "Обращения к кэшу миниатюр (memory, disk, miss)", ("result",))
+
+
+class ThumbnailCache:
+    """Дисковый кэш миниатюр фреймов с фоновой генерацией"""
+
+    def __init__(self, frames_path, size=(96, 96), workers=4, memory_items=2000):
+        self.cache_dir = Path(frames_path) / THUMBNAILS_DIRNAME
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+
+    def cache_key(self, frame_path):
+        """Ключ миниатюры: идентичность файла и время изменения (переименование не сбрасывает кэш)"""
+        st = os.stat(frame_path)
+        raw = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{self.size[0]}x{self.size[1]}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _cached_file(self, key):
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _remember(self, key, image):
+        with self._lock:
+            self._memory[key] = image
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+            self._pending.discard(key)
+
+    def lookup(self, frame_path, key=None):
+        """Миниатюра из памяти или с диска; если её нет - ставит генерацию в очередь и возвращает None"""
+        if key is None:
+            try:
+                key = self.cache_key(frame_path)
+            except OSError:
+                return None
+
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                THUMBNAIL_REQUESTS.inc(result="memory")
+                return image
+            if key in self._pending:
+                return None
+
+        # Маленький файл из дискового кэша читаем сразу
+        cached_file = self._cached_file(key)
+        if cached_file.exists():
+            try:
+                with Image.open(cached_file) as cached:
+                    image = cached.copy()
+                self._remember(key, image)
+                THUMBNAIL_REQUESTS.inc(result="disk")
+                return image
+            except Exception:
+                pass
+
+        THUMBNAIL_REQUESTS.inc(result="miss")
+        with self._lock:
+            self._pending.add(key)
+        self._executor.submit(self._generate, frame_path, key)
+        return None
+
+    def has_pending(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def _generate(self, frame_path, key):
+        try:
+            with Image.open(frame_path) as image:
+                image.draft(image.mode, self.size)
+                image.thumbnail(self.size, Image.Resampling.BILINEAR)
+                thumb = image.convert("RGB")
+
+            # Пишем через временный файл, чтобы не оставить обрезанную миниатюру
+            cached_file = self._cached_file(key)
+            cached_file.parent.mkdir(exist_ok=True)
+            temp_file = cached_file.with_suffix(".tmp")
+            thumb.save(temp_file, "PNG")
+            os.replace(temp_file, cached_file)
+
+            self._remember(key, thumb)
+        except Exception as e:
+            print(f"Ошибка создания миниатюры {frame_path}: {e}")
+            with self._lock:
+                self._pending.discard(key)
+
+    def _forget(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+        try:
+            self._cached_file(key).unlink()
+        except OSError:
+            pass
+
+    def discard(self, frame_path):
+        """Удаляет миниатюру фрейма (вызывать до удаления файла - ключ берётся из его атрибутов)"""
+        try:
+            key = self.cache_key(frame_path)
+        except OSError:
+            return
+        self._forget(key)
+
+    def prune(self, frame_paths):
+        """Удаляет с диска миниатюры файлов, которых больше нет среди frame_paths; возвращает их число"""
+        live = set()
+        for frame_path in frame_paths:
+            try:
+                live.add(self.cache_key(frame_path))
+            except OSError:
+                pass
+        removed = 0
+        for cached_file in self.cache_dir.glob("*/*.png"):
+            if cached_file.stem not in live:
+                self._forget(cached_file.stem)
+                removed += 1
+        return removed
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,98 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+TRANSPORTS = ("auto", "requests", "http2")
+
+
+class Http2Response:
+    """Ответ httpx с теми методами requests.Response, которыми пользуется загрузчик"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def content(self):
+        return self._response.read()
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    def iter_content(self, chunk_size=None):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        finally:
+            self.close()
+
+    def close(self):
+        self._response.close()
+
+
+class Http2Session:
+    """Клиент httpx с HTTP/2: параллельные запросы к хосту идут потоками одного соединения.
+
+    Повторяет ту часть интерфейса requests.Session, которой пользуется загрузчик (get, headers, close).
+    Нужен pip install "httpx[http2]".
+    """
+
+    protocol = "HTTP/2 (httpx)"
+
+    def __init__(self, max_connections=10):
+        try:
+            import h2  # noqa: F401
+            import httpx
+        except ImportError:
+            raise RuntimeError('Для HTTP/2 установите пакет httpx[http2]')
+        # По HTTP/2 все запросы к хосту идут через одно соединение; лимит нужен,
+        # если сервер согласится только на HTTP/1.1
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = httpx.Client(http2=True, limits=limits, follow_redirects=True)
+        self.headers = self.client.headers
+
+    def get(self, url, headers=None, stream=False, timeout=30):
+        request = self.client.build_request("GET", url, headers=headers, timeout=timeout)
+        return Http2Response(self.client.send(request, stream=stream))
+
+    def close(self):
+        self.client.close()
+
+
+def create_requests_session(pool_size=10):
+    """Сессия requests (HTTP/1.1) с пулом соединений по числу параллельных загрузок"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=max(10, pool_size))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.protocol = "HTTP/1.1"
+    return session
+
+
+def create_transport(name="auto", pool_size=10):
+    """Сессия для скачивания: requests, http2 или auto (HTTP/2, если установлен httpx[http2])"""
+    if name not in TRANSPORTS:
+        raise ValueError(f"Неизвестный транспорт: {name}")
+    if name != "requests":
+        try:
+            session = Http2Session(max_connections=max(10, pool_size))
+        except RuntimeError:
+            if name == "http2":
+                raise
+            session = create_requests_session(pool_size)
+    else:
+        session = create_requests_session(pool_size)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
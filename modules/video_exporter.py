@@ -0,0 +1,198 @@
+import wave
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .frame_catalog import FrameCatalog
+
+
+def wav_duration(path):
+    with wave.open(str(path), "rb") as f:
+        return f.getnframes() / float(f.getframerate())
+
+
+class VideoExporter:
+    """Потоковый экспорт главы в видео: фреймы читаются по одному в порядке просмотрщика.
+
+    Фрейм вписывается по ширине кадра; если он выше кадра - прокручивается сверху вниз,
+    иначе показывается по центру на фоне. В памяти одновременно только текущий фрейм и кадр,
+    поэтому размер главы (хоть 10 000 фреймов) на память не влияет.
+    """
+
+    def __init__(self, frames_path, output_path, size=(1080, 1920), fps=30, frame_seconds=2.0,
+                 scroll_speed=600, background=(255, 255, 255), codec="mp4v", progress_callback=None):
+        self.frames_path = Path(frames_path)
+        self.output_path = Path(output_path)
+        self.width, self.height = size
+        self.fps = fps
+        # Минимальное время показа фрейма и скорость прокрутки высоких фреймов (пикселей в секунду)
+        self.frame_seconds = frame_seconds
+        self.scroll_speed = scroll_speed
+        self.background = background
+        self.codec = codec
+        self.progress_callback = progress_callback
+        self.is_cancelled = False
+        self.stats = {
+            'total_frames': 0,
+            'exported_frames': 0,
+            'skipped_frames': 0,
+            'video_frames': 0,
+            'duration_sec': 0.0,
+            'start_time': None,
+            'end_time': None
+        }
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def get_stats(self):
+        return self.stats
+
+    def fit_width(self, img):
+        """Масштабирует фрейм под ширину кадра (высота - пропорционально)"""
+        height, width = img.shape[:2]
+        scale = self.width / width
+        new_height = max(1, round(height * scale))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        return cv2.resize(img, (self.width, new_height), interpolation=interpolation)
+
+    def write_frame(self, writer, canvas, img, seconds):
+        """Пишет кадры одного фрейма; возвращает число видеокадров"""
+        count = max(1, round(seconds * self.fps))
+        if img.shape[0] <= self.height:
+            canvas[:] = self.background
+            top = (self.height - img.shape[0]) // 2
+            canvas[top:top + img.shape[0]] = img
+            for _ in range(count):
+                writer.write(canvas)
+            return count
+
+        # Высокий фрейм: прокрутка от верха до низа за всё время показа
+        travel = img.shape[0] - self.height
+        for i in range(count):
+            offset = round(travel * i / max(1, count - 1))
+            writer.write(np.ascontiguousarray(img[offset:offset + self.height]))
+        return count
+
+    def frame_seconds_for(self, img, audio_seconds=None):
+        """Время показа: не меньше минимума, звучания реплики и прокрутки высокого фрейма"""
+        seconds = self.frame_seconds
+        if audio_seconds:
+            seconds = max(seconds, audio_seconds + 0.3)
+        if img.shape[0] > self.height:
+            seconds = max(seconds, (img.shape[0] - self.height) / self.scroll_speed)
+        return seconds
+
+    def export(self, audio_for_frame=None, audio_output=None):
+        """Экспортирует главу; audio_for_frame(path) -> WAV-файл реплики или None.
+
+        С audio_output рядом пишется синхронная звуковая дорожка (реплики и тишина),
+        которую можно свести с видео, например: ffmpeg -i video.mp4 -i audio.wav -c copy out.mkv
+        """
+        self.stats['start_time'] = datetime.now()
+        catalog = FrameCatalog(self.frames_path)
+        frames = catalog.sync()
+        catalog.close()
+        self.stats['total_frames'] = len(frames)
+        if not frames:
+            return False, "Фреймы не найдены"
+
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        writer = cv2.VideoWriter(str(self.output_path), cv2.VideoWriter_fourcc(*self.codec),
+                                 self.fps, (self.width, self.height))
+        if not writer.isOpened():
+            return False, f"Не удалось открыть видеофайл {self.output_path} (кодек {self.codec})"
+
+        canvas = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        track = None
+        try:
+            for i, relative_path in enumerate(frames, 1):
+                if self.is_cancelled:
+                    break
+                frame_path = self.frames_path / relative_path
+                img = cv2.imread(str(frame_path))
+                if img is None:
+                    self.stats['skipped_frames'] += 1
+                    continue
+                img = self.fit_width(img)
+
+                audio_path = audio_for_frame(frame_path) if audio_for_frame else None
+                audio_seconds = wav_duration(audio_path) if audio_path else None
+                count = self.write_frame(writer, canvas, img, self.frame_seconds_for(img, audio_seconds))
+                self.stats['exported_frames'] += 1
+                self.stats['video_frames'] += count
+
+                if audio_output:
+                    if track is None:
+                        track = AudioTrack(audio_output)
+                    track.add(audio_path, count / self.fps)
+
+                if self.progress_callback:
+                    self.progress_callback(i, len(frames))
+        finally:
+            writer.release()
+            if track is not None:
+                track.close()
+
+        self.stats['duration_sec'] = round(self.stats['video_frames'] / self.fps, 2)
+        self.stats['end_time'] = datetime.now()
+        message = (f"Видео сохранено: {self.output_path} ({self.stats['exported_frames']} фреймов, "
+                   f"{self.stats['duration_sec']} с).")
+        print(message)
+        return not self.is_cancelled, message
+
+
+class AudioTrack:
+    """Потоковая запись звуковой дорожки: реплика фрейма, дополненная тишиной до длительности показа.
+
+    Формат дорожки берётся из первой реплики; тишина до неё копится и пишется при открытии файла.
+    """
+
+    def __init__(self, output_path, default_rate=22050):
+        self.output_path = Path(output_path)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self.default_rate = default_rate
+        self.writer = None
+        self.format = None
+        self.pending_seconds = 0.0
+
+    def _open(self, channels, sample_width, sample_rate):
+        self.format = (channels, sample_width, sample_rate)
+        self.writer = wave.open(str(self.output_path), "wb")
+        self.writer.setnchannels(channels)
+        self.writer.setsampwidth(sample_width)
+        self.writer.setframerate(sample_rate)
+        self._silence(round(self.pending_seconds * sample_rate))
+        self.pending_seconds = 0.0
+
+    def _silence(self, samples):
+        # Порциями по секунде, чтобы длинная тишина не занимала память
+        channels, sample_width, sample_rate = self.format
+        while samples > 0:
+            chunk = min(samples, sample_rate)
+            self.writer.writeframes(b"\0" * chunk * channels * sample_width)
+            samples -= chunk
+
+    def add(self, audio_path, seconds):
+        written = 0
+        if audio_path:
+            with wave.open(str(audio_path), "rb") as f:
+                audio_format = (f.getnchannels(), f.getsampwidth(), f.getframerate())
+                if self.writer is None:
+                    self._open(*audio_format)
+                if audio_format == self.format:
+                    written = f.getnframes()
+                    self.writer.writeframes(f.readframes(written))
+                else:
+                    print(f"Формат {audio_path} отличается от дорожки, реплика пропущена")
+        if self.writer is None:
+            self.pending_seconds += seconds
+            return
+        self._silence(round(seconds * self.format[2]) - written)
+
+    def close(self):
+        if self.writer is None:
+            self._open(1, 2, self.default_rate)
+        self.writer.close()
@@ -0,0 +1,183 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from .viewer_model import ViewerModel
+
+# Размер области просмотра окна по умолчанию (как у окна 1000x800 за вычетом панелей)
+DEFAULT_VIEWPORT = (960, 760)
+
+
+def make_sample_frames(directory, count=8, size=(800, 1200), seed=0):
+    """Образцы фреймов: белый фон с тёмными блоками, похожими на панели и реплики"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    samples = []
+    for i in range(count):
+        img = np.full((height, width, 3), 255, dtype=np.uint8)
+        for _ in range(12):
+            x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+            w, h = int(rng.integers(20, width // 2)), int(rng.integers(20, height // 4))
+            img[y:y + h, x:x + w] = rng.integers(0, 200, size=3, dtype=np.uint8)
+        path = Path(directory) / f"sample_{i}.png"
+        Image.fromarray(img).save(path)
+        samples.append(path)
+    return samples
+
+
+def make_frame_folder(frames_path, count, samples, per_shard=1000):
+    """Папка из count фреймов по шардам глав; файлы - жёсткие ссылки на образцы (или копии)"""
+    frames_path = Path(frames_path)
+    for index in range(count):
+        shard = frames_path / f"chapter_{index // per_shard + 1:03d}"
+        if index % per_shard == 0:
+            shard.mkdir(parents=True, exist_ok=True)
+        target = shard / f"frame_{index:06d}.png"
+        source = samples[index % len(samples)]
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy(source, target)
+
+
+def summarize(latencies):
+    """p50/p95/max в миллисекундах"""
+    if not latencies:
+        return {}
+    values = sorted(latencies)
+
+    def percentile_ms(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 3)
+
+    return {'count': len(values), 'p50_ms': percentile_ms(0.5), 'p95_ms': percentile_ms(0.95),
+            'max_ms': round(values[-1] * 1000, 3)}
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+class ViewerBenchmark:
+    """Замеры просмотрщика без дисплея на папке из заданного числа фреймов.
+
+    Переходы меряются так же, как их делает окно: подготовка изображения текущего фрейма
+    (кэш, черновик или окончательный вариант). «Без предзагрузки» - листание быстрее фоновой
+    подготовки, «с предзагрузкой» - обычное чтение, когда соседи успевают попасть в кэш.
+    """
+
+    def __init__(self, frames_path, viewport_size=DEFAULT_VIEWPORT, steps=200, moves=200, deletes=50,
+                 seed=0, prefetch_wait=2.0):
+        self.frames_path = Path(frames_path)
+        self.viewport_size = viewport_size
+        self.steps = steps
+        self.moves = moves
+        self.deletes = deletes
+        self.prefetch_wait = prefetch_wait
+        self.rng = random.Random(seed)
+
+    def open_model(self):
+        model = ViewerModel(self.frames_path)
+        model.set_viewport(self.viewport_size)
+        model.add_frames(model.scan())
+        return model
+
+    def wait_prefetched(self, model, index):
+        """Ждёт, пока фоновая предзагрузка подготовит фрейм index"""
+        key = (str(model.frames[index]), model.viewport_size)
+        deadline = time.perf_counter() + self.prefetch_wait
+        while key not in model.frame_cache and time.perf_counter() < deadline:
+            time.sleep(0.001)
+
+    def navigate(self, model, step, prefetch):
+        """Переходы next/prev: задержки и источники изображений"""
+        latencies = []
+        sources = {}
+        for _ in range(self.steps):
+            target = model.current_index + step
+            if not 0 <= target < len(model.frames):
+                break
+            if prefetch:
+                self.wait_prefetched(model, target)
+            started = time.perf_counter()
+            model.select(target)
+            _, is_final, source, _ = model.prepare_current()
+            latencies.append(time.perf_counter() - started)
+            sources[source] = sources.get(source, 0) + 1
+            if prefetch:
+                model.prefetch(include_current=not is_final)
+        return dict(summarize(latencies), sources=sources)
+
+    def run(self):
+        count = sum(1 for _ in self.frames_path.glob("*/*.png"))
+        result = {'frames': count}
+
+        open_sec, model = timed(self.open_model)
+        result['open_sec'] = round(open_sec, 3)
+        model.close()
+        reopen_sec, model = timed(self.open_model)
+        result['reopen_sec'] = round(reopen_sec, 3)
+
+        try:
+            model.select(0)
+            result['next_cold'] = self.navigate(model, 1, prefetch=False)
+            model.frame_cache.clear()
+            model.select(len(model.frames) // 2)
+            model.prepare_current()
+            model.prefetch()
+            result['next_prefetched'] = self.navigate(model, 1, prefetch=True)
+            result['prev_prefetched'] = self.navigate(model, -1, prefetch=True)
+            model.cancel_prefetch()
+
+            move_latencies = []
+            for _ in range(self.moves):
+                from_index = self.rng.randrange(len(model.frames))
+                to_index = self.rng.randrange(len(model.frames))
+                move_latencies.append(timed(model.move, from_index, to_index)[0])
+            result['move'] = summarize(move_latencies)
+
+            delete_latencies = []
+            for _ in range(min(self.deletes, len(model.frames) - 1)):
+                delete_latencies.append(timed(model.delete, self.rng.randrange(len(model.frames)))[0])
+            result['delete'] = summarize(delete_latencies)
+
+            export_sec, renamed = timed(model.export)
+            result['export_sec'] = round(export_sec, 3)
+            result['renamed_frames'] = renamed
+        finally:
+            model.close()
+        return result
+
+
+def run_viewer_benchmark(sizes=(1000, 10000, 100000), work_dir=None, progress=print, **options):
+    """Бенчмарк на папках разного размера; папки создаются во временном каталоге и удаляются"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="viewer_bench_", dir=work_dir) as temp_dir:
+        samples = make_sample_frames(temp_dir)
+        for size in sizes:
+            frames_path = Path(temp_dir) / f"frames_{size}"
+            progress(f"Подготовка папки из {size} фреймов...")
+            make_frame_folder(frames_path, size, samples)
+            result = ViewerBenchmark(frames_path, **options).run()
+            progress(format_result(result))
+            results.append(result)
+            shutil.rmtree(frames_path, ignore_errors=True)
+    return results
+
+
+def format_result(result):
+    def latency(name):
+        item = result.get(name) or {}
+        return f"{item.get('p50_ms', '-')}/{item.get('p95_ms', '-')} мс"
+
+    return (f"{result['frames']} фреймов: открытие {result['open_sec']} с (повторно {result['reopen_sec']} с), "
+            f"перенумерация {result['export_sec']} с; задержки p50/p95: "
+            f"next без предзагрузки {latency('next_cold')}, с предзагрузкой {latency('next_prefetched')}, "
+            f"prev {latency('prev_prefetched')}, перемещение {latency('move')}, удаление {latency('delete')}")
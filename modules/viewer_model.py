@@ -0,0 +1,147 @@
+import shutil
+from pathlib import Path
+
+from .frame_cache import FrameCache, FramePrefetcher, prepare_preview_image
+from .frame_catalog import FrameCatalog
+
+
+class ViewerModel:
+    """Состояние просмотрщика без виджетов: порядок фреймов, текущий фрейм и подготовка изображений.
+
+    Окно просмотра только показывает результат, поэтому те же операции можно замерять
+    без дисплея (modules/viewer_benchmark.py).
+    """
+
+    def __init__(self, frames_path, frame_cache=None, prefetch_radius=3):
+        self.frames_path = Path(frames_path)
+        # Порядок фреймов хранится в каталоге, файлы при перестановках не переименовываются
+        self.catalog = FrameCatalog(self.frames_path)
+        self.frames = []
+        self.known_frames = set()
+        self.current_index = 0
+        # Кэш подготовленных фреймов и фоновая предзагрузка соседей
+        self.frame_cache = frame_cache or FrameCache()
+        self.prefetcher = FramePrefetcher(self.frame_cache, radius=prefetch_radius)
+        self.viewport_size = None
+        # Номер показа: устаревшие доработки черновика отбрасываются
+        self.display_token = 0
+
+    def close(self):
+        self.display_token += 1
+        self.prefetcher.stop()
+        self.frame_cache.clear()
+        self.catalog.close()
+
+    @property
+    def current_path(self):
+        return self.frames[self.current_index] if self.frames else None
+
+    def scan(self):
+        """Сверяет каталог с папкой; пути фреймов по порядку"""
+        return [self.frames_path / path for path in self.catalog.sync()]
+
+    def scan_chunks(self, chunk_size=2000):
+        """То же, что scan, но порциями по мере сверки"""
+        for chunk in self.catalog.sync_chunks(chunk_size):
+            yield [self.frames_path / path for path in chunk]
+
+    def add_frames(self, frame_paths):
+        """Добавляет фреймы в конец списка, пропуская уже известные; возвращает добавленные"""
+        new_frames = [path for path in frame_paths if self.catalog.relative(path) not in self.known_frames]
+        self.known_frames.update(self.catalog.relative(path) for path in new_frames)
+        self.frames.extend(new_frames)
+        return new_frames
+
+    def set_viewport(self, viewport_size):
+        """Масштаб фреймов зависит от области просмотра: при её изменении кэш устаревает"""
+        if viewport_size != self.viewport_size:
+            self.viewport_size = viewport_size
+            self.frame_cache.clear()
+
+    def select(self, index):
+        """Переход к фрейму; False, если индекс вне списка"""
+        if not 0 <= index < len(self.frames):
+            return False
+        self.current_index = index
+        return True
+
+    def next(self):
+        return self.select(self.current_index + 1)
+
+    def prev(self):
+        return self.select(self.current_index - 1)
+
+    def prepare_current(self):
+        """Изображение текущего фрейма: (изображение, окончательное ли, источник, ключ кэша).
+
+        Из кэша - готовый вариант, иначе сразу черновик; источник - cache, final или draft.
+        """
+        self.display_token += 1
+        frame_path = self.current_path
+        cache_key = (str(frame_path), self.viewport_size)
+        image = self.frame_cache.get(cache_key)
+        if image is not None:
+            return image, True, "cache", cache_key
+        image, is_final = prepare_preview_image(frame_path, self.viewport_size)
+        if is_final:
+            self.frame_cache.put(cache_key, image)
+        return image, is_final, "final" if is_final else "draft", cache_key
+
+    def prefetch(self, include_current=False):
+        """Готовит соседние фреймы в фоне (и качественный вариант текущего, если показан черновик)"""
+        self.prefetcher.request(self.frames, self.current_index, self.viewport_size,
+                                include_current=include_current)
+
+    def cancel_prefetch(self):
+        """Отменяет недоделанную предзагрузку (например, перед массовыми изменениями)"""
+        self.prefetcher.request([], 0, self.viewport_size)
+
+    def move(self, from_index, to_index):
+        """Перемещает фрейм; в каталоге меняется только позиция одного фрейма"""
+        if from_index == to_index:
+            return False
+        item = self.frames.pop(from_index)
+        self.frames.insert(to_index, item)
+        prev_path = self.catalog.relative(self.frames[to_index - 1]) if to_index > 0 else None
+        next_path = self.catalog.relative(self.frames[to_index + 1]) if to_index < len(self.frames) - 1 else None
+        self.catalog.move(self.catalog.relative(item), prev_path, next_path)
+        self.current_index = to_index
+        return True
+
+    def delete(self, index):
+        """Удаляет файл фрейма и запись в каталоге, остальные файлы не трогаются"""
+        frame_path = self.frames[index]
+        frame_path.unlink()
+        self.catalog.remove(self.catalog.relative(frame_path))
+        self.known_frames.discard(self.catalog.relative(frame_path))
+        self.frame_cache.discard_path(frame_path)
+        self.frames.pop(index)
+        if self.current_index >= len(self.frames):
+            self.current_index = max(0, len(self.frames) - 1)
+        return frame_path
+
+    def export(self):
+        """Перенумеровывает файлы по порядку из каталога; возвращает число переименованных"""
+        renamed_count = self.catalog.export()
+        # Пути фреймов изменились - кэш по старым путям больше не нужен
+        self.frame_cache.clear()
+        paths = self.catalog.ordered_paths()
+        self.frames = [self.frames_path / path for path in paths]
+        self.known_frames = set(paths)
+        return renamed_count
+
+    def add_file(self, file_path):
+        """Копирует изображение в шард текущего фрейма под свободным именем и ставит в конец"""
+        target_dir = self.current_path.parent if self.frames else self.frames_path
+        frame_number = len(self.frames)
+        new_frame_path = target_dir / f"frame_{frame_number:06d}.png"
+        while new_frame_path.exists():
+            frame_number += 1
+            new_frame_path = target_dir / f"frame_{frame_number:06d}.png"
+        shutil.copy(file_path, new_frame_path)
+
+        self.catalog.append([self.catalog.relative(new_frame_path)])
+        self.known_frames.add(self.catalog.relative(new_frame_path))
+        self.frames.append(new_frame_path)
+        self.current_index = len(self.frames) - 1
+        return new_frame_path
@@ -0,0 +1,81 @@
+import os
+import time
+
+from modules.chapter_leases import ChapterLeases
+
+SHARD = "chapter_001"
+
+
+def expire(leases, shard):
+    """Аренда, не продлевавшаяся дольше ttl"""
+    stale = time.time() - leases.ttl - 10
+    os.utime(leases.lease_path(shard), (stale, stale))
+
+
+def write_frames(leases, shard, count):
+    work_dir = leases.work_dir(shard)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        (work_dir / f"frame_{i:06d}.png").write_bytes(f"{leases.owner}/{i}".encode())
+
+
+def test_claim_and_complete(tmp_path):
+    first = ChapterLeases(tmp_path, owner="a")
+    second = ChapterLeases(tmp_path, owner="b")
+    assert first.try_claim(SHARD)
+    assert not second.try_claim(SHARD)
+
+    write_frames(first, SHARD, 2)
+    assert first.complete(SHARD, 2)
+    assert first.is_done(SHARD)
+    assert sorted(path.name for path in (tmp_path / SHARD).iterdir()) == ["frame_000000.png", "frame_000001.png"]
+    assert not first.lease_path(SHARD).exists()
+    assert not list(first.work_path.iterdir())
+    # Готовую главу больше никто не берёт
+    assert not second.try_claim(SHARD)
+
+
+def test_stale_lease_is_taken_over(tmp_path):
+    dead = ChapterLeases(tmp_path, owner="dead", ttl=60)
+    alive = ChapterLeases(tmp_path, owner="alive", ttl=60)
+    assert dead.try_claim(SHARD)
+    assert not alive.try_claim(SHARD)
+
+    expire(dead, SHARD)
+    assert alive.try_claim(SHARD)
+    assert alive.owns(SHARD)
+    assert not dead.heartbeat(SHARD)
+    assert not (dead.leases_path / f"{SHARD}.break").exists()
+
+
+def test_lost_lease_before_complete_keeps_the_new_owner_result(tmp_path):
+    slow = ChapterLeases(tmp_path, owner="slow", ttl=60)
+    fast = ChapterLeases(tmp_path, owner="fast", ttl=60)
+    (tmp_path / SHARD).mkdir()
+    (tmp_path / SHARD / "frame_000000.png").write_bytes(b"old")
+
+    assert slow.try_claim(SHARD)
+    write_frames(slow, SHARD, 3)
+    expire(slow, SHARD)
+    assert fast.try_claim(SHARD)
+
+    # Исполнитель, потерявший аренду, не трогает шард и убирает свою папку
+    assert not slow.complete(SHARD, 3)
+    assert not slow.is_done(SHARD)
+    assert not slow.work_dir(SHARD).exists()
+    assert (tmp_path / SHARD / "frame_000000.png").read_bytes() == b"old"
+
+    write_frames(fast, SHARD, 1)
+    assert fast.complete(SHARD, 1)
+    assert (tmp_path / SHARD / "frame_000000.png").read_bytes() == b"fast/0"
+    assert len(list((tmp_path / SHARD).iterdir())) == 1
+
+
+def test_release_returns_chapter(tmp_path):
+    first = ChapterLeases(tmp_path, owner="a")
+    second = ChapterLeases(tmp_path, owner="b")
+    assert first.try_claim(SHARD)
+    write_frames(first, SHARD, 1)
+    first.release(SHARD)
+    assert not first.work_dir(SHARD).exists()
+    assert second.try_claim(SHARD)
@@ -0,0 +1,179 @@
+from pathlib import Path
+
+import pytest
+
+from modules.frame_catalog import CATALOG_FILENAME, FrameCatalog
+
+
+def make_frames(frames_path, shards=("chapter_001", "chapter_002", "chapter_003"), per_shard=3):
+    """Фреймы с уникальным содержимым: по нему сравнивается порядок после переименований"""
+    for shard in shards:
+        (frames_path / shard).mkdir(parents=True)
+        for i in range(per_shard):
+            (frames_path / shard / f"frame_{i:06d}.png").write_bytes(f"{shard}/{i}".encode())
+
+
+def contents(frames_path, paths):
+    return [(frames_path / path).read_bytes() for path in paths]
+
+
+def shard_sizes(frames_path):
+    """Число фреймов в каждой папке шарда"""
+    return {shard.name: len(list(shard.glob("*.png"))) for shard in sorted(frames_path.glob("chapter_*"))}
+
+
+def shard_prefixes(paths):
+    return [path.rpartition("/")[0] for path in paths]
+
+
+# Шарды фреймов по порядку после перемещений [(8, 0), (1, 8), (4, 1)] и перенумерации
+CROSS_SHARD_MOVES = [(8, 0), (1, 8), (4, 1)]
+CROSS_SHARD_LAYOUT = ["chapter_001"] * 4 + ["chapter_002"] * 2 + ["chapter_003"] * 3
+
+
+def rebuild(frames_path):
+    """Порядок, который получит новый каталог, собранный сверкой папки с нуля"""
+    (frames_path / CATALOG_FILENAME).unlink()
+    for suffix in ("-wal", "-shm"):
+        (frames_path / (CATALOG_FILENAME + suffix)).unlink(missing_ok=True)
+    catalog = FrameCatalog(frames_path)
+    try:
+        return contents(frames_path, catalog.sync())
+    finally:
+        catalog.close()
+
+
+def reorder(catalog, moves):
+    """Перемещения как в просмотрщике: (откуда, куда) по индексам текущего порядка"""
+    paths = catalog.ordered_paths()
+    for from_index, to_index in moves:
+        item = paths.pop(from_index)
+        paths.insert(to_index, item)
+        prev_path = paths[to_index - 1] if to_index > 0 else None
+        next_path = paths[to_index + 1] if to_index < len(paths) - 1 else None
+        catalog.move(item, prev_path, next_path)
+
+
+def export_and_rebuild(tmp_path, moves):
+    make_frames(tmp_path)
+    catalog = FrameCatalog(tmp_path)
+    try:
+        catalog.sync()
+        reorder(catalog, moves)
+        expected = contents(tmp_path, catalog.ordered_paths())
+        catalog.export()
+        assert contents(tmp_path, catalog.ordered_paths()) == expected
+    finally:
+        catalog.close()
+    return expected, rebuild(tmp_path)
+
+
+def test_export_within_shard_survives_rebuild(tmp_path):
+    expected, rebuilt = export_and_rebuild(tmp_path, [(2, 0), (5, 3)])
+    assert rebuilt == expected
+    assert shard_sizes(tmp_path) == {"chapter_001": 3, "chapter_002": 3, "chapter_003": 3}
+
+
+def test_export_across_shards_survives_rebuild(tmp_path):
+    # Последний фрейм - в начало, первый - в конец, фрейм из середины - в другой шард
+    expected, rebuilt = export_and_rebuild(tmp_path, CROSS_SHARD_MOVES)
+    assert rebuilt == expected
+    catalog = FrameCatalog(tmp_path)
+    try:
+        assert shard_prefixes(catalog.sync()) == CROSS_SHARD_LAYOUT
+    finally:
+        catalog.close()
+    assert shard_sizes(tmp_path) == {"chapter_001": 4, "chapter_002": 2, "chapter_003": 3}
+
+
+def test_export_leaves_no_temporary_files(tmp_path):
+    export_and_rebuild(tmp_path, [(8, 0), (0, 8)])
+    assert not list(tmp_path.glob("*/.export_*"))
+
+
+def test_sync_chunks_matches_sync(tmp_path):
+    make_frames(tmp_path)
+    catalog = FrameCatalog(tmp_path)
+    try:
+        streamed = [path for chunk in catalog.sync_chunks(chunk_size=2) for path in chunk]
+        assert streamed == catalog.sync()
+        reorder(catalog, [(8, 0)])
+        (tmp_path / "chapter_004").mkdir()
+        (tmp_path / "chapter_004" / "frame_000000.png").write_bytes(b"new")
+        streamed = [path for chunk in catalog.sync_chunks(chunk_size=4) for path in chunk]
+        assert streamed == catalog.ordered_paths()
+        assert streamed[0] == "chapter_003/frame_000002.png"
+        assert streamed[-1] == "chapter_004/frame_000000.png"
+    finally:
+        catalog.close()
+
+
+@pytest.mark.parametrize("fail_after", [2, 6, 9])
+def test_interrupted_export_is_finished_on_open(tmp_path, monkeypatch, fail_after):
+    # Переименовываются 6 фреймов: сбой посреди этапа 1 (2), на границе этапов (6) и посреди этапа 2 (9)
+    make_frames(tmp_path)
+    catalog = FrameCatalog(tmp_path)
+    catalog.sync()
+    reorder(catalog, CROSS_SHARD_MOVES)
+    expected = contents(tmp_path, catalog.ordered_paths())
+
+    rename = Path.rename
+    calls = []
+
+    def failing_rename(self, target):
+        calls.append(target)
+        if len(calls) > fail_after:
+            raise OSError("сбой")
+        return rename(self, target)
+
+    monkeypatch.setattr(Path, "rename", failing_rename)
+    with pytest.raises(OSError):
+        catalog.export()
+    monkeypatch.setattr(Path, "rename", rename)
+    catalog.close()
+
+    catalog = FrameCatalog(tmp_path)
+    try:
+        paths = catalog.sync()
+        assert contents(tmp_path, paths) == expected
+        assert shard_prefixes(paths) == CROSS_SHARD_LAYOUT
+        assert catalog.export() == 0
+    finally:
+        catalog.close()
+    assert shard_sizes(tmp_path) == {"chapter_001": 4, "chapter_002": 2, "chapter_003": 3}
+    assert not list(tmp_path.glob("*/.export_*"))
+    assert rebuild(tmp_path) == expected
+
+
+@pytest.mark.parametrize("moves, shards", [
+    # Последний фрейм главы 3 - в начало: он уходит в шард первой главы, остальные не трогаются
+    ([(8, 0)], ["chapter_001"] * 4 + ["chapter_002"] * 3 + ["chapter_003"] * 2),
+    # Первый фрейм - в конец, фрейм главы 2 - в начало, последний - в начало
+    (CROSS_SHARD_MOVES, CROSS_SHARD_LAYOUT),
+])
+def test_export_keeps_frames_in_their_chapter_shards(tmp_path, moves, shards):
+    make_frames(tmp_path)
+    catalog = FrameCatalog(tmp_path)
+    try:
+        catalog.sync()
+        reorder(catalog, moves)
+        catalog.export()
+        assert shard_prefixes(catalog.ordered_paths()) == shards
+    finally:
+        catalog.close()
+    assert shard_sizes(tmp_path) == {shard: shards.count(shard) for shard in sorted(set(shards))}
+
+
+def test_shards_are_ordered_by_chapter_number(tmp_path):
+    make_frames(tmp_path, shards=("chapter_1000", "chapter_999", "chapter_010"), per_shard=2)
+    catalog = FrameCatalog(tmp_path)
+    try:
+        paths = catalog.sync()
+        assert shard_prefixes(paths) == ["chapter_010"] * 2 + ["chapter_999"] * 2 + ["chapter_1000"] * 2
+        reorder(catalog, [(5, 0)])
+        catalog.export()
+        assert shard_prefixes(catalog.ordered_paths()) == ["chapter_010"] * 3 + ["chapter_999"] * 2 + ["chapter_1000"]
+        expected = contents(tmp_path, catalog.ordered_paths())
+    finally:
+        catalog.close()
+    assert rebuild(tmp_path) == expected
@@ -0,0 +1,74 @@
+import pytest
+
+from modules.job_queue import CANCELLED, DONE, FAILED, PAUSED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    yield queue
+    queue.close()
+
+
+def test_claim_by_priority_then_order(job_queue, tmp_path):
+    first = job_queue.add("http://a/1", 3)
+    urgent = job_queue.add("http://b/1", 1, priority=5)
+    second = job_queue.add("http://c/1", 2)
+
+    claimed = [job_queue.claim_next()["id"] for _ in range(3)]
+    assert claimed == [urgent, first, second]
+    assert job_queue.claim_next() is None
+    assert {job["status"] for job in job_queue.list_jobs()} == {RUNNING}
+    # Каждая серия - в своей папке рядом с базой
+    assert job_queue.get(first)["frames_dir"] == str(tmp_path / "job_0001" / "frames")
+
+
+def test_failed_job_is_retried(job_queue):
+    job_id = job_queue.add("http://a/1", 3)
+    job_queue.claim_next()
+    assert job_queue.finish(job_id, FAILED, "Глава 2 не скачана")
+    assert job_queue.get(job_id)["message"] == "Глава 2 не скачана"
+    assert job_queue.claim_next() is None
+
+    assert job_queue.resume(job_id)
+    assert job_queue.claim_next()["id"] == job_id
+    assert job_queue.finish(job_id, DONE)
+    # Готовое задание повторно не запускается
+    assert not job_queue.resume(job_id)
+
+
+def test_paused_job_resumes(job_queue):
+    job_id = job_queue.add("http://a/1", 3)
+    job_queue.claim_next()
+    assert job_queue.pause(job_id)
+    # Итог работы не перезаписывает паузу, выставленную во время выполнения
+    assert not job_queue.finish(job_id, DONE)
+    assert job_queue.status(job_id) == PAUSED
+    assert job_queue.claim_next() is None
+
+    assert job_queue.resume(job_id)
+    assert job_queue.status(job_id) == QUEUED
+    assert job_queue.claim_next()["id"] == job_id
+
+
+def test_cancel_is_final(job_queue):
+    job_id = job_queue.add("http://a/1", 3)
+    assert job_queue.cancel(job_id)
+    assert not job_queue.resume(job_id)
+    assert job_queue.claim_next() is None
+    assert job_queue.status(job_id) == CANCELLED
+
+
+def test_running_jobs_are_recovered_after_crash(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    job_id = queue.add("http://a/1", 3)
+    queue.claim_next()
+    queue.close()
+
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    try:
+        assert queue.status(job_id) == RUNNING
+        assert queue.recover() == 1
+        assert queue.claim_next()["id"] == job_id
+    finally:
+        queue.close()
@@ -0,0 +1,51 @@
+import threading
+
+from modules.memory_budget import MemoryBudget, parse_size
+
+
+def test_reserve_blocks_until_release():
+    budget = MemoryBudget(100)
+    assert budget.reserve(70) == 70
+    assert budget.reserve(40, timeout=0.05) is None
+
+    reserved = []
+    waiter = threading.Thread(target=lambda: reserved.append(budget.reserve(40, timeout=5)))
+    waiter.start()
+    waiter.join(0.1)
+    assert waiter.is_alive()
+    budget.release(70)
+    waiter.join(5)
+    assert reserved == [40]
+    stats = budget.get_stats()
+    assert stats['used_bytes'] == 40
+    assert stats['peak_bytes'] == 70
+    assert stats['waits'] == 2
+
+
+def test_reservation_is_released_on_error():
+    budget = MemoryBudget(100)
+    try:
+        with budget.reservation(60):
+            assert budget.get_stats()['used_bytes'] == 60
+            raise RuntimeError("сбой нарезки")
+    except RuntimeError:
+        pass
+    assert budget.get_stats()['used_bytes'] == 0
+
+
+def test_page_larger_than_limit_waits_for_whole_budget():
+    # Страница больше всего бюджета урезается до лимита и ждёт, пока остальные не освободят память
+    budget = MemoryBudget(100)
+    assert budget.reserve(10) == 10
+    assert budget.reserve(500, timeout=0.05) is None
+    budget.release(10)
+    with budget.reservation(500) as reserved:
+        assert reserved == 100
+        assert budget.get_stats()['used_bytes'] == 100
+    assert budget.get_stats()['used_bytes'] == 0
+
+
+def test_parse_size():
+    assert parse_size("512M") == 512 * 1024 ** 2
+    assert parse_size("1.5g") == int(1.5 * 1024 ** 3)
+    assert parse_size("4096") == 4096
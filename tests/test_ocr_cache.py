@@ -0,0 +1,87 @@
+import hashlib
+import os
+import shutil
+
+import pytest
+
+from modules import ocr
+from modules.ocr import OcrCache
+
+RESULT = [{"text": "Привет", "box": [0, 0, 10, 10], "confidence": 90.0}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = OcrCache(tmp_path)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def hash_calls(monkeypatch):
+    """Считает полные чтения фреймов для хэширования"""
+    calls = []
+    sha1 = hashlib.sha1
+
+    def counting_sha1(data):
+        calls.append(len(data))
+        return sha1(data)
+
+    monkeypatch.setattr(ocr.hashlib, "sha1", counting_sha1)
+    return calls
+
+
+def file_count(cache):
+    return cache.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+def test_rename_reuses_hash_and_result(tmp_path, cache, hash_calls):
+    frame = tmp_path / "chapter_001" / "frame_000000.png"
+    frame.parent.mkdir()
+    frame.write_bytes(b"frame")
+    cache.put(cache.content_hash(frame), "stub", RESULT)
+    assert len(hash_calls) == 1
+
+    # Переименование (в том числе в другой шард) сохраняет inode: файл не перечитывается
+    renamed = tmp_path / "chapter_002" / "frame_000005.png"
+    renamed.parent.mkdir()
+    frame.rename(renamed)
+    assert cache.lookup(renamed) == RESULT
+    assert len(hash_calls) == 1
+    assert file_count(cache) == 1
+
+
+def test_copy_shares_result_and_rewrite_drops_it(tmp_path, cache):
+    frame = tmp_path / "frame_000000.png"
+    frame.write_bytes(b"frame")
+    cache.put(cache.content_hash(frame), "stub", RESULT)
+
+    copy = tmp_path / "frame_000001.png"
+    shutil.copyfile(frame, copy)
+    assert cache.lookup(copy) == RESULT
+
+    frame.write_bytes(b"edited frame")
+    os.utime(frame, ns=(0, 1))
+    assert cache.lookup(frame) is None
+    assert cache.lookup(tmp_path / "missing.png") is None
+
+
+def test_prune_files_forgets_deleted_and_rewritten(tmp_path, cache):
+    frames = [tmp_path / f"frame_{i:06d}.png" for i in range(3)]
+    for i, frame in enumerate(frames):
+        frame.write_bytes(f"frame {i}".encode())
+        cache.put(cache.content_hash(frame), "stub", RESULT)
+    assert file_count(cache) == 3
+
+    frames[0].unlink()
+    frames[1].write_bytes(b"rewritten frame")
+    os.utime(frames[1], ns=(0, 1))
+    live = frames[1:]
+    assert cache.prune_files(live) == 2
+    assert file_count(cache) == 1
+
+    # Результаты по хэшу остаются: переписанный файл получит новую идентичность при следующем чтении
+    assert cache.lookup(frames[2]) == RESULT
+    assert cache.lookup(frames[1]) is None
+    assert file_count(cache) == 2
+    assert cache.prune_files(live) == 0
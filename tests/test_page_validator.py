@@ -0,0 +1,62 @@
+import io
+import struct
+
+import pytest
+from PIL import Image
+
+from modules.page_validator import PageValidationError, read_dimensions, validate_page
+
+
+def encode(image_format, size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def write_page(tmp_path, data, name="page_001.img"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+@pytest.mark.parametrize("image_format, name", [("JPEG", "jpeg"), ("PNG", "png"), ("WEBP", "webp"), ("GIF", "gif")])
+def test_whole_page_passes(tmp_path, image_format, name):
+    data = encode(image_format)
+    path = write_page(tmp_path, data)
+    assert validate_page(path, len(data)) == (name, (40, 30))
+    assert read_dimensions(path) == (40, 30)
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG", "WEBP"])
+def test_truncated_page_is_rejected(tmp_path, image_format):
+    # Длина не проверяется (сервер не прислал Content-Length): обрезку ловит маркер конца или длина RIFF
+    path = write_page(tmp_path, encode(image_format)[:-10])
+    with pytest.raises(PageValidationError, match="обрезан"):
+        validate_page(path)
+
+
+def test_length_mismatch_is_rejected(tmp_path):
+    data = encode("PNG")
+    path = write_page(tmp_path, data)
+    with pytest.raises(PageValidationError, match="получено"):
+        validate_page(path, len(data) + 1)
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"", "пустой файл"),
+    (b"  <html><body>404</body></html>", "HTML"),
+    (b"BM" + bytes(64), "неизвестный формат"),
+])
+def test_wrong_magic_is_rejected(tmp_path, data, message):
+    path = write_page(tmp_path, data)
+    with pytest.raises(PageValidationError, match=message):
+        validate_page(path)
+
+
+def test_zero_dimensions_are_rejected(tmp_path):
+    data = bytearray(encode("PNG"))
+    # Ширина в IHDR обнуляется; CRC чанка проверка не читает
+    data[16:20] = struct.pack(">I", 0)
+    path = write_page(tmp_path, bytes(data))
+    with pytest.raises(PageValidationError, match="нулевой размер"):
+        validate_page(path)
@@ -0,0 +1,92 @@
+import threading
+
+from modules.progress_bus import ProgressBus
+
+
+class FakeWidget:
+    """Вместо Tk: отложенные вызовы after() выполняются вручную через run_pending()"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, delay_ms, callback):
+        self.pending.append(callback)
+        return len(self.pending)
+
+    def after_cancel(self, job):
+        pass
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for callback in pending:
+            callback()
+
+
+def test_progress_updates_are_coalesced():
+    bus = ProgressBus()
+    received = []
+    bus.subscribe("download", lambda **payload: received.append(payload["done"]))
+
+    threads = [threading.Thread(target=lambda i=i: bus.publish("download", done=i)) for i in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    bus.publish("download", done=100)
+    bus.dispatch()
+    assert received == [100]
+
+    # Без новых обновлений повторная доставка ничего не шлёт
+    bus.dispatch()
+    assert received == [100]
+
+
+def test_events_are_not_lost_and_follow_progress():
+    bus = ProgressBus()
+    received = []
+    bus.subscribe("download", lambda **payload: received.append(("progress", payload["done"])))
+    bus.subscribe("chapter", lambda **payload: received.append(("chapter", payload["number"])))
+
+    bus.emit("chapter", number=1)
+    bus.publish("download", done=1)
+    bus.emit("chapter", number=2)
+    bus.publish("download", done=2)
+    bus.dispatch()
+    assert received == [("progress", 2), ("chapter", 1), ("chapter", 2)]
+
+
+def test_failing_handler_does_not_stop_delivery():
+    bus = ProgressBus()
+    received = []
+
+    def broken(**payload):
+        raise RuntimeError("виджет закрыт")
+
+    bus.subscribe("download", broken)
+    bus.subscribe("download", lambda **payload: received.append(payload["done"]))
+    bus.publish("download", done=3)
+    bus.dispatch()
+    assert received == [3]
+
+
+def test_pump_stops_without_subscribers_and_restarts_on_subscribe():
+    bus = ProgressBus()
+    widget = FakeWidget()
+    received = []
+    handler = lambda **payload: received.append(payload["done"])  # noqa: E731
+
+    bus.subscribe("download", handler)
+    bus.attach(widget)
+    bus.publish("download", done=1)
+    widget.run_pending()
+    assert received == [1]
+    assert len(widget.pending) == 1
+
+    bus.unsubscribe("download", handler)
+    widget.run_pending()
+    assert widget.pending == []
+
+    bus.publish("download", done=2)
+    bus.subscribe("download", handler)
+    widget.run_pending()
+    assert received == [1, 2]